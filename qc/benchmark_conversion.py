@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite for the PDF/EPUB Conversion Pipeline
+
+Times every preparation stage of ``prepare_html_for_conversion`` (parse,
+figure linking, back-links, frontmatter, ...) and, optionally, full PDF and
+EPUB rendering on a fixed selection of essays from the real corpus: the
+smallest, the median and the largest essay by file size. Each stage is run
+several times and the fastest run is kept, which is the most stable
+measure on a busy machine.
+
+Every run is appended to a history file (one JSON object per line) keyed
+by the git commit, and compared with an earlier run so regressions show up
+between commits.
+
+Key Features:
+- Fixed small / median / largest essay selection (recorded in the history)
+- Per-stage best-of-N timings, plus PDF/EPUB rendering with ``--render``
+- JSONL history keyed by git commit (with a flag for uncommitted changes)
+- Comparison against the previous commit or any earlier revision
+- ``--fail-on-regression`` exit status for CI
+
+Usage:
+    python benchmark_conversion.py [--repeat 5] [--render] [--html-dir ../html]
+    python benchmark_conversion.py --baseline HEAD~3 --fail-on-regression
+    python benchmark_conversion.py --show-history
+"""
+import io
+import os
+import sys
+import json
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from contextlib import redirect_stdout
+from typing import List, Dict, Any, Optional, Tuple
+
+from conversion_timing import StageTimer
+from convert_to_pdf_epub import prepare_html_for_conversion, convert_html_file, MetadataStore
+from css_pruning import CSSPruner
+
+DEFAULT_HISTORY = 'benchmark_history.jsonl'
+
+# Stages shorter than this are too noisy to call a regression
+MIN_STAGE_SECONDS = 0.001
+
+
+def select_essays(html_dir: str) -> Dict[str, str]:
+    """
+    Pick the smallest, median and largest essay by file size.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+
+    Returns:
+        dict: File name by label ('small', 'median', 'large')
+    """
+    files = sorted((f for f in os.listdir(html_dir) if f.endswith('.html')),
+                   key=lambda f: (os.path.getsize(os.path.join(html_dir, f)), f))
+    if not files:
+        return {}
+    return {'small': files[0], 'median': files[len(files) // 2], 'large': files[-1]}
+
+
+def git_revision(path: str) -> Tuple[str, bool]:
+    """
+    Current git commit and whether the working tree has uncommitted changes.
+
+    Args:
+        path (str): Directory inside the repository
+
+    Returns:
+        tuple: (commit hash or 'unknown', dirty flag)
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=path,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=path,
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return 'unknown', False
+
+
+def resolve_revision(path: str, revision: str) -> Optional[str]:
+    """Resolve a git revision (e.g. 'HEAD~1') to a commit hash."""
+    try:
+        return subprocess.run(['git', 'rev-parse', revision], cwd=path,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def benchmark_preparation(html_path: str, css_file: str, html_dir: str,
+                          metadata_store: MetadataStore, css_pruner: CSSPruner,
+                          repeat: int) -> Dict[str, float]:
+    """
+    Time every preparation stage of one essay.
+
+    Args:
+        html_path (str): Path to the essay
+        css_file (str): Path to the CSS stylesheet
+        html_dir (str): Directory containing HTML files and metadata
+        metadata_store (MetadataStore): Loaded metadata
+        css_pruner (CSSPruner): Stylesheet pruner
+        repeat (int): Number of timed runs
+
+    Returns:
+        dict: Best time in seconds per stage, plus 'prepare_total'
+    """
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        timer = StageTimer(os.path.basename(html_path))
+        with redirect_stdout(io.StringIO()):
+            prepare_html_for_conversion(html_path, css_file, html_dir, timer,
+                                        metadata_store=metadata_store, css_pruner=css_pruner)
+        timer.stop()
+        stages = dict(timer.stages)
+        stages['prepare_total'] = sum(timer.stages.values())
+        for stage, seconds in stages.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    return best
+
+
+def benchmark_rendering(html_path: str, css_file: str, html_dir: str,
+                        metadata_store: MetadataStore, css_pruner: CSSPruner,
+                        repeat: int, formats: List[str]) -> Tuple[Dict[str, float], List[str]]:
+    """
+    Time full PDF/EPUB conversion of one essay.
+
+    Args:
+        html_path (str): Path to the essay
+        css_file (str): Path to the CSS stylesheet
+        html_dir (str): Directory containing HTML files and metadata
+        metadata_store (MetadataStore): Loaded metadata
+        css_pruner (CSSPruner): Stylesheet pruner
+        repeat (int): Number of timed runs
+        formats (list): 'pdf' and/or 'epub'
+
+    Returns:
+        tuple: (best time in seconds per rendering stage plus 'render_total', errors)
+    """
+    render_stages = ('pdf_parse', 'pdf_layout', 'pdf_write', 'epub')
+    best: Dict[str, float] = {}
+    errors: List[str] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_dir = os.path.join(temp_dir, 'pdfs') if 'pdf' in formats else None
+        epub_dir = os.path.join(temp_dir, 'epubs') if 'epub' in formats else None
+        for directory in (pdf_dir, epub_dir):
+            if directory:
+                os.makedirs(directory)
+
+        for _ in range(repeat):
+            timer = StageTimer(os.path.basename(html_path))
+            with redirect_stdout(io.StringIO()):
+                run_errors = convert_html_file(html_path, css_file, html_dir, pdf_dir, epub_dir,
+                                               temp_dir, timer, metadata_store, css_pruner=css_pruner)
+            if run_errors:
+                errors = run_errors
+                break
+            stages = {stage: timer.stages[stage] for stage in render_stages if stage in timer.stages}
+            stages['render_total'] = sum(stages.values())
+            for stage, seconds in stages.items():
+                best[stage] = min(best.get(stage, seconds), seconds)
+    return best, errors
+
+
+def load_history(history_path: str) -> List[Dict[str, Any]]:
+    """
+    Load all benchmark runs from a history file.
+
+    Args:
+        history_path (str): JSONL history file
+
+    Returns:
+        list: Runs, oldest first
+    """
+    if not os.path.exists(history_path):
+        return []
+    with open(history_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(history_path: str, run: Dict[str, Any]) -> None:
+    """
+    Append one benchmark run to a history file.
+
+    Args:
+        history_path (str): JSONL history file
+        run (dict): Benchmark run
+    """
+    with open(history_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(run, sort_keys=True) + "\n")
+
+
+def find_baseline(history: List[Dict[str, Any]], run: Dict[str, Any],
+                  commit: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Find the run to compare against.
+
+    Only runs over the same essays are considered. Without ``commit`` this is
+    the latest run of a different commit (or of the same commit with a
+    different dirty state), falling back to the latest run of any commit.
+
+    Args:
+        history (list): Earlier runs, oldest first
+        run (dict): Current run
+        commit (str): Commit hash of the baseline (optional)
+
+    Returns:
+        dict: Baseline run, or None if there is none
+    """
+    selection = {label: essay['file'] for label, essay in run['essays'].items()}
+    candidates = [previous for previous in history
+                  if {label: essay['file'] for label, essay in previous['essays'].items()} == selection]
+    if commit:
+        matches = [previous for previous in candidates
+                   if previous['commit'] == commit and not previous['dirty']]
+        return matches[-1] if matches else None
+    for previous in reversed(candidates):
+        if (previous['commit'], previous['dirty']) != (run['commit'], run['dirty']):
+            return previous
+    return candidates[-1] if candidates else None
+
+
+def compare_runs(baseline: Dict[str, Any], run: Dict[str, Any],
+                 threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compare the stage timings of two runs.
+
+    Args:
+        baseline (dict): Earlier run
+        run (dict): Current run
+        threshold (float): Relative change that counts as a regression or
+            improvement (e.g. 0.1 for 10%)
+
+    Returns:
+        list: Changes with essay label, stage, both times and 'regression' or
+            'improvement', largest relative change first
+    """
+    changes = []
+    for label, essay in run['essays'].items():
+        base_stages = baseline['essays'].get(label, {}).get('stages', {})
+        for stage, seconds in essay['stages'].items():
+            before = base_stages.get(stage)
+            if before is None or max(before, seconds) < MIN_STAGE_SECONDS:
+                continue
+            ratio = seconds / before if before else float('inf')
+            if ratio > 1 + threshold:
+                kind = 'regression'
+            elif ratio < 1 - threshold:
+                kind = 'improvement'
+            else:
+                continue
+            changes.append({'essay': label, 'stage': stage, 'before': before,
+                            'after': seconds, 'ratio': ratio, 'kind': kind})
+    changes.sort(key=lambda c: abs(c['ratio'] - 1), reverse=True)
+    return changes
+
+
+def show_history(history: List[Dict[str, Any]]) -> None:
+    """Print the total preparation and rendering time of every run."""
+    for run in history:
+        totals = []
+        for label, essay in run['essays'].items():
+            total = essay['stages'].get('prepare_total', 0.0)
+            line = f"{label} {total * 1000:.1f} ms"
+            if 'render_total' in essay['stages']:
+                line += f" + render {essay['stages']['render_total']:.2f}s"
+            totals.append(line)
+        commit = run['commit'][:10] + ('+' if run['dirty'] else '')
+        print(f"{run['timestamp']}  {commit}  " + "  |  ".join(totals))
+
+
+def main():
+    """Run the conversion benchmark and record it in the history."""
+    parser = argparse.ArgumentParser(description='Benchmark the conversion stages on small, median and large essays')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Timed runs per essay; the fastest is kept (default: 5)')
+    parser.add_argument('--render', action='store_true',
+                       help='Also time full rendering (WeasyPrint PDF, and EPUB if pandoc is installed)')
+    parser.add_argument('--render-repeat', type=int, default=1,
+                       help='Timed rendering runs per essay (default: 1)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY,
+                       help=f'JSONL history file (default: {DEFAULT_HISTORY})')
+    parser.add_argument('--baseline',
+                       help='Git revision to compare against (default: the previous commit in the history)')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                       help='Relative change reported as a regression or improvement (default: 0.10)')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                       help='Exit with status 1 if any stage regressed')
+    parser.add_argument('--no-save', action='store_true',
+                       help='Do not append this run to the history')
+    parser.add_argument('--show-history', action='store_true',
+                       help='Print the recorded runs and exit')
+
+    args = parser.parse_args()
+
+    if args.show_history:
+        show_history(load_history(args.history))
+        return
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    css_file = os.path.join(script_dir, 'academic-print.css')
+    with open(css_file, 'r', encoding='utf-8') as f:
+        css_pruner = CSSPruner(f.read())
+    metadata_store = MetadataStore(html_dir)
+
+    formats = ['pdf'] + (['epub'] if shutil.which('pandoc') else [])
+    commit, dirty = git_revision(script_dir)
+    run = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'repeat': args.repeat,
+        'essays': {},
+    }
+
+    print(f"Benchmarking commit {commit[:10]}{' (uncommitted changes)' if dirty else ''}, "
+          f"best of {args.repeat} runs")
+    print("=" * 60)
+
+    errors = []
+    for label, filename in select_essays(html_dir).items():
+        html_path = os.path.join(html_dir, filename)
+        stages = benchmark_preparation(html_path, css_file, html_dir, metadata_store,
+                                       css_pruner, args.repeat)
+        line = f"{label:6} {filename}: prepare {stages['prepare_total'] * 1000:.1f} ms"
+
+        if args.render:
+            render_stages, render_errors = benchmark_rendering(
+                html_path, css_file, html_dir, metadata_store, css_pruner,
+                args.render_repeat, formats)
+            stages.update(render_stages)
+            errors.extend(render_errors)
+            if 'render_total' in render_stages:
+                line += f", render ({'+'.join(formats)}) {render_stages['render_total']:.2f}s"
+
+        run['essays'][label] = {
+            'file': filename,
+            'bytes': os.path.getsize(html_path),
+            'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+        }
+        print(line)
+        slowest = sorted(((s, t) for s, t in stages.items() if not s.endswith('_total')),
+                         key=lambda x: x[1], reverse=True)[:3]
+        print("         slowest stages: " + ", ".join(f"{s} {t * 1000:.1f} ms" for s, t in slowest))
+
+    for error in errors:
+        print(f"  ✗ {error}")
+
+    history = load_history(args.history)
+    baseline_commit = None
+    if args.baseline:
+        baseline_commit = resolve_revision(script_dir, args.baseline)
+        if not baseline_commit:
+            print(f"Error: unknown revision: {args.baseline}")
+            sys.exit(1)
+    baseline = find_baseline(history, run, baseline_commit)
+
+    regressions = []
+    print("=" * 60)
+    if baseline:
+        print(f"Compared with {baseline['commit'][:10]}{'+' if baseline['dirty'] else ''} "
+              f"({baseline['timestamp']}), threshold {args.threshold:.0%}:")
+        changes = compare_runs(baseline, run, args.threshold)
+        regressions = [c for c in changes if c['kind'] == 'regression']
+        for change in changes:
+            marker = '✗' if change['kind'] == 'regression' else '✓'
+            print(f"  {marker} {change['essay']} {change['stage']}: {change['before'] * 1000:.1f} -> "
+                  f"{change['after'] * 1000:.1f} ms ({change['ratio']:.2f}x)")
+        if not changes:
+            print("  No significant changes")
+    elif args.baseline:
+        print(f"No run of {args.baseline} over the same essays in {args.history}")
+    else:
+        print("No earlier run to compare with")
+
+    if not args.no_save:
+        append_history(args.history, run)
+        print(f"Saved to {args.history}")
+
+    if errors or (args.fail_on_regression and regressions):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
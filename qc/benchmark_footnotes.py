@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Endnote-to-Footnote Conversion
+
+Times ``convert_endnotes_to_footnotes`` from ``convert_to_pdf_epub_footnotes.py``
+on the essays with the most footnotes. Parsing is done outside the timed
+region, so only the conversion itself is measured.
+
+Key Features:
+- Selects the N most footnote-heavy essays automatically
+- Repeats each conversion and reports the best and median time
+- Optionally compares against the implementation at another git revision
+
+Usage:
+    python benchmark_footnotes.py [--essays 10] [--repeat 5] [--html-dir ../html]
+    python benchmark_footnotes.py --baseline HEAD~1
+"""
+import io
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import importlib.util
+import tempfile
+from contextlib import redirect_stdout
+from typing import List, Tuple, Callable, Optional
+
+from bs4 import BeautifulSoup
+
+from convert_to_pdf_epub_footnotes import convert_endnotes_to_footnotes
+
+
+def footnote_heavy_essays(html_dir: str, count: int) -> List[Tuple[str, int]]:
+    """
+    Find the essays with the most endnotes.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+        count (int): Number of essays to return
+
+    Returns:
+        list: (path, endnote count) tuples, most endnotes first
+    """
+    essays = []
+    for filename in os.listdir(html_dir):
+        if filename.endswith('.html'):
+            path = os.path.join(html_dir, filename)
+            with open(path, 'r', encoding='utf-8') as f:
+                notes = f.read().count('role="doc-endnote"')
+            essays.append((path, notes))
+    essays.sort(key=lambda x: x[1], reverse=True)
+    return essays[:count]
+
+
+def load_baseline(revision: str) -> Callable:
+    """
+    Load ``convert_endnotes_to_footnotes`` as it was at a git revision.
+
+    Args:
+        revision (str): Git revision (e.g. 'HEAD~1')
+
+    Returns:
+        callable: The baseline conversion function
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    source = subprocess.run(
+        ['git', 'show', f"{revision}:./convert_to_pdf_epub_footnotes.py"],
+        cwd=script_dir, capture_output=True, text=True, check=True
+    ).stdout
+
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+        f.write(source)
+        module_path = f.name
+    try:
+        spec = importlib.util.spec_from_file_location('baseline_footnotes', module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        os.unlink(module_path)
+    return module.convert_endnotes_to_footnotes
+
+
+def time_conversion(convert: Callable, content: str, repeat: int) -> List[float]:
+    """
+    Time one conversion function on one document.
+
+    Args:
+        convert (callable): Conversion function taking a soup
+        content (str): HTML content of the essay
+        repeat (int): Number of timed runs
+
+    Returns:
+        list: Elapsed seconds per run
+    """
+    times = []
+    for _ in range(repeat):
+        soup = BeautifulSoup(content, 'html.parser')
+        with redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            convert(soup)
+            times.append(time.perf_counter() - start)
+        soup.decompose()
+    return times
+
+
+def main():
+    """Run the footnote conversion benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the endnote-to-footnote conversion')
+    parser.add_argument('--essays', type=int, default=10,
+                       help='Number of footnote-heavy essays to benchmark (default: 10)')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Timed runs per essay (default: 5)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--baseline',
+                       help='Also time the implementation at this git revision')
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    baseline: Optional[Callable] = None
+    if args.baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: could not load baseline {args.baseline}: {e.stderr.strip()}")
+            sys.exit(1)
+
+    essays = footnote_heavy_essays(html_dir, args.essays)
+    print(f"Benchmarking {len(essays)} essays, {args.repeat} runs each (best / median)")
+    print("=" * 60)
+
+    total_current = 0.0
+    total_baseline = 0.0
+    for path, notes in essays:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        current = time_conversion(convert_endnotes_to_footnotes, content, args.repeat)
+        total_current += min(current)
+        line = (f"{os.path.basename(path)} ({notes} notes): "
+                f"{min(current) * 1000:.1f} / {statistics.median(current) * 1000:.1f} ms")
+
+        if baseline:
+            base = time_conversion(baseline, content, args.repeat)
+            total_baseline += min(base)
+            line += (f"  baseline {min(base) * 1000:.1f} / {statistics.median(base) * 1000:.1f} ms"
+                     f"  ({min(base) / min(current):.1f}x)")
+        print(line)
+
+    print("=" * 60)
+    print(f"Total (best runs): {total_current * 1000:.1f} ms")
+    if baseline:
+        print(f"Baseline total (best runs): {total_baseline * 1000:.1f} ms "
+              f"({total_baseline / total_current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the Structural HTML Checks
+
+Times the structure checks of ``comprehensive_html_check.py``,
+``html_wellformedness_check.py`` and ``quick_html_analysis.py`` on every
+essay of the corpus and on large synthetic documents (built with
+``synthetic_corpus.py``). File reading is done outside the timed region.
+
+With ``--baseline`` the implementations at another git revision are timed
+as well, and their findings are compared with the current ones on every
+document, so a faster scan that changes a report is caught.
+
+Key Features:
+- Corpus and synthetic (default 10 MB) documents
+- Best-of-N timing per check
+- Findings comparison against an earlier revision
+
+Usage:
+    python benchmark_structure_checks.py [--repeat 5] [--synthetic-mb 10] [--html-dir ../html]
+    python benchmark_structure_checks.py --baseline HEAD~1
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import importlib.util
+import tempfile
+from typing import List, Dict, Tuple, Callable, Any
+
+from comprehensive_html_check import analyze_html_structure
+from html_wellformedness_check import check_html_structure
+from quick_html_analysis import check_basic_structure
+from synthetic_corpus import generate_essay
+
+# (script, function) of every check
+CHECKS = [
+    ('comprehensive_html_check', 'analyze_html_structure'),
+    ('html_wellformedness_check', 'check_html_structure'),
+    ('quick_html_analysis', 'check_basic_structure'),
+]
+
+CURRENT = {
+    'analyze_html_structure': analyze_html_structure,
+    'check_html_structure': check_html_structure,
+    'check_basic_structure': check_basic_structure,
+}
+
+
+def load_baseline(revision: str) -> Dict[str, Callable]:
+    """
+    Load the check functions as they were at a git revision.
+
+    Args:
+        revision (str): Git revision (e.g. 'HEAD~1')
+
+    Returns:
+        dict: Baseline check functions by function name
+    """
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    functions = {}
+    for script, function in CHECKS:
+        source = subprocess.run(
+            ['git', 'show', f"{revision}:./{script}.py"],
+            cwd=script_dir, capture_output=True, text=True, check=True
+        ).stdout
+
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write(source)
+            module_path = f.name
+        try:
+            spec = importlib.util.spec_from_file_location(f"baseline_{script}", module_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        finally:
+            os.unlink(module_path)
+        functions[function] = getattr(module, function)
+    return functions
+
+
+def synthetic_document(megabytes: float) -> str:
+    """
+    Generate one synthetic essay of at least the given size.
+
+    Args:
+        megabytes (float): Minimum size in MB
+
+    Returns:
+        str: HTML content
+    """
+    # An essay with 1,000 footnotes and 40 figures is about 0.8 MB
+    scale = max(1, int(megabytes / 0.8) + 1)
+    return generate_essay('ann_00001_sy_00', footnotes=1000 * scale, figures=40 * scale)
+
+
+def time_check(check: Callable, documents: List[str], repeat: int) -> Tuple[float, List[Any]]:
+    """
+    Time one check over a set of documents.
+
+    Args:
+        check (callable): Check function taking (content, filename)
+        documents (list): HTML contents
+        repeat (int): Number of timed runs
+
+    Returns:
+        tuple: (best total seconds, findings of the last run per document)
+    """
+    best = float('inf')
+    findings: List[Any] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        findings = [check(content, 'benchmark') for content in documents]
+        best = min(best, time.perf_counter() - start)
+    return best, findings
+
+
+def main():
+    """Run the structural check benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark the structural HTML checks')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Timed runs per check (default: 5)')
+    parser.add_argument('--synthetic-mb', type=float, default=10.0,
+                       help='Size of the synthetic document in MB (default: 10)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--baseline',
+                       help='Also time the implementation at this git revision and compare findings')
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    baseline: Dict[str, Callable] = {}
+    if args.baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except subprocess.CalledProcessError as e:
+            print(f"Error: could not load baseline {args.baseline}: {e.stderr.strip()}")
+            sys.exit(1)
+
+    corpus = []
+    for filename in sorted(os.listdir(html_dir)):
+        if filename.endswith('.html'):
+            with open(os.path.join(html_dir, filename), 'r', encoding='utf-8', errors='replace') as f:
+                corpus.append(f.read())
+    synthetic = synthetic_document(args.synthetic_mb)
+
+    datasets = [
+        (f"corpus ({len(corpus)} files, {sum(map(len, corpus)) / 1e6:.1f} MB)", corpus),
+        (f"synthetic ({len(synthetic) / 1e6:.1f} MB)", [synthetic]),
+    ]
+
+    print(f"Benchmarking structural checks, best of {args.repeat} runs")
+    differences = 0
+    for label, documents in datasets:
+        print("=" * 60)
+        print(label)
+        for script, function in CHECKS:
+            current, findings = time_check(CURRENT[function], documents, args.repeat)
+            line = f"  {script:28} {current * 1000:8.1f} ms"
+            if baseline:
+                base, base_findings = time_check(baseline[function], documents, args.repeat)
+                changed = sum(1 for a, b in zip(findings, base_findings) if a != b)
+                differences += changed
+                line += f"  baseline {base * 1000:8.1f} ms ({base / current:.2f}x)"
+                line += "  ✓ same findings" if not changed else f"  ✗ {changed} documents differ"
+            print(line)
+
+    if baseline:
+        print("=" * 60)
+        if differences:
+            print(f"✗ Findings differ from {args.baseline} on {differences} documents")
+            sys.exit(1)
+        print(f"✓ Findings identical to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Cohort Volume Builder
+
+Assembles one anthology PDF per cohort from the essay PDFs that
+``convert_to_pdf_epub.py`` has already rendered. Essays are grouped by the
+semester code in their file name (``ann_003_fa_14.html`` belongs to the
+``fa_14`` volume).
+
+Essays are not laid out again: the cached PDFs in ``<output>/pdfs`` are
+merged as they are, and only essays whose PDF is missing, older than the
+HTML, the stylesheet or the metadata, or not rendered with the final
+profile (see ``PROFILE_SUFFIX``) are rendered first. On top of the
+merged pages the builder adds:
+- A table of contents with titles, authors and start pages
+- Continuous page numbers, stamped over each essay's own page number
+  (the stamps are one small WeasyPrint document of otherwise empty pages)
+- Bookmarks for every essay, with the essay's own bookmarks nested below
+- PDF page labels matching the printed numbers (roman for the contents)
+- Optionally (``--optimize-pdf``) linearization and merging of streams the
+  essays share, see ``pdf_optimize.py``
+
+Requires pypdf for merging (``pip install pypdf``).
+
+Usage:
+    python build_volumes.py [--volumes fa_14 sp_15] [--output-dir OUTPUT] [--html-dir DIR]
+    python build_volumes.py --list
+"""
+import os
+import re
+import io
+import sys
+import time
+import html
+import argparse
+from typing import List, Dict, Any, Optional
+
+from bs4 import BeautifulSoup
+
+from convert_to_pdf_epub import MetadataStore, process_html_files, render_profile_of
+import pdf_optimize
+
+SEMESTER_PATTERN = re.compile(r'^ann_\d+_([a-z]+_\d{2})\.html$')
+
+# "Cite As" section of the essay header, and the title within the
+# citation: “Title.” In ...
+CITE_AS_PATTERN = re.compile(r'<h2[^>]*>\s*Cite\s+As\s*</h2>\s*<div[^>]*>(.*?)</div>', re.S | re.I)
+CITED_TITLE_PATTERN = re.compile(r'“(.+?)[.,]?”')
+
+# Term names, in their order within a year
+SEMESTER_NAMES = {
+    'sp': 'Spring',
+    'fa': 'Fall',
+}
+
+# Must match the @page rule of academic-print.css so the stamped page
+# numbers land on the essays' own page numbers
+PAGE_CSS = """
+@page {
+    size: A4;
+    margin: 1.5in 1.25in 1.25in 1.25in;
+}
+"""
+
+TOC_CSS = PAGE_CSS + """
+@page {
+    @bottom-center {
+        content: counter(page, lower-roman);
+        font-family: "Times New Roman", Times, serif;
+        font-size: 10pt;
+        color: #666;
+    }
+}
+body {
+    font-family: "Times New Roman", "Liberation Serif", Times, serif;
+    font-size: 12pt;
+    line-height: 1.5;
+    color: #1a1a1a;
+}
+h1 {
+    font-size: 24pt;
+    font-weight: normal;
+    text-align: center;
+    margin: 1in 0 0.25in 0;
+}
+.volume-subtitle {
+    text-align: center;
+    color: #666;
+    margin-bottom: 0.5in;
+}
+ol {
+    list-style: none;
+    padding: 0;
+}
+li {
+    margin-bottom: 10pt;
+    break-inside: avoid;
+}
+.toc-title::after {
+    content: leader('.') attr(data-page);
+}
+.toc-authors {
+    font-style: italic;
+    font-size: 10pt;
+    color: #444;
+}
+"""
+
+FOLIO_CSS = PAGE_CSS + """
+@page {
+    @bottom-center {
+        content: counter(page);
+        font-family: "Times New Roman", Times, serif;
+        font-size: 10pt;
+        color: #666;
+        background: white;
+    }
+}
+.folio + .folio {
+    break-before: page;
+}
+"""
+
+
+def semester_code(filename: str) -> Optional[str]:
+    """
+    Extract the semester code from an essay file name.
+
+    Args:
+        filename (str): Essay file name (e.g. 'ann_003_fa_14.html')
+
+    Returns:
+        str: Semester code (e.g. 'fa_14'), or None for other files
+    """
+    match = SEMESTER_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+
+def volume_title(code: str) -> str:
+    """
+    Human-readable name of a cohort volume (e.g. 'fa_14' -> 'Fall 2014').
+
+    Args:
+        code (str): Semester code
+
+    Returns:
+        str: Volume name
+    """
+    term, year = code.split('_')
+    return f"{SEMESTER_NAMES.get(term, term.upper())} 20{year}"
+
+
+def group_by_semester(html_files: List[str]) -> Dict[str, List[str]]:
+    """
+    Group essay files into volumes by semester code.
+
+    Args:
+        html_files (list): HTML file names
+
+    Returns:
+        dict: Essay file names (in essay order) by semester code, oldest first
+    """
+    volumes: Dict[str, List[str]] = {}
+    for filename in sorted(html_files):
+        code = semester_code(filename)
+        if code:
+            volumes.setdefault(code, []).append(filename)
+    terms = list(SEMESTER_NAMES)
+
+    def chronological(code: str):
+        term, year = code.split('_')
+        return year, terms.index(term) if term in terms else len(terms), term
+
+    return {code: volumes[code] for code in sorted(volumes, key=chronological)}
+
+
+def stale_essays(html_dir: str, pdf_dir: str, css_file: str, html_files: List[str]) -> List[str]:
+    """
+    Find the essays whose cached PDF is missing or out of date.
+
+    A PDF is out of date when it is older than its HTML file, the stylesheet
+    or either metadata file, or was not rendered with the final profile
+    (drafts share the pdfs/ folder).
+
+    Args:
+        html_dir (str): Directory containing HTML files and metadata
+        pdf_dir (str): Directory with the rendered essay PDFs
+        css_file (str): Path to the CSS stylesheet
+        html_files (list): HTML file names to check
+
+    Returns:
+        list: HTML file names that need rendering
+    """
+    shared = [css_file] + [os.path.join(html_dir, name) for name in ('annotations.json', 'authors.json')]
+    shared_mtime = max((os.path.getmtime(path) for path in shared if os.path.exists(path)), default=0)
+
+    stale = []
+    for filename in html_files:
+        pdf_path = os.path.join(pdf_dir, f"{os.path.splitext(filename)[0]}.pdf")
+        if not os.path.exists(pdf_path) or render_profile_of(pdf_path) != 'final':
+            stale.append(filename)
+            continue
+        source_mtime = max(shared_mtime, os.path.getmtime(os.path.join(html_dir, filename)))
+        if os.path.getmtime(pdf_path) < source_mtime:
+            stale.append(filename)
+    return stale
+
+
+def cited_title(html_path: str) -> str:
+    """
+    Read an essay's title from the citation in its header section.
+
+    Args:
+        html_path (str): Path to the essay HTML file
+
+    Returns:
+        str: Title, or '' if the essay has no recognisable citation
+    """
+    with open(html_path, 'r', encoding='utf-8') as f:
+        section = CITE_AS_PATTERN.search(f.read())
+    if not section:
+        return ''
+
+    citation = BeautifulSoup(section.group(1), 'html.parser').get_text(' ')
+    match = CITED_TITLE_PATTERN.search(' '.join(citation.split()))
+    return match.group(1).strip() if match else ''
+
+
+def essay_entry(html_path: str, metadata_store: MetadataStore) -> Dict[str, Any]:
+    """
+    Title and authors of an essay for the table of contents.
+
+    Uses the annotations metadata when available, otherwise the quoted
+    title in the essay's "Cite As" section, otherwise the file name.
+
+    Args:
+        html_path (str): Path to the essay HTML file
+        metadata_store (MetadataStore): Loaded metadata
+
+    Returns:
+        dict: 'essay', 'title' and 'authors' (list of names)
+    """
+    essay = os.path.splitext(os.path.basename(html_path))[0]
+    annotation = metadata_store.annotations_data.get(essay, {})
+
+    title = annotation.get('fullTitle', annotation.get('name', ''))
+    if title:
+        title = BeautifulSoup(title, 'html.parser').get_text(' ', strip=True)
+    else:
+        title = cited_title(html_path)
+    if not title:
+        title = essay.replace('_', ' ').title()
+
+    authors = []
+    for author_id in annotation.get('authorIDs', []):
+        name = metadata_store.authors_data.get(author_id, {}).get('fullName', '')
+        if name:
+            authors.append(name)
+
+    return {'essay': essay, 'title': title, 'authors': authors}
+
+
+def build_toc_html(title: str, entries: List[Dict[str, Any]]) -> str:
+    """
+    Build the table of contents of a volume.
+
+    Args:
+        title (str): Volume name
+        entries (list): Essay entries with 'title', 'authors' and 'start_page'
+
+    Returns:
+        str: HTML document
+    """
+    items = []
+    for entry in entries:
+        authors = ''
+        if entry['authors']:
+            authors = f'<div class="toc-authors">{html.escape(", ".join(entry["authors"]))}</div>'
+        items.append(f'<li><div class="toc-title" data-page="{entry["start_page"]}">'
+                     f'{html.escape(entry["title"])}</div>{authors}</li>')
+
+    return (f'<html><head><meta charset="utf-8"><title>{html.escape(title)}</title></head><body>'
+            f'<h1>{html.escape(title)}</h1>'
+            f'<div class="volume-subtitle">Making and Knowing Project</div>'
+            f'<ol>{"".join(items)}</ol></body></html>')
+
+
+def build_folio_html(count: int) -> str:
+    """
+    Build a document of ``count`` empty pages that only carry a page number.
+
+    Args:
+        count (int): Number of pages
+
+    Returns:
+        str: HTML document
+    """
+    return f'<html><body>{"<div class=folio></div>" * count}</body></html>'
+
+
+def render_pdf(html_content: str, css_content: str) -> bytes:
+    """
+    Render a small generated document (contents, page number stamps) to PDF.
+
+    Args:
+        html_content (str): HTML document
+        css_content (str): Stylesheet
+
+    Returns:
+        bytes: PDF data
+    """
+    import weasyprint
+    return weasyprint.HTML(string=html_content).write_pdf(
+        stylesheets=[weasyprint.CSS(string=css_content)])
+
+
+def assemble_volume(code: str, essays: List[str], html_dir: str, pdf_dir: str,
+                    volume_dir: str, metadata_store: MetadataStore) -> Dict[str, Any]:
+    """
+    Merge the cached essay PDFs of one cohort into a volume.
+
+    Args:
+        code (str): Semester code of the volume
+        essays (list): Essay HTML file names, in volume order
+        html_dir (str): Directory containing HTML files
+        pdf_dir (str): Directory with the rendered essay PDFs
+        volume_dir (str): Directory for the volume PDFs
+        metadata_store (MetadataStore): Loaded metadata
+
+    Returns:
+        dict: Volume path, page counts and the essays left out (no PDF,
+            or a PDF that was not rendered with the final profile)
+    """
+    from pypdf import PdfReader, PdfWriter
+
+    title = volume_title(code)
+    entries = []
+    missing = []
+    next_page = 1
+    for filename in essays:
+        pdf_path = os.path.join(pdf_dir, f"{os.path.splitext(filename)[0]}.pdf")
+        if not os.path.exists(pdf_path) or render_profile_of(pdf_path) != 'final':
+            missing.append(filename)
+            continue
+        entry = essay_entry(os.path.join(html_dir, filename), metadata_store)
+        entry['reader'] = PdfReader(pdf_path)
+        entry['start_page'] = next_page
+        next_page += len(entry['reader'].pages)
+        entries.append(entry)
+
+    essay_pages = next_page - 1
+    toc_reader = PdfReader(io.BytesIO(render_pdf(build_toc_html(title, entries), TOC_CSS)))
+    toc_pages = len(toc_reader.pages)
+
+    writer = PdfWriter()
+    writer.append(toc_reader, import_outline=False)
+    writer.add_outline_item('Contents', 0)
+    for entry in entries:
+        writer.append(entry['reader'], outline_item=entry['title'])
+
+    # Continuous page numbers over the essays' own numbers
+    if essay_pages:
+        folios = PdfReader(io.BytesIO(render_pdf(build_folio_html(essay_pages), FOLIO_CSS)))
+        for index, folio in enumerate(folios.pages):
+            writer.pages[toc_pages + index].merge_page(folio)
+
+    writer.set_page_label(0, toc_pages - 1, style='/r')
+    if essay_pages:
+        writer.set_page_label(toc_pages, toc_pages + essay_pages - 1, style='/D', start=1)
+    writer.add_metadata({'/Title': f"{title} - Making and Knowing Project"})
+
+    os.makedirs(volume_dir, exist_ok=True)
+    volume_path = os.path.join(volume_dir, f"{code}.pdf")
+    with open(volume_path, 'wb') as f:
+        writer.write(f)
+
+    return {
+        'path': volume_path,
+        'essays': len(entries),
+        'missing': missing,
+        'toc_pages': toc_pages,
+        'pages': toc_pages + essay_pages,
+    }
+
+
+def main():
+    """Build cohort volumes from the rendered essay PDFs."""
+    parser = argparse.ArgumentParser(description='Build one anthology PDF per cohort from rendered essay PDFs')
+    parser.add_argument('--volumes', nargs='+', metavar='CODE',
+                       help='Semester codes to build (e.g. fa_14 ie_19; default: all)')
+    parser.add_argument('--output-dir', '-o', default='./converted_documents',
+                       help='Output directory of convert_to_pdf_epub.py; essay PDFs are read from '
+                            'its pdfs/ folder and volumes written to volumes/ (default: ./converted_documents)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--optimize-pdf', action='store_true',
+                       help='Linearize each volume and merge streams shared between essays (requires pikepdf)')
+    parser.add_argument('--list', action='store_true',
+                       help='List the volumes and the number of stale essay PDFs, then exit')
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    css_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'academic-print.css')
+    output_dir = os.path.abspath(args.output_dir)
+    pdf_dir = os.path.join(output_dir, 'pdfs')
+    volume_dir = os.path.join(output_dir, 'volumes')
+
+    volumes = group_by_semester(f for f in os.listdir(html_dir) if f.endswith('.html'))
+    if args.volumes:
+        unknown = [code for code in args.volumes if code not in volumes]
+        if unknown:
+            print(f"Error: unknown volume(s): {', '.join(unknown)}")
+            print(f"Available: {', '.join(volumes)}")
+            sys.exit(1)
+        volumes = {code: volumes[code] for code in args.volumes}
+
+    essays = [filename for files in volumes.values() for filename in files]
+    stale = stale_essays(html_dir, pdf_dir, css_file, essays)
+
+    if args.list:
+        stale_set = set(stale)
+        for code, files in volumes.items():
+            outdated = sum(1 for filename in files if filename in stale_set)
+            print(f"{code} ({volume_title(code)}): {len(files)} essays, {outdated} to render")
+        return
+
+    try:
+        import pypdf
+    except ImportError:
+        print("Error: pypdf is required to merge the essay PDFs")
+        print("Install with: pip install pypdf")
+        sys.exit(1)
+    if args.optimize_pdf and pdf_optimize.pikepdf is None:
+        print("Error: pikepdf is required for --optimize-pdf")
+        print(pdf_optimize.PIKEPDF_INSTALL_HINT)
+        sys.exit(1)
+
+    errors = []
+    if stale:
+        print(f"Rendering {len(stale)} new or changed essay(s) first...")
+        print("=" * 60)
+        _, _, errors = process_html_files(html_dir, output_dir, css_file,
+                                          create_pdf=True, create_epub=False, html_files=stale)
+        print("=" * 60)
+    else:
+        print("All essay PDFs are up to date")
+
+    metadata_store = MetadataStore(html_dir)
+    for code, files in volumes.items():
+        start = time.perf_counter()
+        result = assemble_volume(code, files, html_dir, pdf_dir, volume_dir, metadata_store)
+        elapsed = time.perf_counter() - start
+        print(f"✓ {volume_title(code)}: {result['essays']} essays, {result['pages']} pages "
+              f"({result['toc_pages']} contents) in {elapsed:.1f}s -> {result['path']}")
+        if result['missing']:
+            print(f"  ✗ Left out (no final PDF): {', '.join(result['missing'])}")
+        if args.optimize_pdf:
+            optimized = pdf_optimize.optimize_pdf(result['path'])
+            if optimized['problems']:
+                print(f"  ✗ Optimized volume failed verification, kept original: "
+                      f"{'; '.join(optimized['problems'])}")
+            else:
+                print(f"  ✓ Optimized: {optimized['original_bytes']:,} -> {optimized['optimized_bytes']:,} bytes, "
+                      f"{optimized['duplicate_streams']} duplicate streams merged")
+
+    if errors:
+        print(f"\nErrors encountered ({len(errors)}):")
+        for error in errors:
+            print(f"  - {error}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Internal Anchor Checker
+
+Verifies, without network access, that every in-document link of an essay
+points at an element that exists: the ``#fnN``/``#fnrefN`` footnote pairs,
+``#figure-N`` references and the back-links that ``add_footnote_backlinks``
+and ``add_figure_backlinks`` add during conversion. htmlproofer runs in CI
+with ``--allow-missing-href`` and none of the Python tools looked at
+fragments before.
+
+Each essay is scanned once: one pass over its tags builds an id -> element
+index (``id`` attributes and ``<a name>``) and collects every ``href``.
+Fragment links are resolved against the index; links to
+``#/essays/<annotation id>`` on the edition site must name an essay in the
+HTML directory.
+
+With ``--prepared`` the essays are first run through
+``prepare_html_for_conversion``, so the links added during conversion are
+checked too (line numbers then refer to the prepared document).
+
+Key Features:
+- Missing targets, duplicate ids and empty ``#`` back-links
+- Cross-essay ``#/essays/ann_...`` references
+- Source HTML or prepared conversion output
+- Essays checked in parallel (``--workers``)
+
+Usage:
+    python check_anchors.py [--html-dir ../html] [--workers 4]
+    python check_anchors.py --prepared
+"""
+import io
+import os
+import re
+import sys
+import argparse
+from collections import Counter
+from contextlib import redirect_stdout
+from functools import partial
+from typing import List, Dict, Tuple, Optional, Any
+from urllib.parse import unquote
+
+from check_pool import map_in_order, add_workers_argument
+from html_tags import TAG_PATTERN, ATTRIBUTE_PATTERN, attribute_value
+
+# Tags that can carry an id, a link or a name; anything else is skipped
+# before its attributes are tokenized
+ANCHOR_ATTRIBUTE_PATTERN = re.compile(r'(?:id|href|name)\s*=', re.IGNORECASE)
+
+# Essay links on the edition site (the corpus uses several hosts and http/https)
+ESSAY_LINK_PATTERN = re.compile(r'^(?:https?://[^/#]*makingandknowing\.org/?)?#/essays/(.*)$')
+
+# Problem categories, in report order
+MISSING_TARGET = 'missing target'
+UNKNOWN_ESSAY = 'unknown essay'
+DUPLICATE_ID = 'duplicate id'
+EMPTY_FRAGMENT = 'empty fragment'
+
+
+def scan_anchors(content: str) -> Tuple[Dict[str, Tuple[str, int]], List[Tuple[str, int]], List[Tuple[str, int]]]:
+    """
+    Index the ids of a document and collect its links in one pass.
+
+    Args:
+        content (str): HTML content
+
+    Returns:
+        tuple: (id -> (tag name, line) of its first element,
+            (id, line) of every repeated id, (href, line) of every link)
+    """
+    ids: Dict[str, Tuple[str, int]] = {}
+    duplicates: List[Tuple[str, int]] = []
+    hrefs: List[Tuple[str, int]] = []
+
+    line = 1
+    position = 0
+    for match in TAG_PATTERN.finditer(content):
+        attributes = match.group(2)
+        if not ANCHOR_ATTRIBUTE_PATTERN.search(attributes):
+            continue
+        line += content.count('\n', position, match.start())
+        position = match.start()
+
+        tag = match.group(1).lower()
+        targets = []
+        for attribute in ATTRIBUTE_PATTERN.finditer(attributes):
+            name = attribute.group(1).lower()
+            if name not in ('id', 'href', 'name'):
+                continue
+            value = attribute_value(attribute)[0]
+            if name == 'href':
+                hrefs.append((value, line))
+            elif (name == 'id' or tag == 'a') and value not in targets:
+                # <a id="x" name="x"> is one target, not a duplicate
+                targets.append(value)
+        for value in targets:
+            if value in ids:
+                duplicates.append((value, line))
+            else:
+                ids[value] = (tag, line)
+    return ids, duplicates, hrefs
+
+
+def check_content(content: str, essays: frozenset) -> List[Tuple[str, int, str, str]]:
+    """
+    Check the internal links of one document.
+
+    Args:
+        content (str): HTML content
+        essays (frozenset): Annotation ids of all essays (for cross-essay links)
+
+    Returns:
+        list: (category, line, href or id, message) of every problem
+    """
+    ids, duplicates, hrefs = scan_anchors(content)
+    problems = []
+
+    for value, line in duplicates:
+        problems.append((DUPLICATE_ID, line, value, f'id "{value}" is used more than once '
+                                                    f'(first on line {ids[value][1]})'))
+
+    for href, line in hrefs:
+        href = href.strip()
+        essay_link = ESSAY_LINK_PATTERN.match(href)
+        if essay_link:
+            essay = unquote(essay_link.group(1)).split('/')[0]
+            if essay not in essays:
+                problems.append((UNKNOWN_ESSAY, line, href, f'no essay "{essay}"'))
+        elif href == '#':
+            problems.append((EMPTY_FRAGMENT, line, href, 'link to "#" (no target)'))
+        elif href.startswith('#'):
+            fragment = unquote(href[1:])
+            if fragment not in ids:
+                problems.append((MISSING_TARGET, line, href, f'no element with id "{fragment}"'))
+    return sorted(problems, key=lambda problem: problem[1])
+
+
+def check_essay(html_path: str, essays: frozenset, prepared: bool = False,
+                css_file: Optional[str] = None) -> Tuple[List[Tuple[str, int, str, str]], Optional[str]]:
+    """
+    Check one essay file (runs in a worker process).
+
+    Args:
+        html_path (str): Path to the essay
+        essays (frozenset): Annotation ids of all essays
+        prepared (bool): Check the output of ``prepare_html_for_conversion``
+            instead of the source
+        css_file (str): Stylesheet for the preparation
+
+    Returns:
+        tuple: (problems, error) where problems holds (category, line, href
+            or id, message) of every problem and error is the message of a
+            read, decode or preparation error (None if the essay was checked)
+    """
+    try:
+        if prepared:
+            content = _prepare(html_path, css_file)
+        else:
+            with open(html_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+    except Exception as e:
+        return [], str(e)
+    return check_content(content, essays), None
+
+
+_metadata_stores: Dict[str, Any] = {}
+
+
+def _prepare(html_path: str, css_file: str) -> str:
+    """Prepared HTML of an essay; metadata is loaded once per worker."""
+    from convert_to_pdf_epub import prepare_html_for_conversion, MetadataStore
+
+    html_dir = os.path.dirname(html_path)
+    if html_dir not in _metadata_stores:
+        _metadata_stores[html_dir] = MetadataStore(html_dir)
+    with redirect_stdout(io.StringIO()):
+        return prepare_html_for_conversion(html_path, css_file, html_dir,
+                                           metadata_store=_metadata_stores[html_dir])
+
+
+def main():
+    """Check the internal links of every essay."""
+    parser = argparse.ArgumentParser(description='Check in-document and cross-essay links')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--prepared', action='store_true',
+                       help='Check the prepared conversion output instead of the source HTML')
+    add_workers_argument(parser)
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    html_files = sorted(name for name in os.listdir(html_dir) if name.endswith('.html'))
+    essays = frozenset(os.path.splitext(name)[0] for name in html_files)
+    css_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'academic-print.css')
+
+    source = "prepared output" if args.prepared else "source HTML"
+    print(f"Checking internal links in {len(html_files)} essays ({source})")
+    print("=" * 60)
+
+    check = partial(check_essay, essays=essays, prepared=args.prepared, css_file=css_file)
+    results = map_in_order(check, [os.path.join(html_dir, name) for name in html_files], args.workers)
+
+    totals: Counter = Counter()
+    errors = 0
+    for name, (problems, error) in zip(html_files, results):
+        if error is not None:
+            print(f"\n{name}:")
+            print(f"  ✗ could not be checked: {error}")
+            errors += 1
+            continue
+        if not problems:
+            continue
+        print(f"\n{name}:")
+        for category, line, _, message in problems:
+            print(f"  ✗ line {line}: {category}: {message}")
+            totals[category] += 1
+
+    print("\n" + "=" * 60)
+    if not totals and not errors:
+        print(f"✓ All internal links resolve in {len(html_files)} essays")
+        return
+    if errors:
+        print(f"{errors} of {len(html_files)} essays could not be checked")
+    essays_with_problems = sum(1 for problems, _ in results if problems)
+    print(f"{sum(totals.values())} problems in {essays_with_problems} of {len(html_files)} essays:")
+    for category in (MISSING_TARGET, UNKNOWN_ESSAY, DUPLICATE_ID, EMPTY_FRAGMENT):
+        if totals[category]:
+            print(f"  {category}: {totals[category]}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
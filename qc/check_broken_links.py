@@ -22,6 +22,7 @@ Dependencies:
 
 Usage:
     python check_broken_links.py
+    python check_broken_links.py --changed-since HEAD   # re-extract links of changed files only
 
 Output:
     broken_links_report.txt - Detailed report with categorized results
@@ -29,6 +30,7 @@ Output:
 
 import os
 import re
+import sys
 import requests
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
@@ -37,6 +39,10 @@ from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
 from urllib.parse import urlparse
+import argparse
+
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, run_cached
 
 def extract_links_from_html(file_path):
     """
@@ -52,8 +58,9 @@ def extract_links_from_html(file_path):
         file_path (str): Path to the HTML file to parse
         
     Returns:
-        list: List of tuples (link_type, url) where link_type is one of:
-              'link', 'image', 'local_image', 'resource'
+        tuple: (links, error) where links is a list of tuples (link_type, url)
+               with link_type one of 'link', 'image', 'local_image',
+               'resource', and error is the read error message or None
     """
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
@@ -85,10 +92,10 @@ def extract_links_from_html(file_path):
             if href.startswith('http'):
                 links.append(('resource', href))
         
-        return links
+        return links, None
     except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return []
+        # Returned rather than printed, so cached results still report it
+        return [], str(e)
 
 # Global rate limiting data structures
 # Each domain gets its own lock to prevent race conditions in parallel processing
@@ -256,6 +263,11 @@ def main():
     4. Check remote URLs in parallel batches with rate limiting
     5. Generate comprehensive report with categorized results
     """
+    parser = argparse.ArgumentParser(description='Check HTML files for broken links and missing images')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
     html_dir = '../html'
     
     # Validate that the HTML directory exists
@@ -273,10 +285,19 @@ def main():
     total_links = 0
     
     # Phase 1: Extract all links from HTML files
+    # Extraction runs in worker processes; files whose content hasn't
+    # changed reuse the links cached by an earlier run
     print("Phase 1: Extracting links from HTML files...")
-    for html_file in html_files:
-        file_path = os.path.join(html_dir, html_file)
-        links = extract_links_from_html(file_path)
+    file_paths = [os.path.join(html_dir, html_file) for html_file in html_files]
+    try:
+        extracted = run_cached(extract_links_from_html, file_paths, 'check_broken_links',
+                               checker_version(extract_links_from_html), args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for html_file, file_path, (links, error) in zip(html_files, file_paths, extracted):
+        if error is not None:
+            print(f"Error reading {file_path}: {error}")
         all_links[html_file] = links
         total_links += len(links)
         print(f"Found {len(links)} links/images in {html_file}")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Result Cache for the Per-File QC Checks
+
+Most commits touch one or two essays, yet every QC script used to re-check
+all of them. The per-file results of the well-formedness, encoding and
+link-extraction checks are stored in a SQLite database under
+(checker, checker version, content hash), so a file is only checked again
+when its content or the checker changes.
+
+The content hash is the file's git blob id (the id ``git hash-object``
+prints). With ``--changed-since <ref>`` only the files that differ from
+``<ref>`` (or are untracked) are read and hashed; the ids of all other
+files are taken from ``git ls-tree <ref>``, and their results come from
+the cache. Files without a cached result are checked either way, so the
+report is always complete and identical to a full run.
+
+The checker version is a hash of the source of the checker's modules, so
+editing a check invalidates its cached results without a manual bump.
+
+Key Features:
+- Shared cache for every per-file checker (``.qc_cache.sqlite``)
+- ``--changed-since <git ref>`` for pre-commit runs
+- Uncached files are checked in parallel (see ``check_pool.py``)
+
+Usage:
+    version = checker_version(check_file, scan_structure, decode_html)
+    results = cached_map_in_order(check_file, html_files, 'comprehensive', version,
+                                  workers=args.workers, changed_since=args.changed_since)
+"""
+import os
+import json
+import sqlite3
+import inspect
+import hashlib
+import subprocess
+from typing import Callable, List, Dict, Any, Optional, Sequence, Set, Tuple
+
+from check_pool import map_in_order
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.qc_cache.sqlite')
+
+
+def blob_id(data: bytes) -> str:
+    """Git blob id of some content (as printed by ``git hash-object``)."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def file_blob_id(file_path: str) -> Optional[str]:
+    """Git blob id of a file, or None if it can't be read."""
+    try:
+        with open(file_path, 'rb') as f:
+            return blob_id(f.read())
+    except OSError:
+        return None
+
+
+def checker_version(*objects) -> str:
+    """
+    Version of a checker: a hash of the source files that define it.
+
+    Args:
+        *objects: Functions or modules whose code determines the check
+            results (the check itself and the helpers it uses)
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha1()
+    for source_file in sorted({inspect.getfile(obj) for obj in objects}):
+        with open(source_file, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def _git(args: List[str], cwd: str) -> bytes:
+    return subprocess.run(['git'] + args, cwd=cwd, capture_output=True, check=True).stdout
+
+
+def changed_files(file_paths: Sequence[str], ref: str) -> Tuple[Set[str], Dict[str, str]]:
+    """
+    Find the files that differ from a git revision.
+
+    Args:
+        file_paths (sequence): Paths of the files to check
+        ref (str): Git revision (e.g. 'HEAD', 'main')
+
+    Returns:
+        tuple: (real paths of changed or untracked files, blob id at
+            ``ref`` of every other file by real path)
+
+    Raises:
+        ValueError: The files are not in a git repository or ``ref`` is
+            unknown
+    """
+    directories = sorted({os.path.dirname(os.path.realpath(path)) for path in file_paths})
+    if not directories:
+        return set(), {}
+    try:
+        top = _git(['rev-parse', '--show-toplevel'], directories[0]).decode().strip()
+        _git(['rev-parse', '--verify', '--quiet', f"{ref}^{{commit}}"], top)
+        pathspecs = ['--'] + [os.path.relpath(directory, top) for directory in directories]
+        diff = _git(['diff', '--name-only', '-z', ref] + pathspecs, top)
+        untracked = _git(['ls-files', '--others', '--exclude-standard', '-z'] + pathspecs, top)
+        tree = _git(['ls-tree', '-r', '-z', ref] + pathspecs, top)
+    except (OSError, subprocess.CalledProcessError):
+        raise ValueError(f"cannot compare with git revision '{ref}'")
+
+    def absolute(name: bytes) -> str:
+        return os.path.join(top, os.fsdecode(name))
+
+    changed = {absolute(name) for name in (diff + untracked).split(b'\0') if name}
+    at_ref = {}
+    for entry in tree.split(b'\0'):
+        if not entry:
+            continue
+        info, name = entry.split(b'\t', 1)
+        _, kind, sha = info.split()
+        if kind == b'blob':
+            at_ref[absolute(name)] = sha.decode()
+    unchanged = {path: sha for path, sha in at_ref.items() if path not in changed}
+    return changed, unchanged
+
+
+class ResultCache:
+    """
+    Persistent per-file results of one checker version.
+
+    Results are stored as JSON, so tuples come back as lists.
+    """
+
+    def __init__(self, checker: str, version: str, path: str = DEFAULT_CACHE_PATH):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            checker (str): Checker name
+            version (str): Checker version (see ``checker_version``)
+            path (str): SQLite database file
+        """
+        self.checker = checker
+        self.version = version
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "checker TEXT, version TEXT, content_hash TEXT, result TEXT, "
+            "PRIMARY KEY (checker, version, content_hash))"
+        )
+
+    def get_many(self, content_hashes: Sequence[str]) -> Dict[str, Any]:
+        """Cached results by content hash (missing hashes are left out)."""
+        found = {}
+        hashes = list(set(content_hashes))
+        # Stay below SQLite's limit on query parameters
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.connection.execute(
+                f"SELECT content_hash, result FROM results WHERE checker = ? AND version = ? "
+                f"AND content_hash IN ({placeholders})",
+                [self.checker, self.version] + batch
+            )
+            for content_hash, result in rows:
+                found[content_hash] = json.loads(result)
+        return found
+
+    def put_many(self, results: Dict[str, Any]) -> None:
+        """Store results by content hash, dropping results of older versions."""
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM results WHERE checker = ? AND version != ?",
+                (self.checker, self.version)
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                [(self.checker, self.version, content_hash, json.dumps(result))
+                 for content_hash, result in results.items()]
+            )
+
+    def close(self) -> None:
+        """Close the database."""
+        self.connection.close()
+
+
+def add_cache_arguments(parser) -> None:
+    """Add ``--changed-since``, ``--no-cache`` and ``--cache`` to a checker's argument parser."""
+    parser.add_argument('--changed-since', metavar='GIT_REF',
+                       help='Only check files changed since this git revision; '
+                            'results for the other files come from the cache')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Check every file and leave the result cache untouched')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                       help='Result cache database (default: .qc_cache.sqlite next to the scripts)')
+
+
+def cached_map_in_order(function: Callable[[Any], Any], file_paths: Sequence[Any], checker: str,
+                        version: str, workers: Optional[int] = None, changed_since: Optional[str] = None,
+                        use_cache: bool = True, cache_path: str = DEFAULT_CACHE_PATH) -> List[Any]:
+    """
+    Apply a per-file check to every file, reusing cached results.
+
+    Args:
+        function (callable): Module-level check taking a file path; its
+            result must be JSON-serializable and depend only on the file
+            content
+        file_paths (sequence): Files to check (str or Path)
+        checker (str): Checker name in the cache
+        version (str): Checker version (see ``checker_version``)
+        workers (int): Worker processes for the uncached files
+        changed_since (str): Git revision; only files changed since it are
+            read, the others are looked up by their blob id at that revision
+        use_cache (bool): Read and update the cache
+        cache_path (str): SQLite database file
+
+    Returns:
+        list: Results in the order of ``file_paths``
+
+    Raises:
+        ValueError: ``changed_since`` can't be resolved with git
+    """
+    if not use_cache:
+        return map_in_order(function, file_paths, workers)
+
+    known: Dict[str, str] = {}
+    if changed_since:
+        _, known = changed_files([str(path) for path in file_paths], changed_since)
+    hashes = [known.get(os.path.realpath(path)) or file_blob_id(str(path)) for path in file_paths]
+
+    cache = ResultCache(checker, version, cache_path)
+    try:
+        cached = cache.get_many([content_hash for content_hash in hashes if content_hash])
+        missing = [i for i, content_hash in enumerate(hashes) if content_hash not in cached]
+        fresh = map_in_order(function, [file_paths[i] for i in missing], workers)
+
+        results = [cached.get(content_hash) for content_hash in hashes]
+        new_results = {}
+        for i, result in zip(missing, fresh):
+            results[i] = result
+            if hashes[i]:
+                new_results[hashes[i]] = result
+        if new_results:
+            cache.put_many(new_results)
+    finally:
+        cache.close()
+    return results
+
+
+def run_cached(function: Callable[[Any], Any], file_paths: Sequence[Any], checker: str,
+               version: str, args) -> List[Any]:
+    """
+    ``cached_map_in_order`` with the options of a checker's command line.
+
+    Args:
+        function (callable): Module-level per-file check
+        file_paths (sequence): Files to check
+        checker (str): Checker name in the cache
+        version (str): Checker version
+        args (Namespace): Parsed arguments with ``--workers`` and the cache
+            arguments
+
+    Returns:
+        list: Results in the order of ``file_paths``
+    """
+    return cached_map_in_order(function, file_paths, checker, version,
+                               workers=args.workers, changed_since=args.changed_since,
+                               use_cache=not args.no_cache, cache_path=args.cache)
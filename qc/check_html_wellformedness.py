@@ -11,10 +11,14 @@ This script checks all HTML files in the html directory for:
 """
 import os
 import sys
+import argparse
 from html.parser import HTMLParser
 from pathlib import Path
 import re
 
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, run_cached
+
 class HTMLWellFormednessChecker(HTMLParser):
     def __init__(self):
         super().__init__()
@@ -104,9 +108,7 @@ def check_file_encoding(file_path):
         return None, f"File read error: {e}"
 
 def check_html_file(file_path):
-    """Check a single HTML file for well-formedness"""
-    print(f"Checking: {os.path.basename(file_path)}")
-    
+    """Check a single HTML file for well-formedness (runs in a worker, so it doesn't print)"""
     # Check file encoding
     content, encoding_error = check_file_encoding(file_path)
     if encoding_error:
@@ -142,6 +144,11 @@ def check_html_file(file_path):
     }
 
 def main():
+    parser = argparse.ArgumentParser(description='Check all HTML files for well-formedness')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
     html_dir = '../html'
     
     if not os.path.exists(html_dir):
@@ -170,9 +177,18 @@ def main():
     files_with_warnings = 0
     files_ok = 0
     
-    # Check each file
-    for file_path in html_files:
-        result = check_html_file(file_path)
+    # Check the files in parallel (reusing cached results); results come
+    # back in file order
+    try:
+        file_results = run_cached(check_html_file, html_files, 'check_html_wellformedness',
+                                  checker_version(check_html_file), args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    for file_path, result in zip(html_files, file_results):
+        result['file'] = file_path
+        print(f"Checking: {os.path.basename(file_path)}")
         results.append(result)
         
         if result['status'] == 'ERRORS':
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Parallel Execution for the Per-File Checks
+
+Runs a per-file check function over many files in a process pool and
+returns the results in the order of the input, so a checker can print its
+report exactly as a serial run would. The check functions therefore must
+not print; the caller prints from the ordered results.
+
+Key Features:
+- Order-preserving ``ProcessPoolExecutor.map`` with batched submission
+- ``workers=1`` runs in-process (no pool, for debugging and profiling)
+- ``--workers`` argument shared by the checkers
+
+Usage:
+    results = map_in_order(check_html_file, html_files, args.workers)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Any, Sequence, Optional
+
+# Tasks per worker; several per worker keep the pool busy when a few files
+# are much larger than the rest
+TASKS_PER_WORKER = 4
+
+
+def default_workers() -> int:
+    """Number of worker processes to use by default (one per CPU)."""
+    return os.cpu_count() or 1
+
+
+def add_workers_argument(parser) -> None:
+    """Add the ``--workers`` option to a checker's argument parser."""
+    parser.add_argument('--workers', type=int, default=default_workers(),
+                       help='Check files in this many worker processes '
+                            '(default: number of CPUs, 1 = in-process)')
+
+
+def map_in_order(function: Callable[[Any], Any], items: Sequence[Any],
+                 workers: Optional[int] = None) -> List[Any]:
+    """
+    Apply a function to every item, in parallel, keeping the input order.
+
+    Args:
+        function (callable): Module-level function (it is pickled to the
+            workers)
+        items (sequence): Arguments, one call per item
+        workers (int): Worker processes; None for one per CPU, 1 or less
+            to run in-process
+
+    Returns:
+        list: ``function(item)`` for every item, in input order
+    """
+    if workers is None:
+        workers = default_workers()
+    workers = min(workers, len(items))
+    if workers <= 1:
+        return [function(item) for item in items]
+
+    chunksize = max(1, len(items) // (workers * TASKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(function, items, chunksize=chunksize))
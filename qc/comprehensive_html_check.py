@@ -5,12 +5,16 @@ Analyzes all HTML files in the directory for structural issues and encoding prob
 """
 
 import os
-import re
 import sys
+import argparse
 from pathlib import Path
 from collections import defaultdict
 import html
-import chardet
+
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, run_cached
+from html_encoding import decode_html
+from html_structure import scan_structure
 
 def analyze_html_structure(content, filename):
     """Analyze HTML structure and return detailed findings."""
@@ -20,33 +24,25 @@ def analyze_html_structure(content, filename):
         'info': []
     }
     
+    # One pass over the document collects what every rule below needs
+    scan = scan_structure(content)
+    
     # Check for DOCTYPE
-    if not re.search(r'<!DOCTYPE\s+html', content, re.IGNORECASE):
+    if not scan.doctype:
         findings['errors'].append("Missing DOCTYPE declaration")
     
     # Check for basic HTML structure
-    if not re.search(r'<html\b', content, re.IGNORECASE):
-        findings['errors'].append("Missing <html> tag")
-    
-    if not re.search(r'<head\b', content, re.IGNORECASE):
-        findings['errors'].append("Missing <head> tag")
-    
-    if not re.search(r'<body\b', content, re.IGNORECASE):
-        findings['errors'].append("Missing <body> tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.opened:
+            findings['errors'].append(f"Missing <{tag}> tag")
     
     # Check for closing tags
-    if not re.search(r'</html>', content, re.IGNORECASE):
-        findings['errors'].append("Missing </html> closing tag")
-    
-    if not re.search(r'</head>', content, re.IGNORECASE):
-        findings['errors'].append("Missing </head> closing tag")
-    
-    if not re.search(r'</body>', content, re.IGNORECASE):
-        findings['errors'].append("Missing </body> closing tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.closed:
+            findings['errors'].append(f"Missing </{tag}> closing tag")
     
     # Check for meta charset
-    charset_pattern = r'<meta\s+[^>]*charset\s*=\s*["\']?([^"\'>\s]+)'
-    charset_matches = re.findall(charset_pattern, content, re.IGNORECASE)
+    charset_matches = scan.charsets
     
     if not charset_matches:
         findings['warnings'].append("No charset declaration found in meta tags")
@@ -56,21 +52,18 @@ def analyze_html_structure(content, filename):
                 findings['warnings'].append(f"Non-UTF-8 charset declared: {charset}")
     
     # Check for title tag
-    if not re.search(r'<title\b', content, re.IGNORECASE):
+    if 'title' not in scan.opened:
         findings['warnings'].append("Missing <title> tag")
     
     # Check for common unclosed tags (simplified approach)
     void_elements = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 
                      'link', 'meta', 'param', 'source', 'track', 'wbr'}
     
-    # Find all opening and closing tags
-    tag_pattern = r'<(/?)(\w+)(?:\s[^>]*)?/?>'
-    tags = re.findall(tag_pattern, content, re.IGNORECASE)
+    # All opening and closing tags, names lowercased
+    tags = scan.tags
     
     tag_stack = []
     for is_closing, tag_name in tags:
-        tag_name = tag_name.lower()
-        
         if is_closing:  # Closing tag
             if tag_stack and tag_stack[-1] == tag_name:
                 tag_stack.pop()
@@ -90,16 +83,14 @@ def analyze_html_structure(content, filename):
     
     # Check for common HTML issues
     # Check for empty head
-    head_content = re.search(r'<head\b[^>]*>(.*?)</head>', content, re.IGNORECASE | re.DOTALL)
-    if head_content:
-        head_inner = head_content.group(1).strip()
+    if scan.head_content is not None:
+        head_inner = scan.head_content.strip()
         if not head_inner:
             findings['warnings'].append("Empty <head> section")
     
     # Check for malformed attributes (basic check)
-    malformed_attrs = re.findall(r'<\w+[^>]*=[^"\'\s][^>\s]*[^"\'>]', content)
-    if malformed_attrs:
-        findings['warnings'].append(f"Potentially malformed attributes found: {len(malformed_attrs)} instances")
+    if scan.malformed:
+        findings['warnings'].append(f"Potentially malformed attributes found: {scan.malformed} instances")
     
     # Statistical info
     findings['info'].append(f"File size: {len(content)} characters")
@@ -112,35 +103,48 @@ def check_file_encoding(file_path):
     issues = []
     
     try:
-        # First, try to detect encoding
         with open(file_path, 'rb') as f:
             raw_data = f.read()
         
-        detected = chardet.detect(raw_data)
+        # UTF-8 is decoded directly; the detector only runs for other files
+        decoded = decode_html(raw_data)
+        
+        # Check for BOM
+        if decoded.bom:
+            issues.append(f"File contains {decoded.bom.upper()} BOM")
         
-        # Try to read as UTF-8
-        try:
-            content = raw_data.decode('utf-8')
+        if not decoded.utf8:
+            issues.append(f"File is not valid UTF-8 (detected as {decoded.detected or decoded.encoding})")
             
-            # Check for BOM
-            if content.startswith('\ufeff'):
-                issues.append("File contains UTF-8 BOM")
-                
-        except UnicodeDecodeError:
-            issues.append(f"File is not valid UTF-8 (detected as {detected['encoding']})")
-            # Try with detected encoding
-            try:
-                content = raw_data.decode(detected['encoding'])
-            except:
-                content = raw_data.decode('latin-1', errors='replace')
+            # Check declared charsets against the actual encoding (in a UTF-8
+            # file a mismatch is a non-UTF-8 declaration, already a warning)
+            for charset in decoded.mismatched:
+                issues.append(f"Declared charset {charset} does not match actual encoding {decoded.encoding}")
         
-        return content, issues
+        return decoded.content, issues
         
     except Exception as e:
         issues.append(f"Could not read file: {e}")
         return None, issues
 
+def check_file(file_path):
+    """
+    Run the encoding and structure checks on one file (in a worker process).
+    
+    Returns (readable, encoding_issues, findings); findings is None for a
+    file that could not be read.
+    """
+    content, encoding_issues = check_file_encoding(file_path)
+    if content is None:
+        return False, encoding_issues, None
+    return True, encoding_issues, analyze_html_structure(content, file_path.name)
+
 def main():
+    parser = argparse.ArgumentParser(description='Comprehensive HTML well-formedness check')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
     html_dir = Path('/Users/thc4/Github/m-k-annotation-data/html')
     
     print("HTML Well-formedness Check")
@@ -170,23 +174,26 @@ def main():
     issue_summary = defaultdict(int)
     problem_files = []
     
+    # Check encoding and structure in parallel (reusing cached results);
+    # results come back in file order
+    try:
+        results = run_cached(check_file, html_files, 'comprehensive_html_check',
+                             checker_version(check_file, scan_structure, decode_html), args)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return
+    
     # Process all files
-    for i, file_path in enumerate(html_files):
+    for i, (file_path, (readable, encoding_issues, findings)) in enumerate(zip(html_files, results)):
         print(f"Processing {i+1}/{total_files}: {file_path.name}")
         
-        # Check encoding
-        content, encoding_issues = check_file_encoding(file_path)
-        
-        if content is None:
+        if not readable:
             stats['encoding_issues'] += 1
             problem_files.append((file_path.name, "Could not read file"))
             continue
         
         stats['readable_files'] += 1
         
-        # Analyze structure
-        findings = analyze_html_structure(content, file_path.name)
-        
         # Update statistics
         if encoding_issues:
             stats['encoding_issues'] += 1
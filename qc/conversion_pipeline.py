@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+"""
+Single-Parse Multi-Variant PDF/EPUB Conversion
+
+The four converter scripts (``convert_to_pdf_epub.py`` and its ``_original``,
+``_footnotes`` and ``_simple_footnotes`` siblings) differ only in the
+footnote transforms they apply and the stylesheet they embed. This pipeline
+reads, parses and fixes up each essay once, renders its frontmatter once,
+and then produces every requested variant from a copy of that shared tree.
+
+Variants:
+- enhanced:         Enhanced endnotes, figure links and back-links
+                    (convert_to_pdf_epub.py, academic-print.css)
+- footnotes:        Endnotes converted to page footnotes
+                    (convert_to_pdf_epub_footnotes.py, academic-print-footnotes.css)
+- simple-footnotes: Endnotes with improved superscript formatting
+                    (convert_to_pdf_epub_simple_footnotes.py, academic-print-simple-footnotes.css)
+- original:         No footnote transforms
+                    (convert_to_pdf_epub_original.py, academic-print.css)
+
+Key Features:
+- Shared read, parse, structure, image path and frontmatter work per essay
+- Pluggable transform stages and stylesheet per variant
+- One output directory per variant
+- Per-essay timing record with shared and per-variant stages
+
+Usage:
+    python conversion_pipeline.py [--variants enhanced,footnotes] [--pdf-only] [--epub-only]
+                                  [--output-dir OUTPUT] [--html-dir DIR]
+"""
+import os
+import sys
+import copy
+import argparse
+import tempfile
+from typing import List, Tuple, Optional, Dict, Any, Callable
+
+from bs4 import BeautifulSoup
+
+from convert_to_pdf_epub import (check_dependencies, normalize_document, create_frontmatter_nodes,
+                                 convert_to_pdf, convert_to_epub, MetadataStore, enhance_footnote_formatting,
+                                 link_figure_references, clean_external_links,
+                                 add_figure_backlinks, add_footnote_backlinks)
+from convert_to_pdf_epub_footnotes import convert_endnotes_to_footnotes
+from convert_to_pdf_epub_simple_footnotes import improve_footnote_formatting
+from conversion_timing import (StageTimer, RSSSampler, write_timing_report,
+                               summarize_timings, format_timing_summary)
+
+
+def endnotes_to_footnotes(soup: BeautifulSoup) -> int:
+    """
+    Transform stage wrapping ``convert_endnotes_to_footnotes``.
+
+    Args:
+        soup (BeautifulSoup): Parsed HTML document (modified in place)
+
+    Returns:
+        int: Number of footnotes created
+    """
+    convert_endnotes_to_footnotes(soup)
+    return len(soup.find_all('span', class_='footnote-container'))
+
+
+# Transform stages are (stage name, function) pairs; each function modifies
+# the soup in place and returns a count recorded as a counter of that stage.
+TransformStage = Tuple[str, Callable[[BeautifulSoup], int]]
+
+VARIANTS: Dict[str, Dict[str, Any]] = {
+    'enhanced': {
+        'description': 'Enhanced footnote formatting',
+        'css': ['academic-print.css'],
+        'transforms': [
+            ('footnote_formatting', enhance_footnote_formatting),
+            ('figure_links', link_figure_references),
+            ('external_links', clean_external_links),
+            ('figure_backlinks', add_figure_backlinks),
+            ('footnote_backlinks', add_footnote_backlinks),
+        ],
+    },
+    'footnotes': {
+        'description': 'Endnotes converted to footnotes',
+        'css': ['academic-print-footnotes.css', 'academic-print.css'],
+        'transforms': [
+            ('endnotes_to_footnotes', endnotes_to_footnotes),
+        ],
+    },
+    'simple-footnotes': {
+        'description': 'Simple footnote formatting',
+        'css': ['academic-print-simple-footnotes.css', 'academic-print.css'],
+        'transforms': [
+            ('footnote_formatting', improve_footnote_formatting),
+        ],
+    },
+    'original': {
+        'description': 'Original formatting',
+        'css': ['academic-print.css'],
+        'transforms': [],
+    },
+}
+
+
+def resolve_variant_css(variant: str, css_dir: str) -> str:
+    """
+    Find the stylesheet of a variant, falling back like the converter scripts.
+
+    Args:
+        variant (str): Variant name (key of ``VARIANTS``)
+        css_dir (str): Directory containing the CSS files
+
+    Returns:
+        str: Path to the first existing stylesheet
+
+    Raises:
+        FileNotFoundError: If none of the variant's stylesheets exist
+    """
+    for name in VARIANTS[variant]['css']:
+        css_file = os.path.join(css_dir, name)
+        if os.path.exists(css_file):
+            return css_file
+    raise FileNotFoundError(f"CSS file not found for variant '{variant}': "
+                            f"{os.path.join(css_dir, VARIANTS[variant]['css'][0])}")
+
+
+def prepare_shared_document(html_file_path: str, timer: StageTimer,
+                            metadata_store: Optional[MetadataStore] = None
+                            ) -> Tuple[BeautifulSoup, list]:
+    """
+    Do the variant-independent preparation of one essay.
+
+    Reads and parses the HTML, fixes up the document structure, removes
+    external stylesheet links, makes relative image paths absolute and
+    builds the frontmatter nodes from the metadata.
+
+    Args:
+        html_file_path (str): Path to the HTML file to process
+        timer (StageTimer): Timer to record the shared stages in
+        metadata_store (MetadataStore): Optional already loaded metadata
+
+    Returns:
+        tuple: (base soup, frontmatter nodes, empty if there is no metadata)
+    """
+    annotation_id = os.path.splitext(os.path.basename(html_file_path))[0]
+
+    with timer.span('read'):
+        with open(html_file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    timer.count('html_bytes', len(content.encode('utf-8')))
+
+    with timer.span('parse'):
+        soup = BeautifulSoup(content, 'html.parser')
+
+    with timer.span('structure'):
+        soup = normalize_document(soup, html_file_path)
+
+    frontmatter_nodes = []
+    with timer.span('frontmatter'):
+        if metadata_store is not None:
+            frontmatter_nodes = create_frontmatter_nodes(soup, annotation_id,
+                                                         metadata_store.annotations_data,
+                                                         metadata_store.authors_data, metadata_store)
+
+    return soup, frontmatter_nodes
+
+
+def insert_frontmatter(soup: BeautifulSoup, frontmatter_nodes: list) -> None:
+    """
+    Insert a copy of the frontmatter, replacing the simple title structure.
+
+    Args:
+        soup (BeautifulSoup): Variant document (modified in place)
+        frontmatter_nodes (list): Frontmatter nodes shared by all variants
+    """
+    # Remove the existing simple title structure if present
+    existing_h1 = soup.body.find('h1')
+    existing_h4 = None
+    if existing_h1:
+        next_sibling = existing_h1.find_next_sibling()
+        if next_sibling and next_sibling.name == 'h4':
+            existing_h4 = next_sibling
+
+    # Insert frontmatter at the beginning of body
+    for element in reversed(frontmatter_nodes):
+        soup.body.insert(0, copy.copy(element))
+
+    # Remove old title elements if they exist
+    if existing_h1:
+        existing_h1.decompose()
+    if existing_h4:
+        existing_h4.decompose()
+
+
+def render_variant(soup: BeautifulSoup, frontmatter_nodes: list,
+                   html_file_path: str, variant: str, css_content: str, timer) -> str:
+    """
+    Apply one variant's stylesheet and transforms and serialize the result.
+
+    Args:
+        soup (BeautifulSoup): Copy of the shared document (modified in place)
+        frontmatter_nodes (list): Frontmatter nodes (copied), or an empty list
+        html_file_path (str): Path to the source HTML file
+        variant (str): Variant name (key of ``VARIANTS``)
+        css_content (str): Stylesheet to embed
+        timer: Timer (usually a ``PrefixedTimer``) for the variant's stages
+
+    Returns:
+        str: HTML content ready for conversion
+    """
+    with timer.span('css'):
+        style_tag = soup.new_tag('style', type='text/css')
+        style_tag.string = css_content
+        soup.head.append(style_tag)
+
+    for stage, transform in VARIANTS[variant]['transforms']:
+        with timer.span(stage):
+            count = transform(soup)
+        timer.count(stage, count or 0)
+
+    with timer.span('finalize'):
+        if frontmatter_nodes:
+            insert_frontmatter(soup, frontmatter_nodes)
+
+        # Add a title if missing
+        if not soup.title:
+            title_tag = soup.new_tag('title')
+            h1 = soup.find('h1')
+            if h1 and h1.get_text(strip=True):
+                title_tag.string = h1.get_text(strip=True)
+            else:
+                filename = os.path.basename(html_file_path)
+                title_tag.string = os.path.splitext(filename)[0].replace('_', ' ').title()
+            soup.head.append(title_tag)
+
+    with timer.span('serialize'):
+        prepared_html = str(soup)
+        soup.decompose()
+    timer.count('prepared_bytes', len(prepared_html.encode('utf-8')))
+
+    return prepared_html
+
+
+def prepare_variants(html_file_path: str, variants: List[str], css_contents: Dict[str, str],
+                     timer: Optional[StageTimer] = None,
+                     metadata_store: Optional[MetadataStore] = None) -> Dict[str, str]:
+    """
+    Prepare the HTML of several variants of one essay from a single parse.
+
+    Args:
+        html_file_path (str): Path to the HTML file to process
+        variants (list): Variant names to produce
+        css_contents (dict): Stylesheet text by variant name
+        timer (StageTimer): Optional timer; variant stages are recorded
+            as ``<variant>.<stage>``
+        metadata_store (MetadataStore): Optional already loaded metadata
+
+    Returns:
+        dict: Prepared HTML by variant name
+    """
+    timer = timer or StageTimer(os.path.splitext(os.path.basename(html_file_path))[0])
+    base_soup, frontmatter_nodes = prepare_shared_document(html_file_path, timer, metadata_store)
+
+    prepared = {}
+    for i, variant in enumerate(variants):
+        variant_timer = timer.prefixed(variant)
+        with variant_timer.span('copy'):
+            # The last variant can consume the shared tree itself
+            soup = base_soup if i == len(variants) - 1 else copy.copy(base_soup)
+        print(f"  [{variant}]")
+        prepared[variant] = render_variant(soup, frontmatter_nodes, html_file_path,
+                                           variant, css_contents[variant], variant_timer)
+
+    return prepared
+
+
+def convert_html_file_variants(html_path: str, variants: List[str], css_contents: Dict[str, str],
+                               output_dirs: Dict[str, Dict[str, Optional[str]]], temp_dir: str,
+                               timer: Optional[StageTimer] = None,
+                               metadata_store: Optional[MetadataStore] = None) -> Dict[str, List[str]]:
+    """
+    Convert a single HTML file to every requested variant.
+
+    Args:
+        html_path (str): Path to the HTML file
+        variants (list): Variant names to produce
+        css_contents (dict): Stylesheet text by variant name
+        output_dirs (dict): Per variant, {'pdf': dir or None, 'epub': dir or None}
+        temp_dir (str): Temporary directory for intermediate files
+        timer (StageTimer): Optional timer to record stage timings in
+        metadata_store (MetadataStore): Optional already loaded metadata
+
+    Returns:
+        dict: Error messages by variant name (empty lists on success)
+    """
+    html_file = os.path.basename(html_path)
+    base_name = os.path.splitext(html_file)[0]
+    timer = timer or StageTimer(base_name)
+    errors = {variant: [] for variant in variants}
+
+    try:
+        prepared = prepare_variants(html_path, variants, css_contents, timer, metadata_store)
+    except Exception as e:
+        error_msg = f"Error processing {html_file}: {e}"
+        print(f"  ✗ {error_msg}")
+        return {variant: [error_msg] for variant in variants}
+
+    for variant in variants:
+        variant_timer = timer.prefixed(variant)
+        pdf_dir = output_dirs[variant]['pdf']
+        epub_dir = output_dirs[variant]['epub']
+        prepared_html = prepared.pop(variant)
+
+        try:
+            if pdf_dir:
+                pdf_path = os.path.join(pdf_dir, f"{base_name}.pdf")
+                if convert_to_pdf(prepared_html, pdf_path, variant_timer):
+                    print(f"  ✓ {variant} PDF created: {pdf_path}")
+                else:
+                    print(f"  ✗ {variant} PDF conversion failed")
+                    errors[variant].append(f"{variant}: PDF conversion failed for {html_file}")
+
+            if epub_dir:
+                temp_html_path = os.path.join(temp_dir, f"{base_name}_{variant}_prepared.html")
+                temp_css_path = os.path.join(temp_dir, f"{variant}.css")
+                with variant_timer.span('write_temp'):
+                    with open(temp_html_path, 'w', encoding='utf-8') as f:
+                        f.write(prepared_html)
+                    # pandoc drops the embedded stylesheet and needs it as a file
+                    with open(temp_css_path, 'w', encoding='utf-8') as f:
+                        f.write(css_contents[variant])
+                epub_path = os.path.join(epub_dir, f"{base_name}.epub")
+                if convert_to_epub(temp_html_path, epub_path, temp_dir, variant_timer, temp_css_path):
+                    print(f"  ✓ {variant} EPUB created: {epub_path}")
+                else:
+                    print(f"  ✗ {variant} EPUB conversion failed")
+                    errors[variant].append(f"{variant}: EPUB conversion failed for {html_file}")
+        except Exception as e:
+            error_msg = f"{variant}: Error processing {html_file}: {e}"
+            print(f"  ✗ {error_msg}")
+            errors[variant].append(error_msg)
+
+    return errors
+
+
+def process_html_files_variants(html_dir: str, output_dir: str, variants: List[str],
+                                css_files: Dict[str, str], create_pdf: bool = True,
+                                create_epub: bool = True,
+                                timings: Optional[List[Dict[str, Any]]] = None
+                                ) -> Tuple[Dict[str, int], int, List[str]]:
+    """
+    Process all HTML files in the directory, producing every requested variant.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+        output_dir (str): Directory to save converted files (one subdirectory per variant)
+        variants (list): Variant names to produce
+        css_files (dict): Stylesheet path by variant name
+        create_pdf (bool): Whether to create PDF files
+        create_epub (bool): Whether to create EPUB files
+        timings (list): Optional list that receives one timing record per file
+
+    Returns:
+        tuple: (successful conversions by variant, total_files, error_list)
+    """
+    html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+    total_files = len(html_files)
+    successful = {variant: 0 for variant in variants}
+    errors = []
+
+    print(f"Found {total_files} HTML files to convert into {len(variants)} variant(s)")
+
+    # Create output directories
+    output_dirs = {}
+    for variant in variants:
+        variant_dir = os.path.join(output_dir, variant)
+        output_dirs[variant] = {
+            'pdf': os.path.join(variant_dir, 'pdfs') if create_pdf else None,
+            'epub': os.path.join(variant_dir, 'epubs') if create_epub else None,
+        }
+        for directory in output_dirs[variant].values():
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    # Read each stylesheet and the metadata once for the whole batch
+    css_contents = {}
+    for variant in variants:
+        with open(css_files[variant], 'r', encoding='utf-8') as f:
+            css_contents[variant] = f.read()
+    metadata_store = MetadataStore(html_dir)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for i, html_file in enumerate(html_files, 1):
+            base_name = os.path.splitext(html_file)[0]
+            html_path = os.path.join(html_dir, html_file)
+
+            print(f"Processing {i}/{total_files}: {html_file}")
+            timer = StageTimer(base_name)
+
+            with RSSSampler() as sampler:
+                file_errors = convert_html_file_variants(
+                    html_path, variants, css_contents, output_dirs, temp_dir,
+                    timer, metadata_store
+                )
+            timer.count('peak_rss_kb', sampler.peak_kb)
+
+            for variant, variant_errors in file_errors.items():
+                errors.extend(variant_errors)
+                if not variant_errors:
+                    successful[variant] += 1
+
+            failed = any(file_errors.values())
+            timer.stop('ok' if not failed else 'failed')
+            if timings is not None:
+                timings.append(timer.as_record())
+
+    return successful, total_files, errors
+
+
+def variant_seconds(records: List[Dict[str, Any]], variant: str) -> float:
+    """
+    Total time spent on one variant's own stages across all essays.
+
+    Args:
+        records (list): Records produced by ``StageTimer.as_record()``
+        variant (str): Variant name
+
+    Returns:
+        float: Seconds (excluding the shared stages)
+    """
+    prefix = f"{variant}."
+    return sum(seconds for record in records
+               for stage, seconds in record['stages'].items() if stage.startswith(prefix))
+
+
+def main():
+    """Main function that orchestrates the multi-variant conversion."""
+    parser = argparse.ArgumentParser(description='Convert HTML files to several PDF/EPUB variants from a single parse')
+    parser.add_argument('--variants', default=','.join(VARIANTS),
+                       help=f"Comma-separated variants to produce (default: {','.join(VARIANTS)})")
+    parser.add_argument('--pdf-only', action='store_true',
+                       help='Create only PDF files')
+    parser.add_argument('--epub-only', action='store_true',
+                       help='Create only EPUB files')
+    parser.add_argument('--output-dir', '-o', default='./converted_variants',
+                       help='Output directory for converted files (default: ./converted_variants)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+
+    args = parser.parse_args()
+
+    variants = [v.strip() for v in args.variants.split(',') if v.strip()]
+    unknown = [v for v in variants if v not in VARIANTS]
+    if unknown or not variants:
+        print(f"Error: Unknown variant(s): {', '.join(unknown) or '(none given)'}")
+        print(f"Available variants: {', '.join(VARIANTS)}")
+        sys.exit(1)
+    variants = list(dict.fromkeys(variants))
+
+    if args.pdf_only and args.epub_only:
+        print("Error: Cannot specify both --pdf-only and --epub-only")
+        sys.exit(1)
+
+    create_pdf = not args.epub_only
+    create_epub = not args.pdf_only
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    css_dir = os.path.dirname(os.path.abspath(__file__))
+    try:
+        css_files = {variant: resolve_variant_css(variant, css_dir) for variant in variants}
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    # Check dependencies
+    print("Checking dependencies...")
+    missing_python, missing_system = check_dependencies()
+
+    if missing_python:
+        print(f"Missing Python packages: {', '.join(missing_python)}")
+        print("Install with: pip install " + " ".join(missing_python))
+        sys.exit(1)
+
+    if missing_system:
+        if create_epub and 'pandoc' in missing_system:
+            print("Warning: pandoc not found. EPUB creation will be disabled.")
+            create_epub = False
+        if not create_pdf and not create_epub:
+            print("No conversion tools available.")
+            sys.exit(1)
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"Converting files from: {html_dir}")
+    print(f"Output directory: {output_dir}")
+    for variant in variants:
+        print(f"  {variant}: {VARIANTS[variant]['description']} ({os.path.basename(css_files[variant])})")
+    print(f"Creating: {'PDF' if create_pdf else ''} {'EPUB' if create_epub else ''}")
+    print("=" * 60)
+
+    timings = []
+    successful, total, errors = process_html_files_variants(
+        html_dir, output_dir, variants, css_files, create_pdf, create_epub, timings
+    )
+    timing_json, timing_csv = write_timing_report(timings, output_dir)
+    timing_summary = summarize_timings(timings)
+    shared_seconds = timing_summary['total_seconds'] - sum(variant_seconds(timings, v) for v in variants)
+
+    # Generate summary report
+    print("\n" + "=" * 60)
+    print("CONVERSION SUMMARY")
+    print("=" * 60)
+    print(f"Total HTML files: {total}")
+    for variant in variants:
+        print(f"  {variant}: {successful[variant]} successful, {total - successful[variant]} failed "
+              f"({variant_seconds(timings, variant):.2f}s)")
+    print(f"Shared preparation: {shared_seconds:.2f}s")
+
+    if errors:
+        print(f"\nErrors encountered ({len(errors)}):")
+        for error in errors:
+            print(f"  - {error}")
+
+    report_path = os.path.join(output_dir, 'conversion_report.txt')
+    with open(report_path, 'w') as f:
+        f.write("PDF/EPUB Multi-Variant Conversion Report\n")
+        f.write("=" * 40 + "\n\n")
+        f.write(f"HTML directory: {html_dir}\n")
+        f.write(f"Output directory: {output_dir}\n")
+        f.write(f"Formats created: {'PDF' if create_pdf else ''} {'EPUB' if create_epub else ''}\n\n")
+        f.write(f"Total files processed: {total}\n\n")
+        for variant in variants:
+            f.write(f"{variant} ({VARIANTS[variant]['description']})\n")
+            f.write(f"  CSS stylesheet: {css_files[variant]}\n")
+            f.write(f"  Output: {os.path.join(output_dir, variant)}\n")
+            f.write(f"  Successful conversions: {successful[variant]}\n")
+            f.write(f"  Failed conversions: {total - successful[variant]}\n")
+            f.write(f"  Variant time: {variant_seconds(timings, variant):.2f}s\n\n")
+        f.write(f"Shared preparation time: {shared_seconds:.2f}s\n\n")
+
+        if errors:
+            f.write("Errors:\n")
+            for error in errors:
+                f.write(f"  - {error}\n")
+            f.write("\n")
+
+        f.write("Timing Summary\n")
+        f.write("-" * 20 + "\n")
+        for line in format_timing_summary(timing_summary):
+            f.write(line + "\n")
+
+    print(f"\nDetailed report saved to: {report_path}")
+    print(f"Timing report saved to: {timing_json} and {timing_csv}")
+
+
+if __name__ == "__main__":
+    main()
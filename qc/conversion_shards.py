@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Sharded Conversion Runs
+
+Splits the essays into N shards of roughly equal render time so a full
+conversion can be spread over several CI runners or machines, and merges
+the per-shard reports back into one conversion report.
+
+Essays are balanced by their render time in a previous timing report
+(``timing_report.json``), falling back to the HTML file size when there is
+no history. Shards are filled longest-job-first (each essay goes to the
+currently lightest shard) and each shard renders its longest essays first,
+so the slowest essays never end up at the tail of a run.
+
+Every runner must see the same HTML files and the same timing history to
+compute the same partition; use a report from a previous merged run (for
+example a cached or committed ``timing_report.json``).
+
+Key Features:
+- ``--shard i/N`` option for ``convert_to_pdf_epub.py`` (1-based)
+- Balancing by historical render time, or by file size
+- Longest-job-first ordering inside each shard
+- Merging of per-shard timing reports and summaries
+
+Usage:
+    python convert_to_pdf_epub.py --shard 2/4 [--timing-history timing_report.json]
+    python conversion_shards.py plan --shards 4 [--timing-history timing_report.json]
+    python conversion_shards.py merge shard1/ shard2/ shard3/ shard4/ --output-dir merged/
+"""
+import os
+import sys
+import json
+import heapq
+import argparse
+from typing import List, Tuple, Dict, Any, Optional
+
+from conversion_timing import (load_timing_records, write_timing_report,
+                               summarize_timings, format_timing_summary)
+
+SHARD_SUMMARY_FILE = 'shard_summary.json'
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """
+    Parse a shard specification such as '2/4'.
+
+    Args:
+        spec (str): Shard number and shard count, 1-based ('i/N')
+
+    Returns:
+        tuple: (shard number, shard count)
+
+    Raises:
+        ValueError: If the specification is malformed or out of range
+    """
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 2/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}': shard number must be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def essay_costs(html_dir: str, html_files: List[str],
+                history_path: Optional[str] = None) -> Tuple[Dict[str, float], str]:
+    """
+    Estimate the render cost of every essay.
+
+    With a timing history, essays use their recorded total seconds; essays
+    missing from the history are estimated from their file size using the
+    average seconds per byte of the essays that have a history.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+        html_files (list): HTML file names
+        history_path (str): Optional timing report from a previous run
+
+    Returns:
+        tuple: (cost by file name, description of the cost source)
+    """
+    sizes = {f: os.path.getsize(os.path.join(html_dir, f)) for f in html_files}
+
+    history: Dict[str, float] = {}
+    if history_path and os.path.exists(history_path):
+        for record in load_timing_records(history_path):
+            history[f"{record['essay']}.html"] = record['total_seconds']
+
+    known = [f for f in html_files if f in history]
+    if not known:
+        return {f: float(sizes[f]) for f in html_files}, 'file size'
+
+    known_bytes = sum(sizes[f] for f in known)
+    seconds_per_byte = sum(history[f] for f in known) / known_bytes if known_bytes else 0.0
+    costs = {f: history[f] if f in history else sizes[f] * seconds_per_byte for f in html_files}
+    return costs, f"render time history ({len(known)}/{len(html_files)} essays)"
+
+
+def assign_shards(costs: Dict[str, float], count: int) -> List[List[str]]:
+    """
+    Partition essays into shards of similar total cost.
+
+    Essays are assigned longest-first to the shard with the lowest total so
+    far. The result is deterministic: ties are broken by file name and
+    shard number.
+
+    Args:
+        costs (dict): Estimated cost by file name
+        count (int): Number of shards
+
+    Returns:
+        list: One list of file names per shard, longest essay first
+    """
+    shards: List[List[str]] = [[] for _ in range(count)]
+    loads = [(0.0, shard) for shard in range(count)]
+    heapq.heapify(loads)
+
+    for name in sorted(costs, key=lambda f: (-costs[f], f)):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(name)
+        heapq.heappush(loads, (load + costs[name], shard))
+
+    return shards
+
+
+def plan_shards(html_dir: str, html_files: List[str], count: int,
+                history_path: Optional[str] = None) -> Tuple[List[List[str]], Dict[str, float], str]:
+    """
+    Compute the shard partition for a set of essays.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+        html_files (list): HTML file names
+        count (int): Number of shards
+        history_path (str): Optional timing report from a previous run
+
+    Returns:
+        tuple: (files per shard, cost by file name, description of the cost source)
+    """
+    costs, source = essay_costs(html_dir, html_files, history_path)
+    return assign_shards(costs, count), costs, source
+
+
+def write_shard_summary(output_dir: str, shard: str, html_files: List[str],
+                        successful: int, errors: List[str], formats: List[str]) -> str:
+    """
+    Record the outcome of one shard for the merge step.
+
+    Args:
+        output_dir (str): Output directory of the shard
+        shard (str): Shard specification (e.g. '2/4')
+        html_files (list): HTML files rendered by this shard
+        successful (int): Number of successful conversions
+        errors (list): Error messages
+        formats (list): Formats created (e.g. ['PDF', 'EPUB'])
+
+    Returns:
+        str: Path of the written summary
+    """
+    path = os.path.join(output_dir, SHARD_SUMMARY_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'shard': shard,
+            'essays': [os.path.splitext(name)[0] for name in html_files],
+            'total': len(html_files),
+            'successful': successful,
+            'errors': errors,
+            'formats': formats,
+        }, f, indent=2)
+    return path
+
+
+def merge_shard_reports(shard_dirs: List[str], output_dir: str) -> Dict[str, Any]:
+    """
+    Combine the reports of several shards into one conversion report.
+
+    Reads ``shard_summary.json`` and ``timing_report.json`` from every shard
+    directory and writes a merged ``conversion_report.txt`` and timing
+    report to ``output_dir``.
+
+    Args:
+        shard_dirs (list): Output directories of the shards
+        output_dir (str): Directory for the merged reports
+
+    Returns:
+        dict: Merged totals, errors and missing shards
+    """
+    summaries = []
+    records = []
+    for shard_dir in shard_dirs:
+        summary_path = os.path.join(shard_dir, SHARD_SUMMARY_FILE)
+        if not os.path.exists(summary_path):
+            print(f"Warning: no {SHARD_SUMMARY_FILE} in {shard_dir}, skipping")
+            continue
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        summary['directory'] = shard_dir
+        summaries.append(summary)
+
+        timing_path = os.path.join(shard_dir, 'timing_report.json')
+        if os.path.exists(timing_path):
+            records.extend(load_timing_records(timing_path))
+
+    summaries.sort(key=lambda s: parse_shard(s['shard']))
+    counts = {parse_shard(s['shard'])[1] for s in summaries}
+    expected = max(counts) if counts else 0
+    present = {parse_shard(s['shard'])[0] for s in summaries}
+    missing = [f"{i}/{expected}" for i in range(1, expected + 1) if i not in present]
+
+    total = sum(s['total'] for s in summaries)
+    successful = sum(s['successful'] for s in summaries)
+    errors = [error for s in summaries for error in s['errors']]
+
+    os.makedirs(output_dir, exist_ok=True)
+    timing_json, timing_csv = write_timing_report(records, output_dir)
+    timing_summary = summarize_timings(records)
+
+    report_path = os.path.join(output_dir, 'conversion_report.txt')
+    with open(report_path, 'w') as f:
+        f.write("PDF/EPUB Conversion Report (merged shards)\n")
+        f.write("=" * 40 + "\n\n")
+        f.write(f"Shards merged: {len(summaries)}" + (f" of {expected}" if expected else "") + "\n")
+        if missing:
+            f.write(f"Missing shards: {', '.join(missing)}\n")
+        if len(counts) > 1:
+            f.write(f"Warning: shards come from runs with different shard counts: {sorted(counts)}\n")
+        f.write("\n")
+        for s in summaries:
+            shard_essays = set(s['essays'])
+            shard_seconds = sum(r['total_seconds'] for r in records if r['essay'] in shard_essays)
+            f.write(f"Shard {s['shard']}: {s['successful']}/{s['total']} successful, "
+                    f"{shard_seconds:.2f}s ({s['directory']})\n")
+        f.write("\n")
+        f.write(f"Total files processed: {total}\n")
+        f.write(f"Successful conversions: {successful}\n")
+        f.write(f"Failed conversions: {total - successful}\n\n")
+
+        if errors:
+            f.write("Errors:\n")
+            for error in errors:
+                f.write(f"  - {error}\n")
+            f.write("\n")
+
+        f.write("Timing Summary\n")
+        f.write("-" * 20 + "\n")
+        for line in format_timing_summary(timing_summary):
+            f.write(line + "\n")
+
+    return {
+        'shards': len(summaries),
+        'missing': missing,
+        'total': total,
+        'successful': successful,
+        'errors': errors,
+        'report_path': report_path,
+        'timing_json': timing_json,
+        'timing_csv': timing_csv,
+    }
+
+
+def main():
+    """Plan shards or merge shard reports."""
+    parser = argparse.ArgumentParser(description='Plan sharded conversion runs and merge their reports')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    plan_parser = subparsers.add_parser('plan', help='Show how essays are split across shards')
+    plan_parser.add_argument('--shards', type=int, required=True, help='Number of shards')
+    plan_parser.add_argument('--html-dir', default='../html',
+                             help='Directory containing HTML files (default: ../html)')
+    plan_parser.add_argument('--timing-history',
+                             help='Timing report of a previous run to balance by render time')
+
+    merge_parser = subparsers.add_parser('merge', help='Merge per-shard reports')
+    merge_parser.add_argument('shard_dirs', nargs='+', help='Output directories of the shards')
+    merge_parser.add_argument('--output-dir', '-o', default='./converted_documents',
+                              help='Directory for the merged report (default: ./converted_documents)')
+
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        html_dir = os.path.abspath(args.html_dir)
+        if not os.path.exists(html_dir):
+            print(f"Error: HTML directory not found: {html_dir}")
+            sys.exit(1)
+        if args.shards < 1:
+            print("Error: --shards must be at least 1")
+            sys.exit(1)
+
+        html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+        shards, costs, source = plan_shards(html_dir, html_files, args.shards, args.timing_history)
+        print(f"Balancing {len(html_files)} essays over {args.shards} shards by {source}")
+        for i, shard in enumerate(shards, 1):
+            load = sum(costs[f] for f in shard)
+            load_text = f"{load:,.0f} bytes" if source == 'file size' else f"{load:.2f}s"
+            print(f"  Shard {i}/{args.shards}: {len(shard)} essays, {load_text}"
+                  + (f" (longest: {shard[0]})" if shard else ""))
+        return
+
+    output_dir = os.path.abspath(args.output_dir)
+    result = merge_shard_reports(args.shard_dirs, output_dir)
+    print(f"Merged {result['shards']} shard(s): {result['successful']}/{result['total']} successful")
+    if result['missing']:
+        print(f"Warning: missing shards: {', '.join(result['missing'])}")
+    if result['errors']:
+        print(f"Errors encountered ({len(result['errors'])}):")
+        for error in result['errors']:
+            print(f"  - {error}")
+    print(f"Merged report saved to: {result['report_path']}")
+    print(f"Timing report saved to: {result['timing_json']} and {result['timing_csv']}")
+    if result['missing'] or result['successful'] < result['total']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
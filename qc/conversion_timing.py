@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+Stage Timing for the PDF/EPUB Conversion Pipeline
+
+Lightweight span/timer API used by the conversion scripts to record how long
+each preparation and rendering step takes for every essay, together with
+simple counters (footnotes found, figures linked, pages rendered, ...).
+
+Key Features:
+- StageTimer with a ``span()`` context manager for timing named stages
+- Prefixed views for recording several output variants in one record
+- Per-essay counters alongside the timings
+- RSSSampler for recording the peak resident memory of a block
+- Machine-readable JSON and CSV reports written next to the outputs
+- Summary of the slowest essays and the most expensive stages
+- Comparison of two runs (e.g. final vs draft render profile)
+
+Usage:
+    timer = StageTimer('ann_003_fa_14')
+    with timer.span('parse'):
+        soup = BeautifulSoup(content, 'html.parser')
+    timer.count('footnote_refs', len(refs))
+    timer.stop()
+    write_timing_report([timer.as_record()], output_dir)
+
+    python conversion_timing.py final/timing_report.json draft/timing_report.json
+"""
+import os
+import sys
+import csv
+import json
+import time
+import threading
+import argparse
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class StageTimer:
+    """
+    Collect wall-clock timings and counters for the conversion of one essay.
+
+    Stages are accumulated by name, so timing the same stage twice adds the
+    durations together. The total runs from construction until ``stop()``.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.status = 'ok'
+        self._start = time.perf_counter()
+        self._total: Optional[float] = None
+
+    @contextmanager
+    def span(self, stage: str):
+        """
+        Time the enclosed block and add it to the named stage.
+
+        Args:
+            stage (str): Name of the stage being timed
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+
+    def count(self, counter: str, value: int = 1) -> None:
+        """
+        Add a value to a named counter.
+
+        Args:
+            counter (str): Name of the counter
+            value (int): Amount to add (default: 1)
+        """
+        self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def stop(self, status: Optional[str] = None) -> float:
+        """
+        Stop the overall timer for this essay.
+
+        Args:
+            status (str): Optional final status (e.g. 'ok', 'failed')
+
+        Returns:
+            float: Total elapsed seconds
+        """
+        if status:
+            self.status = status
+        if self._total is None:
+            self._total = time.perf_counter() - self._start
+        return self._total
+
+    @property
+    def total(self) -> float:
+        """Total elapsed seconds (running total if not yet stopped)."""
+        if self._total is not None:
+            return self._total
+        return time.perf_counter() - self._start
+
+    def prefixed(self, prefix: str) -> 'PrefixedTimer':
+        """
+        Return a view of this timer that prefixes stage and counter names.
+
+        Args:
+            prefix (str): Prefix such as a variant name ('footnotes')
+
+        Returns:
+            PrefixedTimer: View recording e.g. 'footnotes.pdf_layout'
+        """
+        return PrefixedTimer(self, prefix)
+
+    def as_record(self) -> Dict[str, Any]:
+        """
+        Convert the collected timings into a JSON-serializable record.
+
+        Returns:
+            dict: Record with essay name, status, total, stages and counters
+        """
+        return {
+            'essay': self.name,
+            'status': self.status,
+            'total_seconds': round(self.total, 6),
+            'stages': {name: round(value, 6) for name, value in self.stages.items()},
+            'counters': dict(self.counters),
+        }
+
+
+class PrefixedTimer:
+    """
+    View on a StageTimer that records under prefixed names.
+
+    Lets one essay's record hold the stages of several output variants
+    without their names colliding.
+    """
+
+    def __init__(self, timer: StageTimer, prefix: str):
+        self.timer = timer
+        self.prefix = prefix
+
+    def span(self, stage: str):
+        """Time the enclosed block as stage ``prefix.stage``."""
+        return self.timer.span(f"{self.prefix}.{stage}")
+
+    def count(self, counter: str, value: int = 1) -> None:
+        """Add a value to counter ``prefix.counter``."""
+        self.timer.count(f"{self.prefix}.{counter}", value)
+
+
+def peak_rss_kb() -> int:
+    """
+    Peak resident set size of the current process in kilobytes.
+
+    Returns:
+        int: Peak RSS in KB (ru_maxrss is bytes on macOS, KB on Linux)
+    """
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def current_rss_kb() -> int:
+    """
+    Current resident set size of this process in kilobytes.
+
+    Reads /proc on Linux; elsewhere falls back to the peak RSS.
+
+    Returns:
+        int: Current RSS in KB
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError):
+        return peak_rss_kb()
+
+
+class RSSSampler:
+    """
+    Record the peak resident memory while a block of code runs.
+
+    A background thread samples the current RSS at a fixed interval, so the
+    peak of each essay can be measured separately even though the process
+    peak (ru_maxrss) only ever grows.
+
+    Usage:
+        with RSSSampler() as sampler:
+            convert(...)
+        timer.count('peak_rss_kb', sampler.peak_kb)
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, current_rss_kb())
+
+    def __enter__(self) -> 'RSSSampler':
+        self.peak_kb = current_rss_kb()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, current_rss_kb())
+
+
+def summarize_timings(records: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """
+    Summarize per-essay timing records.
+
+    Args:
+        records (list): Records produced by ``StageTimer.as_record()``
+        top (int): Number of slowest essays to include
+
+    Returns:
+        dict: Totals, slowest essays and per-stage aggregates
+    """
+    stage_totals: Dict[str, float] = {}
+    stage_max: Dict[str, Tuple[float, str]] = {}
+    for record in records:
+        for stage, seconds in record['stages'].items():
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+            if stage not in stage_max or seconds > stage_max[stage][0]:
+                stage_max[stage] = (seconds, record['essay'])
+
+    total_seconds = sum(record['total_seconds'] for record in records)
+    slowest = sorted(records, key=lambda r: r['total_seconds'], reverse=True)[:top]
+
+    stages = []
+    for stage, seconds in sorted(stage_totals.items(), key=lambda x: x[1], reverse=True):
+        stages.append({
+            'stage': stage,
+            'total_seconds': round(seconds, 6),
+            'mean_seconds': round(seconds / len(records), 6) if records else 0.0,
+            'share': round(seconds / total_seconds, 4) if total_seconds else 0.0,
+            'max_seconds': round(stage_max[stage][0], 6),
+            'max_essay': stage_max[stage][1],
+        })
+
+    summary = {
+        'essays': len(records),
+        'total_seconds': round(total_seconds, 6),
+        'slowest_essays': [
+            {'essay': r['essay'], 'total_seconds': r['total_seconds'], 'status': r['status']}
+            for r in slowest
+        ],
+        'stages': stages,
+    }
+
+    rss_records = [r for r in records if 'peak_rss_kb' in r['counters']]
+    if rss_records:
+        peak = max(rss_records, key=lambda r: r['counters']['peak_rss_kb'])
+        summary['peak_rss_kb'] = peak['counters']['peak_rss_kb']
+        summary['peak_rss_essay'] = peak['essay']
+
+    return summary
+
+
+def format_timing_summary(summary: Dict[str, Any]) -> List[str]:
+    """
+    Format a timing summary as human-readable report lines.
+
+    Args:
+        summary (dict): Summary produced by ``summarize_timings()``
+
+    Returns:
+        list: Lines of text (without trailing newlines)
+    """
+    lines = [f"Timed essays: {summary['essays']}",
+             f"Total time: {summary['total_seconds']:.2f}s"]
+    if 'peak_rss_kb' in summary:
+        lines.append(f"Peak RSS: {summary['peak_rss_kb'] / 1024:.1f} MB ({summary['peak_rss_essay']})")
+    lines += ["", "Slowest essays:"]
+    for item in summary['slowest_essays']:
+        lines.append(f"  {item['essay']}: {item['total_seconds']:.2f}s ({item['status']})")
+
+    lines.append("")
+    lines.append("Time by stage:")
+    for item in summary['stages']:
+        lines.append(f"  {item['stage']}: {item['total_seconds']:.2f}s "
+                     f"({item['share'] * 100:.1f}%, max {item['max_seconds']:.2f}s in {item['max_essay']})")
+    return lines
+
+
+def write_timing_report(records: List[Dict[str, Any]], output_dir: str,
+                        basename: str = 'timing_report') -> Tuple[str, str]:
+    """
+    Write per-essay timings as JSON and CSV files.
+
+    The JSON file contains every record plus the summary; the CSV file has one
+    row per essay with a column for each stage and counter.
+
+    Args:
+        records (list): Records produced by ``StageTimer.as_record()``
+        output_dir (str): Directory to write the reports to
+        basename (str): File name without extension (default: timing_report)
+
+    Returns:
+        tuple: (json_path, csv_path)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    json_path = os.path.join(output_dir, f"{basename}.json")
+    csv_path = os.path.join(output_dir, f"{basename}.csv")
+
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summarize_timings(records), 'essays': records}, f, indent=2)
+
+    stage_names: List[str] = []
+    counter_names: List[str] = []
+    for record in records:
+        for stage in record['stages']:
+            if stage not in stage_names:
+                stage_names.append(stage)
+        for counter in record['counters']:
+            if counter not in counter_names:
+                counter_names.append(counter)
+
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['essay', 'status', 'total_seconds'] + stage_names + counter_names)
+        for record in records:
+            row = [record['essay'], record['status'], record['total_seconds']]
+            row += [record['stages'].get(stage, '') for stage in stage_names]
+            row += [record['counters'].get(counter, '') for counter in counter_names]
+            writer.writerow(row)
+
+    return json_path, csv_path
+
+
+def load_timing_records(json_path: str) -> List[Dict[str, Any]]:
+    """
+    Load per-essay records from a JSON timing report.
+
+    Args:
+        json_path (str): Path to a report written by ``write_timing_report()``
+
+    Returns:
+        list: Per-essay timing records
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('essays', [])
+
+
+def compare_timings(baseline: List[Dict[str, Any]], candidate: List[Dict[str, Any]],
+                    top: int = 10) -> Dict[str, Any]:
+    """
+    Compare two timing runs over the same essays (e.g. final vs draft profile).
+
+    Only essays that converted successfully in both runs are compared.
+
+    Args:
+        baseline (list): Records of the reference run
+        candidate (list): Records of the run being compared
+        top (int): Number of essays with the largest saving to include
+
+    Returns:
+        dict: Totals, speed-up, per-stage totals and per-essay savings
+    """
+    base_by_essay = {r['essay']: r for r in baseline if r['status'] == 'ok'}
+    cand_by_essay = {r['essay']: r for r in candidate if r['status'] == 'ok'}
+    essays = sorted(set(base_by_essay) & set(cand_by_essay))
+
+    base_total = sum(base_by_essay[e]['total_seconds'] for e in essays)
+    cand_total = sum(cand_by_essay[e]['total_seconds'] for e in essays)
+
+    stage_names: List[str] = []
+    for by_essay in (base_by_essay, cand_by_essay):
+        for essay in essays:
+            for stage in by_essay[essay]['stages']:
+                if stage not in stage_names:
+                    stage_names.append(stage)
+
+    stages = []
+    for stage in stage_names:
+        base_seconds = sum(base_by_essay[e]['stages'].get(stage, 0.0) for e in essays)
+        cand_seconds = sum(cand_by_essay[e]['stages'].get(stage, 0.0) for e in essays)
+        stages.append({
+            'stage': stage,
+            'baseline_seconds': round(base_seconds, 6),
+            'candidate_seconds': round(cand_seconds, 6),
+            'saved_seconds': round(base_seconds - cand_seconds, 6),
+        })
+    stages.sort(key=lambda s: s['saved_seconds'], reverse=True)
+
+    savings = []
+    for essay in essays:
+        base_seconds = base_by_essay[essay]['total_seconds']
+        cand_seconds = cand_by_essay[essay]['total_seconds']
+        savings.append({
+            'essay': essay,
+            'baseline_seconds': base_seconds,
+            'candidate_seconds': cand_seconds,
+            'speedup': round(base_seconds / cand_seconds, 2) if cand_seconds else 0.0,
+        })
+    savings.sort(key=lambda s: s['baseline_seconds'] - s['candidate_seconds'], reverse=True)
+
+    return {
+        'essays': len(essays),
+        'baseline_only': len(set(base_by_essay) - set(cand_by_essay)),
+        'candidate_only': len(set(cand_by_essay) - set(base_by_essay)),
+        'baseline_seconds': round(base_total, 6),
+        'candidate_seconds': round(cand_total, 6),
+        'speedup': round(base_total / cand_total, 2) if cand_total else 0.0,
+        'stages': stages,
+        'largest_savings': savings[:top],
+    }
+
+
+def format_timing_comparison(comparison: Dict[str, Any]) -> List[str]:
+    """
+    Format a timing comparison as human-readable report lines.
+
+    Args:
+        comparison (dict): Comparison produced by ``compare_timings()``
+
+    Returns:
+        list: Lines of text (without trailing newlines)
+    """
+    lines = [f"Compared essays: {comparison['essays']}"]
+    if comparison['baseline_only'] or comparison['candidate_only']:
+        lines.append(f"Not compared: {comparison['baseline_only']} only in baseline, "
+                     f"{comparison['candidate_only']} only in candidate")
+    lines += [f"Baseline total: {comparison['baseline_seconds']:.2f}s",
+              f"Candidate total: {comparison['candidate_seconds']:.2f}s",
+              f"Speed-up: {comparison['speedup']:.2f}x",
+              "", "Time by stage (baseline -> candidate):"]
+    for item in comparison['stages']:
+        lines.append(f"  {item['stage']}: {item['baseline_seconds']:.2f}s -> "
+                     f"{item['candidate_seconds']:.2f}s (saved {item['saved_seconds']:.2f}s)")
+
+    lines += ["", "Largest savings:"]
+    for item in comparison['largest_savings']:
+        lines.append(f"  {item['essay']}: {item['baseline_seconds']:.2f}s -> "
+                     f"{item['candidate_seconds']:.2f}s ({item['speedup']:.2f}x)")
+    return lines
+
+
+def main():
+    """Compare two timing reports."""
+    parser = argparse.ArgumentParser(description='Compare the timing reports of two conversion runs')
+    parser.add_argument('baseline', help='Timing report of the reference run (e.g. final profile)')
+    parser.add_argument('candidate', help='Timing report of the run to compare (e.g. draft profile)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Number of essays with the largest saving to list (default: 10)')
+
+    args = parser.parse_args()
+
+    for path in (args.baseline, args.candidate):
+        if not os.path.exists(path):
+            print(f"Error: timing report not found: {path}")
+            sys.exit(1)
+
+    comparison = compare_timings(load_timing_records(args.baseline),
+                                 load_timing_records(args.candidate), args.top)
+    for line in format_timing_comparison(comparison):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for the PDF/EPUB Converter
+
+Monitors the HTML directory, the CSS stylesheet and the metadata JSON files
+and re-renders only the essays affected by a change. Used by
+``convert_to_pdf_epub.py --watch``.
+
+Rebuild rules:
+- A saved ``ann_*.html`` file re-renders only that essay
+- A change to ``annotations.json`` re-renders the essays whose entries changed
+- A change to ``authors.json`` re-renders the essays crediting changed authors
+- A change to the CSS stylesheet re-renders the essays that a changed rule
+  can match: the selectors of the added, removed or edited rules are
+  compared with the element names, classes and ids of each prepared essay
+  (the selector-usage signature of ``css_pruning.py``). A changed at-rule
+  such as ``@page`` or ``@font-face`` re-renders every essay
+
+Changes are debounced: editors often save several times in a row, so a
+rebuild starts only once the watched files have been quiet for a moment.
+Polling file modification times keeps this free of extra dependencies.
+
+Usage:
+    python convert_to_pdf_epub.py --watch [--pdf-only] [--output-dir OUTPUT] [--profile draft]
+"""
+import io
+import os
+import time
+import difflib
+from contextlib import redirect_stdout
+from typing import Dict, Set, List, Any, Optional, FrozenSet, Tuple
+
+import tinycss2
+from bs4 import BeautifulSoup
+
+from render_service import RenderService
+from convert_to_pdf_epub import prepare_html_for_conversion
+from css_pruning import GROUPING_AT_RULES, Requirement, selector_requirements, document_names
+
+METADATA_FILES = ('annotations.json', 'authors.json')
+
+
+def snapshot_sources(html_dir: str, css_file: str) -> Dict[str, int]:
+    """
+    Record the modification time of every watched file.
+
+    Args:
+        html_dir (str): Directory containing HTML files and metadata
+        css_file (str): Path to the CSS stylesheet
+
+    Returns:
+        dict: Maps file path to modification time in nanoseconds
+    """
+    snapshot = {}
+    paths = [os.path.join(html_dir, f) for f in os.listdir(html_dir) if f.endswith('.html')]
+    paths += [os.path.join(html_dir, name) for name in METADATA_FILES]
+    paths.append(css_file)
+    for path in paths:
+        try:
+            snapshot[path] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+    return snapshot
+
+
+def changed_paths(before: Dict[str, int], after: Dict[str, int]) -> Set[str]:
+    """Return paths that were added, removed or modified between two snapshots."""
+    return {path for path in set(before) | set(after) if before.get(path) != after.get(path)}
+
+
+def essays_affected_by_metadata(old_annotations: Dict[str, Any], old_authors: Dict[str, Any],
+                                new_annotations: Dict[str, Any], new_authors: Dict[str, Any]) -> Set[str]:
+    """
+    Determine which essays' frontmatter changed with the metadata.
+
+    Args:
+        old_annotations (dict): Annotations metadata before the change
+        old_authors (dict): Authors metadata before the change
+        new_annotations (dict): Annotations metadata after the change
+        new_authors (dict): Authors metadata after the change
+
+    Returns:
+        set: Annotation ids whose frontmatter needs to be re-rendered
+    """
+    affected = {annotation_id for annotation_id in set(old_annotations) | set(new_annotations)
+                if old_annotations.get(annotation_id) != new_annotations.get(annotation_id)}
+
+    changed_authors = {author_id for author_id in set(old_authors) | set(new_authors)
+                       if old_authors.get(author_id) != new_authors.get(author_id)}
+    if changed_authors:
+        for annotation_id, annotation in new_annotations.items():
+            if changed_authors.intersection(annotation.get('authorIDs', [])):
+                affected.add(annotation_id)
+
+    return affected
+
+
+def css_rules(css_content: str) -> List[Tuple[str, Optional[List[FrozenSet[Requirement]]]]]:
+    """
+    List the rules of a stylesheet in cascade order.
+
+    Rules inside ``@media``/``@supports`` blocks are listed one by one, with
+    the block's prelude as part of their text.
+
+    Args:
+        css_content (str): Stylesheet text
+
+    Returns:
+        list: (rule text, selector requirements) of every rule; the
+            requirements are None for rules that apply to every document
+            (other at-rules, selectors that aren't understood)
+    """
+    rules = []
+    for node in tinycss2.parse_stylesheet(css_content, skip_comments=True, skip_whitespace=True):
+        if node.type == 'qualified-rule':
+            rules.append((node.serialize(), selector_requirements(node.prelude)))
+        elif node.type == 'at-rule' and node.lower_at_keyword in GROUPING_AT_RULES and node.content is not None:
+            context = f"@{node.at_keyword}{tinycss2.serialize(node.prelude)}"
+            for child in tinycss2.parse_rule_list(node.content, skip_comments=True, skip_whitespace=True):
+                requirements = selector_requirements(child.prelude) if child.type == 'qualified-rule' else None
+                rules.append((f"{context}{{{child.serialize()}}}", requirements))
+        elif node.type != 'error':
+            rules.append((node.serialize(), None))
+    return rules
+
+
+def changed_css_rules(old_css: str, new_css: str) -> List[Optional[List[FrozenSet[Requirement]]]]:
+    """
+    Find the rules added, removed, edited or moved between two stylesheets.
+
+    Args:
+        old_css (str): Stylesheet before the change
+        new_css (str): Stylesheet after the change
+
+    Returns:
+        list: Selector requirements of every changed rule (None for a rule
+            that applies to every document)
+    """
+    old_rules = css_rules(old_css)
+    new_rules = css_rules(new_css)
+    matcher = difflib.SequenceMatcher(None, [text for text, _ in old_rules],
+                                      [text for text, _ in new_rules], autojunk=False)
+    changed = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != 'equal':
+            changed += [requirements for _, requirements in old_rules[old_start:old_end]]
+            changed += [requirements for _, requirements in new_rules[new_start:new_end]]
+    return changed
+
+
+def prepared_names(service: RenderService, essay: str) -> FrozenSet[Requirement]:
+    """
+    Element names, classes and ids of an essay as it is rendered.
+
+    Args:
+        service (RenderService): Service holding the metadata and profile
+        essay (str): Essay id
+
+    Returns:
+        frozenset: ('tag'|'class'|'id', name) pairs of the prepared document
+    """
+    html_path = os.path.join(service.html_dir, f"{essay}.html")
+    with redirect_stdout(io.StringIO()):
+        prepared_html = prepare_html_for_conversion(
+            html_path, service.css_file, service.html_dir,
+            metadata_store=service.metadata_store, embed_css=False, profile=service.profile
+        )
+    return document_names(BeautifulSoup(prepared_html, 'html.parser'))
+
+
+def essays_affected_by_css(old_css: str, new_css: str, essays: Set[str], service: RenderService,
+                           names_cache: Dict[str, FrozenSet[Requirement]]) -> Set[str]:
+    """
+    Determine which essays a stylesheet change can affect.
+
+    Args:
+        old_css (str): Stylesheet before the change
+        new_css (str): Stylesheet after the change
+        essays (set): Essay ids to consider
+        service (RenderService): Service used to prepare essays
+        names_cache (dict): Essay id -> prepared document names; filled in
+            for essays that haven't been prepared yet
+
+    Returns:
+        set: Essay ids a changed rule can match
+    """
+    changed = changed_css_rules(old_css, new_css)
+    if not changed:
+        return set()
+    if any(requirements is None for requirements in changed):
+        return set(essays)
+
+    selectors = {selector for requirements in changed for selector in requirements}
+    affected = set()
+    for essay in essays:
+        if essay not in names_cache:
+            names_cache[essay] = prepared_names(service, essay)
+        names = names_cache[essay]
+        if any(selector <= names for selector in selectors):
+            affected.add(essay)
+    return affected
+
+
+def essays_to_rebuild(changes: Set[str], service: RenderService, state: Dict[str, Any]) -> List[str]:
+    """
+    Map a set of changed files to the essays that must be re-rendered.
+
+    Refreshes the service's metadata store when the metadata changed.
+
+    Args:
+        changes (set): Paths of changed files
+        service (RenderService): Service holding the current metadata
+        state (dict): Watch state: 'css' (stylesheet text of the last
+            rebuild) and 'names' (prepared document names by essay id);
+            both are updated
+
+    Returns:
+        list: Sorted essay ids to re-render
+    """
+    html_dir = service.html_dir
+    available = {os.path.splitext(f)[0] for f in os.listdir(html_dir) if f.endswith('.html')}
+
+    essays = set()
+    for path in changes:
+        name = os.path.basename(path)
+        if path.endswith('.html') and os.path.dirname(path) == html_dir:
+            essays.add(os.path.splitext(name)[0])
+
+    if any(os.path.join(html_dir, name) in changes for name in METADATA_FILES):
+        store = service.metadata_store
+        old_annotations, old_authors = store.annotations_data, store.authors_data
+        store.refresh()
+        metadata_essays = essays_affected_by_metadata(old_annotations, old_authors,
+                                                      store.annotations_data, store.authors_data)
+        print(f"  Metadata changed: {len(metadata_essays)} essay(s) affected")
+        essays |= metadata_essays
+
+    # These essays' prepared documents may have changed
+    for essay in essays:
+        state['names'].pop(essay, None)
+
+    if service.css_file in changes:
+        with open(service.css_file, 'r', encoding='utf-8') as f:
+            new_css = f.read()
+        css_essays = essays_affected_by_css(state['css'], new_css, available, service, state['names'])
+        state['css'] = new_css
+        print(f"  Stylesheet changed: {len(css_essays)} essay(s) affected")
+        essays |= css_essays
+
+    return sorted(essays & available)
+
+
+def watch_and_convert(html_dir: str, output_dir: str, css_file: str,
+                      create_pdf: bool = True, create_epub: bool = True,
+                      interval: float = 0.5, debounce: float = 1.0,
+                      profile: str = 'final', prune_css: bool = True,
+                      optimize_pdf: bool = False) -> None:
+    """
+    Watch the sources and re-render affected essays until interrupted.
+
+    Args:
+        html_dir (str): Directory containing HTML files and metadata
+        output_dir (str): Directory to save converted files
+        css_file (str): Path to CSS stylesheet
+        create_pdf (bool): Whether to create PDF files
+        create_epub (bool): Whether to create EPUB files
+        interval (float): Seconds between polls of the watched files
+        debounce (float): Quiet period in seconds before a rebuild starts
+        profile (str): Render profile ('final' or 'draft')
+        prune_css (bool): Leave out the CSS rules each document cannot match
+        optimize_pdf (bool): Linearize and dedupe every PDF for web delivery
+    """
+    html_dir = os.path.abspath(html_dir)
+    css_file = os.path.abspath(css_file)
+    formats = (['pdf'] if create_pdf else []) + (['epub'] if create_epub else [])
+    service = RenderService(html_dir, output_dir, css_file, epub_available=create_epub,
+                            profile=profile, prune_css=prune_css, optimize_pdf=optimize_pdf)
+    with open(css_file, 'r', encoding='utf-8') as f:
+        state = {'css': f.read(), 'names': {}}
+
+    print(f"Watching {html_dir}, {os.path.basename(css_file)} and metadata for changes")
+    print("Press Ctrl+C to stop")
+
+    previous = snapshot_sources(html_dir, css_file)
+    pending: Set[str] = set()
+    last_change = 0.0
+
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot_sources(html_dir, css_file)
+            changes = changed_paths(previous, current)
+            previous = current
+
+            if changes:
+                pending |= changes
+                last_change = time.monotonic()
+                continue
+
+            if not pending or time.monotonic() - last_change < debounce:
+                continue
+
+            names = ', '.join(sorted(os.path.basename(path) for path in pending))
+            print(f"\nChange detected: {names}")
+            essays = essays_to_rebuild(pending, service, state)
+            pending = set()
+
+            for i, essay in enumerate(essays, 1):
+                print(f"Processing {i}/{len(essays)}: {essay}.html")
+                result = service.render(essay, formats)
+                for error in result['errors']:
+                    print(f"  ✗ {error}")
+            if essays:
+                print(f"Rebuilt {len(essays)} essay(s); watching for changes...")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
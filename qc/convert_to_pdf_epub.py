@@ -15,18 +15,51 @@ Key Features:
 
 Usage:
     python convert_to_pdf_epub.py [--pdf-only] [--epub-only] [--output-dir OUTPUT]
+    python convert_to_pdf_epub.py --watch [--pdf-only]
+    python convert_to_pdf_epub.py --workers 4 [--max-essays-per-worker 20] [--max-worker-rss 1500]
+                                  [--timeout 300]
+    python convert_to_pdf_epub.py --shard 2/4 [--timing-history timing_report.json]
+    python convert_to_pdf_epub.py --profile draft --output-dir ./draft_documents
 """
 import os
 import sys
+import html
 import argparse
 import subprocess
 import json
+import copy
 import tempfile
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 import weasyprint
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 import shutil
+from conversion_timing import (StageTimer, RSSSampler, write_timing_report,
+                               summarize_timings, format_timing_summary)
+from css_pruning import CSSPruner
+import pdf_optimize
+
+# Render profiles: 'final' is the full-quality output, 'draft' trades images,
+# back-links and link clean-up for speed when proofreading
+RENDER_PROFILES = {
+    'final': {
+        'image_placeholders': False,
+        'backlinks': True,
+        'clean_external_links': True,
+    },
+    'draft': {
+        'image_placeholders': True,
+        'backlinks': False,
+        'clean_external_links': False,
+    },
+}
+
+# Every PDF gets a sidecar file naming the profile it was rendered with, so
+# a draft in the shared pdfs/ folder is never taken for final output
+PROFILE_SUFFIX = '.profile'
+
+# Height of an image placeholder when the image has no height attribute
+DRAFT_PLACEHOLDER_HEIGHT = '3in'
 
 def check_dependencies():
     """
@@ -93,133 +126,271 @@ def load_metadata(html_dir: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
     
     return annotations_data, authors_data
 
-def create_frontmatter(annotation_id: str, annotations_data: Dict[str, Any], 
-                      authors_data: Dict[str, Any]) -> str:
+class MetadataStore:
+    """
+    In-memory store for the annotations and authors metadata.
+    
+    The JSON files are loaded once and only re-read when their modification
+    time changes, so batch runs and long-lived processes don't parse them
+    again for every essay. HTML fragments from the metadata (abstracts,
+    titles, citations) are parsed once and cached until the next reload.
+    """
+    
+    def __init__(self, html_dir: str):
+        self.html_dir = html_dir
+        self.annotations_data: Dict[str, Any] = {}
+        self.authors_data: Dict[str, Any] = {}
+        self._fragments: Dict[Tuple[str, bool], BeautifulSoup] = {}
+        self._mtimes = None
+        self.refresh()
+    
+    def _current_mtimes(self) -> Tuple[Optional[float], Optional[float]]:
+        mtimes = []
+        for name in ('annotations.json', 'authors.json'):
+            path = os.path.join(self.html_dir, name)
+            mtimes.append(os.path.getmtime(path) if os.path.exists(path) else None)
+        return tuple(mtimes)
+    
+    def refresh(self) -> bool:
+        """
+        Reload the metadata if either JSON file changed since the last load.
+        
+        Returns:
+            bool: True if the metadata was (re)loaded
+        """
+        mtimes = self._current_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        self.annotations_data, self.authors_data = load_metadata(self.html_dir)
+        self._fragments = {}
+        self._mtimes = mtimes
+        return True
+    
+    def parse_fragment(self, fragment_html: str, unwrap_marks: bool = False) -> BeautifulSoup:
+        """
+        Parse an HTML fragment from the metadata, reusing earlier parses.
+        
+        The returned tree is shared; copy its nodes before inserting them
+        into a document.
+        
+        Args:
+            fragment_html (str): HTML fragment (e.g. an abstract)
+            unwrap_marks (bool): Remove <mark> tags but keep their content
+            
+        Returns:
+            BeautifulSoup: Parsed fragment
+        """
+        key = (fragment_html, unwrap_marks)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = parse_metadata_fragment(fragment_html, unwrap_marks)
+            self._fragments[key] = fragment
+        return fragment
+
+def parse_metadata_fragment(fragment_html: str, unwrap_marks: bool = False) -> BeautifulSoup:
+    """
+    Parse an HTML fragment from the metadata.
+    
+    Args:
+        fragment_html (str): HTML fragment (e.g. an abstract)
+        unwrap_marks (bool): Remove <mark> tags but keep their content
+        
+    Returns:
+        BeautifulSoup: Parsed fragment
+    """
+    # Parse inside a container, as the fragment would be within the document
+    # (entities at the very end of the input are otherwise read differently)
+    fragment = BeautifulSoup(f"<div>{fragment_html}</div>", 'html.parser')
+    fragment.contents[0].unwrap()
+    if unwrap_marks:
+        for mark in fragment.find_all('mark'):
+            mark.unwrap()
+    return fragment
+
+def create_frontmatter_nodes(soup: BeautifulSoup, annotation_id: str,
+                             annotations_data: Dict[str, Any], authors_data: Dict[str, Any],
+                             metadata_store: Optional[MetadataStore] = None) -> list:
     """
-    Create enhanced frontmatter HTML for the document.
+    Build the frontmatter as nodes of ``soup``, ready to be inserted.
+    
+    Produces the same markup as the string-built ``create_frontmatter`` of the
+    other converter scripts, without building and re-parsing an HTML string.
+    Plain-text metadata becomes text nodes directly; values containing
+    markup are parsed once and cached in ``metadata_store`` (if given), so
+    repeated renders only copy nodes.
     
     Args:
+        soup (BeautifulSoup): Document the nodes are created for
         annotation_id (str): The annotation ID (extracted from filename)
         annotations_data (dict): Loaded annotations metadata
         authors_data (dict): Loaded authors metadata
+        metadata_store (MetadataStore): Optional store caching parsed fragments
         
     Returns:
-        str: HTML frontmatter content
+        list: Top-level frontmatter nodes (empty if there is no metadata)
     """
     if annotation_id not in annotations_data:
-        return ""
+        return []
     
     annotation = annotations_data[annotation_id]
+    parse = metadata_store.parse_fragment if metadata_store is not None else parse_metadata_fragment
+    
+    def inline(value: Any, unwrap_marks: bool = False) -> list:
+        # Metadata text may contain markup or entities; plain text needs no parsing
+        value = str(value)
+        if '<' not in value and '&' not in value:
+            return [NavigableString(value)] if value else []
+        return [copy.copy(node) for node in parse(value, unwrap_marks).contents]
+    
+    def element(name: str, class_name: Optional[str] = None, children: list = ()) -> Any:
+        tag = soup.new_tag(name, attrs={'class': class_name} if class_name else {})
+        for child in children:
+            tag.append(child)
+        return tag
+    
+    def block(class_name: str, children: list) -> Any:
+        # Mirrors the one-part-per-line layout of the string-built frontmatter
+        tag = element('div', class_name)
+        for child in children:
+            tag.append(NavigableString('\n'))
+            tag.append(child)
+        tag.append(NavigableString('\n'))
+        return tag
     
     # Build author information
-    author_info = []
+    author_nodes = []
     for author_id in annotation.get('authorIDs', []):
         if author_id in authors_data:
             author = authors_data[author_id]
             author_name = author.get('fullName', '')
             author_type = author.get('authorType', '')
             if author_name and author_type:
-                author_info.append(f"{author_name}<br><em>{author_type}</em>")
+                author_nodes.append(element('div', 'author', inline(author_name) + [
+                    soup.new_tag('br'), element('em', children=inline(author_type))]))
             elif author_name:
-                author_info.append(author_name)
+                author_nodes.append(element('div', 'author', inline(author_name)))
     
-    # Extract abstract text (remove HTML tags for cleaner display)
+    # Abstract with <mark> tags removed but their content kept
     abstract = annotation.get('abstract', '')
-    if abstract:
-        # Parse HTML and extract text, but keep basic formatting
-        abstract_soup = BeautifulSoup(abstract, 'html.parser')
-        # Remove <mark> tags but keep content
-        for mark in abstract_soup.find_all('mark'):
-            mark.unwrap()
-        abstract = str(abstract_soup)
+    abstract_nodes = inline(abstract, unwrap_marks=True) if abstract else []
     
-    # Build frontmatter HTML
-    frontmatter_parts = []
+    frontmatter_nodes = []
     
     # Title page
     full_title = annotation.get('fullTitle', annotation.get('name', ''))
     year = annotation.get('year', '')
     if full_title:
-        frontmatter_parts.append(f'<div class="title-page">')
-        frontmatter_parts.append(f'<h1 class="document-title">{full_title}</h1>')
+        title_children = [element('h1', 'document-title', inline(full_title))]
         
         # Authors side by side
-        if author_info:
-            frontmatter_parts.append('<div class="authors-container">')
-            for author in author_info:
-                frontmatter_parts.append(f'<div class="author">{author}</div>')
-            frontmatter_parts.append('</div>')
+        if author_nodes:
+            title_children.append(block('authors-container', author_nodes))
         
         # Year on title page
         if year:
-            frontmatter_parts.append(f'<div class="title-year">{year}</div>')
+            title_children.append(element('div', 'title-year', inline(year)))
         
-        frontmatter_parts.append('</div>')
+        frontmatter_nodes.append(block('title-page', title_children))
     
     # Citation page (verso)
     cite_as = annotation.get('citeAs', '')
     doi = annotation.get('doi', '')
     if cite_as or doi:
-        frontmatter_parts.append('<div class="citation-page">')
+        citation_children = []
         
         if cite_as:
-            frontmatter_parts.append('<div class="citation-section">')
-            frontmatter_parts.append('<h3>How to Cite</h3>')
-            frontmatter_parts.append(f'<p class="citation-text">{cite_as}</p>')
-            frontmatter_parts.append('</div>')
+            heading = element('h3', children=[NavigableString('How to Cite')])
+            citation_text = element('p', 'citation-text', inline(cite_as))
+            citation_children.append(block('citation-section', [heading, citation_text]))
         
         if doi:
-            frontmatter_parts.append(f'<div class="doi-section"><strong>DOI:</strong> <a href="{doi}">{doi}</a></div>')
+            link = element('a', children=inline(doi))
+            link['href'] = html.unescape(str(doi))
+            citation_children.append(element('div', 'doi-section', [
+                element('strong', children=[NavigableString('DOI:')]), NavigableString(' '), link]))
         
-        frontmatter_parts.append('</div>')
+        frontmatter_nodes.append(block('citation-page', citation_children))
     
     # Abstract on separate page
-    if abstract:
-        frontmatter_parts.append('<div class="abstract-page">')
-        frontmatter_parts.append('<h3>Abstract</h3>')
-        frontmatter_parts.append(f'<div class="abstract-text">{abstract}</div>')
-        frontmatter_parts.append('</div>')
+    if abstract_nodes:
+        heading = element('h3', children=[NavigableString('Abstract')])
+        frontmatter_nodes.append(block('abstract-page', [
+            heading, element('div', 'abstract-text', abstract_nodes)]))
     
     # Add page break before main content
-    frontmatter_parts.append('<div class="page-break"></div>')
-    
-    return '\n'.join(frontmatter_parts)
+    frontmatter_nodes.append(element('div', 'page-break'))
+    
+    # Parts are separated by newlines, as in the string-built frontmatter
+    nodes = []
+    for node in frontmatter_nodes:
+        if nodes:
+            nodes.append(NavigableString('\n'))
+        nodes.append(node)
+    return nodes
 
-def convert_to_pdf(html_content: str, output_path: str) -> bool:
+def convert_to_pdf(html_content: str, output_path: str,
+                   timer: Optional[StageTimer] = None,
+                   stylesheets: Optional[List[Any]] = None,
+                   font_config: Optional[Any] = None) -> bool:
     """
     Convert HTML content to PDF using WeasyPrint.
     
+    Parsing, layout and PDF writing are timed as separate stages.
+    
     Args:
         html_content (str): HTML content to convert
         output_path (str): Path where PDF should be saved
+        timer (StageTimer): Optional timer to record stage timings in
+        stylesheets (list): Optional pre-parsed ``weasyprint.CSS`` objects
+        font_config: Optional shared ``FontConfiguration``
         
     Returns:
         bool: True if conversion successful, False otherwise
     """
+    timer = timer or StageTimer(os.path.basename(output_path))
     try:
         # Create WeasyPrint HTML document
-        html_doc = weasyprint.HTML(string=html_content, base_url=os.getcwd())
+        with timer.span('pdf_parse'):
+            html_doc = weasyprint.HTML(string=html_content, base_url=os.getcwd())
+        
+        # Lay out the pages
+        with timer.span('pdf_layout'):
+            document = html_doc.render(stylesheets=stylesheets, font_config=font_config)
+        timer.count('pdf_pages', len(document.pages))
         
         # Generate PDF
-        html_doc.write_pdf(output_path)
+        with timer.span('pdf_write'):
+            document.write_pdf(output_path)
+        timer.count('pdf_bytes', os.path.getsize(output_path))
+        
+        # Release the layout tree and image buffers before the next essay
+        del document, html_doc
         return True
         
     except Exception as e:
         print(f"PDF conversion error: {e}")
         return False
 
-def convert_to_epub(html_file_path: str, output_path: str, temp_dir: str) -> bool:
+def convert_to_epub(html_file_path: str, output_path: str, temp_dir: str,
+                    timer: Optional[StageTimer] = None,
+                    css_file_path: Optional[str] = None) -> bool:
     """
     Convert HTML file to EPUB using Pandoc.
     
+    Pandoc's HTML reader drops the ``<style>`` elements of ``<head>``, so the
+    stylesheet is handed to it as a file and included in the EPUB.
+    
     Args:
         html_file_path (str): Path to the HTML file
         output_path (str): Path where EPUB should be saved
         temp_dir (str): Temporary directory for intermediate files
+        timer (StageTimer): Optional timer to record stage timings in
+        css_file_path (str): Stylesheet to include in the EPUB
         
     Returns:
         bool: True if conversion successful, False otherwise
     """
+    timer = timer or StageTimer(os.path.basename(output_path))
     try:
         # Use pandoc to convert HTML to EPUB
         cmd = [
@@ -230,8 +401,11 @@ def convert_to_epub(html_file_path: str, output_path: str, temp_dir: str) -> boo
             '--epub-cover-image=', # Empty to disable default cover
             '--self-contained'
         ]
+        if css_file_path:
+            cmd.extend(['--css', css_file_path])
         
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        with timer.span('epub'):
+            result = subprocess.run(cmd, capture_output=True, text=True)
         
         if result.returncode == 0:
             return True
@@ -559,41 +733,104 @@ def clean_external_links(soup: BeautifulSoup) -> int:
     
     return cleaned_count
 
-def prepare_html_for_conversion(html_file_path: str, css_file_path: str, 
-                               html_dir: str = None) -> str:
+def _css_length(value: str) -> str:
+    """Convert an HTML width/height attribute to a CSS length."""
+    value = str(value).strip()
+    return f"{value}px" if value.isdigit() else value
+
+def replace_images_with_placeholders(soup: BeautifulSoup) -> int:
     """
-    Prepare HTML file for conversion with improved footnote formatting.
+    Replace images with labelled placeholder boxes for draft renders.
     
-    This version:
-    1. Parses the HTML file
-    2. Improves footnote reference formatting (ensures proper superscript)
-    3. Enhances endnotes section styling
-    4. Injects the academic CSS stylesheet
-    5. Optimizes the document structure for PDF/EPUB
+    Placeholders use the image's width/height attributes when present, so
+    pagination stays close to the final output without fetching or decoding
+    any image.
     
     Args:
-        html_file_path (str): Path to the HTML file to process
-        css_file_path (str): Path to the CSS stylesheet
-        html_dir (str): Directory containing HTML files and metadata (optional)
+        soup (BeautifulSoup): Parsed HTML document
         
     Returns:
-        str: Modified HTML content ready for conversion
+        int: Number of images replaced
     """
-    with open(html_file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    images = soup.find_all('img')
+    for img in images:
+        styles = []
+        if img.get('width'):
+            styles.append(f"width: {_css_length(img['width'])}")
+        styles.append(f"height: {_css_length(img['height']) if img.get('height') else DRAFT_PLACEHOLDER_HEIGHT}")
+        
+        placeholder = soup.new_tag('div', attrs={'class': 'draft-image-placeholder',
+                                                 'style': '; '.join(styles)})
+        label = img.get('alt') or os.path.basename(img.get('src', ''))
+        placeholder.string = f"[Image: {label}]" if label else "[Image]"
+        img.replace_with(placeholder)
     
-    soup = BeautifulSoup(content, 'html.parser')
+    return len(images)
+
+def enhance_footnote_formatting(soup: BeautifulSoup) -> int:
+    """
+    Improve footnote formatting while keeping the notes as endnotes.
     
-    # Load metadata if html_dir is provided
-    annotations_data = {}
-    authors_data = {}
-    if html_dir:
-        annotations_data, authors_data = load_metadata(html_dir)
+    This function:
+    1. Adds enhanced classes to footnote references and their superscripts
+    2. Adds the enhanced class to the footnotes section
+    3. Adds a "Notes" heading to the footnotes section if missing
     
-    # Extract annotation ID from filename
-    filename = os.path.basename(html_file_path)
-    annotation_id = os.path.splitext(filename)[0]
+    Args:
+        soup (BeautifulSoup): Parsed HTML document
+        
+    Returns:
+        int: Number of footnote references found
+    """
+    print("  Improving footnote formatting...")
+    
+    # Find and enhance footnote references
+    footnote_refs = soup.find_all('a', class_='footnote-ref')
+    if footnote_refs:
+        print(f"    Found {len(footnote_refs)} footnote references")
+        for ref in footnote_refs:
+            # Ensure proper superscript formatting
+            sup_elem = ref.find('sup')
+            if sup_elem:
+                # Add CSS class for consistent styling
+                ref.attrs['class'] = ref.get('class', []) + ['enhanced-footnote-ref']
+                sup_elem.attrs['class'] = sup_elem.get('class', []) + ['enhanced-footnote-sup']
     
+    # Enhance footnotes section - look for both div and section elements
+    footnotes_section = soup.find('div', class_='footnotes') or soup.find('section', id='footnotes')
+    if footnotes_section:
+        print(f"    Enhanced footnotes section")
+        # Add enhanced class while preserving existing classes
+        existing_classes = footnotes_section.get('class', [])
+        if 'enhanced-footnotes' not in existing_classes:
+            footnotes_section.attrs['class'] = existing_classes + ['enhanced-footnotes']
+        
+        # Add section title if missing
+        h2_title = footnotes_section.find('h2')
+        if not h2_title:
+            title = soup.new_tag('h2')
+            title.string = 'Notes'
+            footnotes_section.insert(0, title)
+    
+    return len(footnote_refs)
+
+def normalize_document(soup: BeautifulSoup, html_file_path: str,
+                       resolve_images: bool = True) -> BeautifulSoup:
+    """
+    Fix up the document structure shared by every conversion.
+    
+    Wraps the content in html/head/body if needed, adds the UTF-8 charset and
+    viewport meta tags, removes links to external stylesheets and makes
+    relative image paths absolute ``file://`` URLs.
+    
+    Args:
+        soup (BeautifulSoup): Parsed HTML document
+        html_file_path (str): Path to the HTML file (for resolving image paths)
+        resolve_images (bool): Make relative image paths absolute
+        
+    Returns:
+        BeautifulSoup: The fixed-up document (a new tree if html was missing)
+    """
     # Ensure proper HTML structure
     if not soup.html:
         new_soup = BeautifulSoup('<html><head></head><body></body></html>', 'html.parser')
@@ -626,125 +863,312 @@ def prepare_html_for_conversion(html_file_path: str, css_file_path: str,
                                  'content': 'width=device-width, initial-scale=1.0'})
         soup.head.append(meta)
     
-    # Read and embed CSS
-    with open(css_file_path, 'r', encoding='utf-8') as f:
-        css_content = f.read()
-    
     # Remove any existing links to external stylesheets
     for link in soup.find_all('link', rel='stylesheet'):
         link.decompose()
     
-    # Add our CSS as an embedded stylesheet
-    style_tag = soup.new_tag('style', type='text/css')
-    style_tag.string = css_content
-    soup.head.append(style_tag)
+    # Convert relative image paths to absolute paths
+    if resolve_images:
+        html_dir_path = os.path.dirname(html_file_path)
+        for img in soup.find_all('img', src=True):
+            src = img['src']
+            if not src.startswith(('http://', 'https://', 'data:')):
+                abs_path = os.path.abspath(os.path.join(html_dir_path, src))
+                if os.path.exists(abs_path):
+                    img['src'] = f"file://{abs_path}"
+                else:
+                    print(f"Warning: Image not found: {abs_path}")
     
-    # Improve footnote formatting (keep as endnotes but enhance styling)
-    print("  Improving footnote formatting...")
+    return soup
+
+def prepare_html_for_conversion(html_file_path: str, css_file_path: str, 
+                               html_dir: str = None,
+                               timer: Optional[StageTimer] = None,
+                               metadata_store: Optional[MetadataStore] = None,
+                               embed_css: bool = True,
+                               profile: str = 'final',
+                               css_pruner: Optional[CSSPruner] = None) -> str:
+    """
+    Prepare HTML file for conversion with improved footnote formatting.
     
-    # Find and enhance footnote references
-    footnote_refs = soup.find_all('a', class_='footnote-ref')
-    if footnote_refs:
-        print(f"    Found {len(footnote_refs)} footnote references")
-        for ref in footnote_refs:
-            # Ensure proper superscript formatting
-            sup_elem = ref.find('sup')
-            if sup_elem:
-                # Add CSS class for consistent styling
-                ref.attrs['class'] = ref.get('class', []) + ['enhanced-footnote-ref']
-                sup_elem.attrs['class'] = sup_elem.get('class', []) + ['enhanced-footnote-sup']
+    This version:
+    1. Parses the HTML file
+    2. Improves footnote reference formatting (ensures proper superscript)
+    3. Enhances endnotes section styling
+    4. Injects the academic CSS stylesheet
+    5. Optimizes the document structure for PDF/EPUB
     
-    # Enhance footnotes section - look for both div and section elements
-    footnotes_section = soup.find('div', class_='footnotes') or soup.find('section', id='footnotes')
-    if footnotes_section:
-        print(f"    Enhanced footnotes section")
-        # Add enhanced class while preserving existing classes
-        existing_classes = footnotes_section.get('class', [])
-        if 'enhanced-footnotes' not in existing_classes:
-            footnotes_section.attrs['class'] = existing_classes + ['enhanced-footnotes']
+    Each step is timed as a separate stage on ``timer``.
+    
+    Args:
+        html_file_path (str): Path to the HTML file to process
+        css_file_path (str): Path to the CSS stylesheet
+        html_dir (str): Directory containing HTML files and metadata (optional)
+        timer (StageTimer): Optional timer to record stage timings in
+        metadata_store (MetadataStore): Already loaded metadata to use instead
+            of reading the JSON files from ``html_dir``
+        embed_css (bool): Embed the stylesheet in the document. Pass False when
+            the caller supplies pre-parsed stylesheets to ``convert_to_pdf``
+        profile (str): Render profile ('final' or 'draft', see ``RENDER_PROFILES``)
+        css_pruner (CSSPruner): Optional pruner for the embedded stylesheet; rules
+            that cannot match the prepared document are left out
         
-        # Add section title if missing
-        h2_title = footnotes_section.find('h2')
-        if not h2_title:
-            title = soup.new_tag('h2')
-            title.string = 'Notes'
-            footnotes_section.insert(0, title)
+    Returns:
+        str: Modified HTML content ready for conversion
+    """
+    profile_settings = RENDER_PROFILES[profile]
+    # Extract annotation ID from filename
+    filename = os.path.basename(html_file_path)
+    annotation_id = os.path.splitext(filename)[0]
+    timer = timer or StageTimer(annotation_id)
+    
+    with timer.span('read'):
+        with open(html_file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    timer.count('html_bytes', len(content.encode('utf-8')))
+    
+    with timer.span('parse'):
+        soup = BeautifulSoup(content, 'html.parser')
+    
+    # Load metadata if html_dir is provided
+    annotations_data = {}
+    authors_data = {}
+    if metadata_store is not None:
+        annotations_data = metadata_store.annotations_data
+        authors_data = metadata_store.authors_data
+    elif html_dir:
+        with timer.span('metadata'):
+            annotations_data, authors_data = load_metadata(html_dir)
+    
+    with timer.span('structure'):
+        # Draft placeholders replace the images, so their paths are left alone
+        soup = normalize_document(soup, html_file_path,
+                                  resolve_images=not profile_settings['image_placeholders'])
+    
+    style_tag = None
+    with timer.span('css'):
+        if embed_css:
+            # Read and embed CSS
+            with open(css_file_path, 'r', encoding='utf-8') as f:
+                css_content = f.read()
+            
+            # Add our CSS as an embedded stylesheet
+            style_tag = soup.new_tag('style', type='text/css')
+            style_tag.string = css_content
+            soup.head.append(style_tag)
+    
+    # Improve footnote formatting (keep as endnotes but enhance styling)
+    with timer.span('footnote_formatting'):
+        footnote_refs_count = enhance_footnote_formatting(soup)
+    timer.count('footnote_refs', footnote_refs_count)
     
     # Link figure references to figures
     print("  Linking figure references to figures...")
-    figure_refs_count = link_figure_references(soup)
+    with timer.span('figure_links'):
+        figure_refs_count = link_figure_references(soup)
+    timer.count('figure_refs_linked', figure_refs_count)
     if figure_refs_count > 0:
         print(f"    Linked {figure_refs_count} figure references")
     
     # Clean up external links (remove URL display in text)
-    print("  Cleaning up external link display...")
-    external_links_count = clean_external_links(soup)
-    if external_links_count > 0:
-        print(f"    Cleaned {external_links_count} external links")
-    
-    # Add bidirectional linking from figures to their references
-    print("  Adding figure back-links...")
-    figure_backlinks_count = add_figure_backlinks(soup)
-    if figure_backlinks_count > 0:
-        print(f"    Added back-links to {figure_backlinks_count} figures")
-    
-    # Add enhanced footnote back-links
-    print("  Enhancing footnote back-links...")
-    footnote_backlinks_count = add_footnote_backlinks(soup)
-    if footnote_backlinks_count > 0:
-        print(f"    Enhanced {footnote_backlinks_count} footnote back-links")
+    if profile_settings['clean_external_links']:
+        print("  Cleaning up external link display...")
+        with timer.span('external_links'):
+            external_links_count = clean_external_links(soup)
+        timer.count('external_links_cleaned', external_links_count)
+        if external_links_count > 0:
+            print(f"    Cleaned {external_links_count} external links")
+    
+    if profile_settings['backlinks']:
+        # Add bidirectional linking from figures to their references
+        print("  Adding figure back-links...")
+        with timer.span('figure_backlinks'):
+            figure_backlinks_count = add_figure_backlinks(soup)
+        timer.count('figure_backlinks', figure_backlinks_count)
+        if figure_backlinks_count > 0:
+            print(f"    Added back-links to {figure_backlinks_count} figures")
+        
+        # Add enhanced footnote back-links
+        print("  Enhancing footnote back-links...")
+        with timer.span('footnote_backlinks'):
+            footnote_backlinks_count = add_footnote_backlinks(soup)
+        timer.count('footnote_backlinks', footnote_backlinks_count)
+        if footnote_backlinks_count > 0:
+            print(f"    Enhanced {footnote_backlinks_count} footnote back-links")
     
     # Create and insert enhanced frontmatter if metadata is available
-    if annotations_data and annotation_id in annotations_data:
-        frontmatter_html = create_frontmatter(annotation_id, annotations_data, authors_data)
-        if frontmatter_html:
-            frontmatter_soup = BeautifulSoup(frontmatter_html, 'html.parser')
-            
-            # Remove the existing simple title structure if present
-            existing_h1 = soup.body.find('h1')
-            existing_h4 = None
-            if existing_h1:
-                next_sibling = existing_h1.find_next_sibling()
-                if next_sibling and next_sibling.name == 'h4':
-                    existing_h4 = next_sibling
-            
-            # Insert frontmatter at the beginning of body
-            for element in reversed(frontmatter_soup.contents):
-                if hasattr(element, 'name'):
+    with timer.span('frontmatter'):
+        if annotations_data and annotation_id in annotations_data:
+            frontmatter_nodes = create_frontmatter_nodes(soup, annotation_id, annotations_data,
+                                                         authors_data, metadata_store)
+            if frontmatter_nodes:
+                # Remove the existing simple title structure if present
+                existing_h1 = soup.body.find('h1')
+                existing_h4 = None
+                if existing_h1:
+                    next_sibling = existing_h1.find_next_sibling()
+                    if next_sibling and next_sibling.name == 'h4':
+                        existing_h4 = next_sibling
+                
+                # Insert frontmatter at the beginning of body
+                for element in reversed(frontmatter_nodes):
                     soup.body.insert(0, element)
-            
-            # Remove old title elements if they exist
-            if existing_h1:
-                existing_h1.decompose()
-            if existing_h4:
-                existing_h4.decompose()
-    
-    # Add a title if missing
-    if not soup.title:
-        title_tag = soup.new_tag('title')
-        h1 = soup.find('h1')
-        if h1 and h1.get_text(strip=True):
-            title_tag.string = h1.get_text(strip=True)
-        else:
-            filename = os.path.basename(html_file_path)
-            title_tag.string = os.path.splitext(filename)[0].replace('_', ' ').title()
-        soup.head.append(title_tag)
+                
+                # Remove old title elements if they exist
+                if existing_h1:
+                    existing_h1.decompose()
+                if existing_h4:
+                    existing_h4.decompose()
+    
+    with timer.span('finalize'):
+        # Add a title if missing
+        if not soup.title:
+            title_tag = soup.new_tag('title')
+            h1 = soup.find('h1')
+            if h1 and h1.get_text(strip=True):
+                title_tag.string = h1.get_text(strip=True)
+            else:
+                filename = os.path.basename(html_file_path)
+                title_tag.string = os.path.splitext(filename)[0].replace('_', ' ').title()
+            soup.head.append(title_tag)
+        
+        # Draft renders don't fetch or decode images
+        if profile_settings['image_placeholders']:
+            timer.count('image_placeholders', replace_images_with_placeholders(soup))
+
     
-    # Convert relative image paths to absolute paths
-    html_dir_path = os.path.dirname(html_file_path)
-    for img in soup.find_all('img', src=True):
-        src = img['src']
-        if not src.startswith(('http://', 'https://', 'data:')):
-            abs_path = os.path.abspath(os.path.join(html_dir_path, src))
-            if os.path.exists(abs_path):
-                img['src'] = f"file://{abs_path}"
+    # Drop the CSS rules that cannot match the finished document
+    if css_pruner and style_tag is not None:
+        with timer.span('css_prune'):
+            css_text, rules_dropped = css_pruner.prune(soup)
+            style_tag.string = css_text
+        timer.count('css_rules_dropped', rules_dropped)
+    
+    with timer.span('serialize'):
+        prepared_html = str(soup)
+        # Break the tree's reference cycles so memory is released right away
+        soup.decompose()
+    timer.count('prepared_bytes', len(prepared_html.encode('utf-8')))
+    
+    return prepared_html
+
+def render_profile_of(pdf_path: str) -> Optional[str]:
+    """
+    Profile a PDF was rendered with.
+    
+    Args:
+        pdf_path (str): Path to the PDF
+        
+    Returns:
+        str: Profile name, or None if it wasn't recorded (PDFs rendered
+            before profiles were recorded, or by the other converter scripts)
+    """
+    try:
+        with open(pdf_path + PROFILE_SUFFIX, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def convert_html_file(html_path: str, css_file: str, html_dir: str,
+                      pdf_dir: Optional[str], epub_dir: Optional[str], temp_dir: str,
+                      timer: Optional[StageTimer] = None,
+                      metadata_store: Optional[MetadataStore] = None,
+                      stylesheets: Optional[List[Any]] = None,
+                      font_config: Optional[Any] = None,
+                      profile: str = 'final',
+                      css_pruner: Optional[CSSPruner] = None,
+                      optimize_pdf: bool = False) -> List[str]:
+    """
+    Convert a single HTML file to PDF and/or EPUB.
+    
+    Args:
+        html_path (str): Path to the HTML file
+        css_file (str): Path to CSS stylesheet
+        html_dir (str): Directory containing HTML files and metadata
+        pdf_dir (str): Directory for the PDF, or None to skip PDF creation
+        epub_dir (str): Directory for the EPUB, or None to skip EPUB creation
+        temp_dir (str): Temporary directory for intermediate files
+        timer (StageTimer): Optional timer to record stage timings in
+        metadata_store (MetadataStore): Optional already loaded metadata
+        stylesheets (list): Optional pre-parsed stylesheets for the PDF; when
+            given, the CSS is not embedded in the HTML
+        font_config: Optional shared WeasyPrint ``FontConfiguration``
+        profile (str): Render profile ('final' or 'draft')
+        css_pruner (CSSPruner): Optional pruner for the embedded stylesheet
+        optimize_pdf (bool): Linearize and dedupe the PDF for web delivery
+        
+    Returns:
+        list: Error messages (empty if all requested formats were created)
+    """
+    html_file = os.path.basename(html_path)
+    base_name = os.path.splitext(html_file)[0]
+    timer = timer or StageTimer(base_name)
+    errors = []
+    
+    try:
+        # Prepare HTML content
+        prepared_html = prepare_html_for_conversion(
+            html_path, css_file, html_dir, timer,
+            metadata_store=metadata_store, embed_css=stylesheets is None,
+            profile=profile, css_pruner=css_pruner
+        )
+        
+        # Create temporary HTML file for processing
+        temp_html_path = os.path.join(temp_dir, f"{base_name}_prepared.html")
+        with timer.span('write_temp'):
+            with open(temp_html_path, 'w', encoding='utf-8') as f:
+                f.write(prepared_html)
+        
+        # Convert to PDF
+        if pdf_dir:
+            pdf_path = os.path.join(pdf_dir, f"{base_name}.pdf")
+            # Drop the old record first, so an interrupted render leaves none
+            if os.path.exists(pdf_path + PROFILE_SUFFIX):
+                os.remove(pdf_path + PROFILE_SUFFIX)
+            if convert_to_pdf(prepared_html, pdf_path, timer, stylesheets, font_config):
+                with open(pdf_path + PROFILE_SUFFIX, 'w', encoding='utf-8') as f:
+                    f.write(f"{profile}\n")
+                print(f"  ✓ PDF created: {pdf_path}")
+                if optimize_pdf:
+                    with timer.span('pdf_optimize'):
+                        result = pdf_optimize.optimize_pdf(pdf_path)
+                    timer.count('pdf_optimized_bytes', result['optimized_bytes'])
+                    timer.count('pdf_first_page_bytes', result['first_page_bytes'])
+                    timer.count('pdf_duplicate_streams', result['duplicate_streams'])
+                    if result['problems']:
+                        timer.count('pdf_optimize_failed', 1)
+                        print(f"  ✗ Optimized PDF failed verification, kept original: "
+                              f"{'; '.join(result['problems'])}")
+                    else:
+                        print(f"  ✓ PDF optimized: {result['optimized_bytes']:,} bytes, "
+                              f"first page after {result['first_page_bytes']:,} bytes")
+            else:
+                print(f"  ✗ PDF conversion failed")
+                errors.append(f"PDF conversion failed for {html_file}")
+        
+        # Convert to EPUB
+        if epub_dir:
+            epub_path = os.path.join(epub_dir, f"{base_name}.epub")
+            if convert_to_epub(temp_html_path, epub_path, temp_dir, timer, css_file):
+                print(f"  ✓ EPUB created: {epub_path}")
             else:
-                print(f"Warning: Image not found: {abs_path}")
+                print(f"  ✗ EPUB conversion failed")
+                errors.append(f"EPUB conversion failed for {html_file}")
+            
+    except Exception as e:
+        error_msg = f"Error processing {html_file}: {e}"
+        print(f"  ✗ {error_msg}")
+        errors.append(error_msg)
     
-    return str(soup)
+    return errors
 
 def process_html_files(html_dir: str, output_dir: str, css_file: str, 
-                      create_pdf: bool = True, create_epub: bool = True) -> Tuple[int, int, List[str]]:
+                      create_pdf: bool = True, create_epub: bool = True,
+                      timings: Optional[List[Dict[str, Any]]] = None,
+                      html_files: Optional[List[str]] = None,
+                      profile: str = 'final',
+                      prune_css: bool = True,
+                      optimize_pdf: bool = False) -> Tuple[int, int, List[str]]:
     """
     Process all HTML files in the directory for conversion.
     
@@ -754,12 +1178,19 @@ def process_html_files(html_dir: str, output_dir: str, css_file: str,
         css_file (str): Path to CSS stylesheet
         create_pdf (bool): Whether to create PDF files
         create_epub (bool): Whether to create EPUB files
+        timings (list): Optional list that receives one timing record per file
+        html_files (list): Optional file names to convert, in order
+            (default: every HTML file in ``html_dir``)
+        profile (str): Render profile ('final' or 'draft')
+        prune_css (bool): Leave out the CSS rules each document cannot match
+        optimize_pdf (bool): Linearize and dedupe every PDF for web delivery
         
     Returns:
         tuple: (successful_conversions, total_files, error_list)
     """
     # Find all HTML files
-    html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+    if html_files is None:
+        html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
     total_files = len(html_files)
     successful_conversions = 0
     errors = []
@@ -767,14 +1198,25 @@ def process_html_files(html_dir: str, output_dir: str, css_file: str,
     print(f"Found {total_files} HTML files to convert")
     
     # Create output directories
+    pdf_dir = None
     if create_pdf:
         pdf_dir = os.path.join(output_dir, 'pdfs')
         os.makedirs(pdf_dir, exist_ok=True)
     
+    epub_dir = None
     if create_epub:
         epub_dir = os.path.join(output_dir, 'epubs')
         os.makedirs(epub_dir, exist_ok=True)
     
+    # Load metadata once for the whole batch
+    metadata_store = MetadataStore(html_dir)
+    
+    # Parse the stylesheet once; pruned copies are cached per selector usage
+    css_pruner = None
+    if prune_css:
+        with open(css_file, 'r', encoding='utf-8') as f:
+            css_pruner = CSSPruner(f.read())
+    
     # Process each file
     with tempfile.TemporaryDirectory() as temp_dir:
         for i, html_file in enumerate(html_files, 1):
@@ -782,45 +1224,22 @@ def process_html_files(html_dir: str, output_dir: str, css_file: str,
             html_path = os.path.join(html_dir, html_file)
             
             print(f"Processing {i}/{total_files}: {html_file}")
+            timer = StageTimer(base_name)
             
-            try:
-                # Prepare HTML content
-                prepared_html = prepare_html_for_conversion(html_path, css_file, html_dir)
-                
-                # Create temporary HTML file for processing
-                temp_html_path = os.path.join(temp_dir, f"{base_name}_prepared.html")
-                with open(temp_html_path, 'w', encoding='utf-8') as f:
-                    f.write(prepared_html)
-                
-                file_success = True
-                
-                # Convert to PDF
-                if create_pdf:
-                    pdf_path = os.path.join(pdf_dir, f"{base_name}.pdf")
-                    if convert_to_pdf(prepared_html, pdf_path):
-                        print(f"  ✓ PDF created: {pdf_path}")
-                    else:
-                        print(f"  ✗ PDF conversion failed")
-                        errors.append(f"PDF conversion failed for {html_file}")
-                        file_success = False
-                
-                # Convert to EPUB
-                if create_epub:
-                    epub_path = os.path.join(epub_dir, f"{base_name}.epub")
-                    if convert_to_epub(temp_html_path, epub_path, temp_dir):
-                        print(f"  ✓ EPUB created: {epub_path}")
-                    else:
-                        print(f"  ✗ EPUB conversion failed")
-                        errors.append(f"EPUB conversion failed for {html_file}")
-                        file_success = False
-                
-                if file_success:
-                    successful_conversions += 1
-                    
-            except Exception as e:
-                error_msg = f"Error processing {html_file}: {e}"
-                print(f"  ✗ {error_msg}")
-                errors.append(error_msg)
+            with RSSSampler() as sampler:
+                file_errors = convert_html_file(
+                    html_path, css_file, html_dir, pdf_dir, epub_dir, temp_dir,
+                    timer, metadata_store, profile=profile, css_pruner=css_pruner,
+                    optimize_pdf=optimize_pdf
+                )
+            timer.count('peak_rss_kb', sampler.peak_kb)
+            errors.extend(file_errors)
+            if not file_errors:
+                successful_conversions += 1
+            
+            timer.stop('ok' if not file_errors else 'failed')
+            if timings is not None:
+                timings.append(timer.as_record())
     
     return successful_conversions, total_files, errors
 
@@ -835,6 +1254,31 @@ def main():
                        help='Output directory for converted files (default: ./converted_documents)')
     parser.add_argument('--html-dir', default='../html',
                        help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--watch', action='store_true',
+                       help='Watch HTML, CSS and metadata files and re-render only affected essays')
+    parser.add_argument('--debounce', type=float, default=1.0,
+                       help='Seconds of quiet before a watch-mode rebuild starts (default: 1.0)')
+    parser.add_argument('--workers', type=int, default=0,
+                       help='Render in this many recycled worker processes (default: 0, in-process)')
+    parser.add_argument('--max-essays-per-worker', type=int, default=20,
+                       help='Essays a worker renders before it is replaced (default: 20)')
+    parser.add_argument('--max-worker-rss', type=int, default=1500,
+                       help='Replace a worker once its RSS exceeds this many MB (default: 1500, 0 = no limit)')
+    parser.add_argument('--timeout', type=float, default=0,
+                       help='Kill and replace a worker that spends more than this many seconds on one essay '
+                            '(implies --workers 1 if not given; default: 0, no limit)')
+    parser.add_argument('--profile', choices=sorted(RENDER_PROFILES), default='final',
+                       help='Render profile: draft uses image placeholders and skips back-links and '
+                            'link clean-up for fast proofing builds (default: final)')
+    parser.add_argument('--no-css-pruning', action='store_true',
+                       help='Embed the full stylesheet instead of dropping the rules each essay cannot match')
+    parser.add_argument('--optimize-pdf', action='store_true',
+                       help='Linearize (fast web view) and dedupe each PDF, keeping it only if it '
+                            'passes verification (requires pikepdf)')
+    parser.add_argument('--shard',
+                       help='Convert only shard i of N (e.g. 2/4), balanced by render time or file size')
+    parser.add_argument('--timing-history',
+                       help='Timing report of a previous run used to balance shards by render time')
     
     args = parser.parse_args()
     
@@ -866,6 +1310,11 @@ def main():
         print("Install with: pip install " + " ".join(missing_python))
         sys.exit(1)
     
+    if args.optimize_pdf and pdf_optimize.pikepdf is None:
+        print("Missing Python package for --optimize-pdf: pikepdf")
+        print(pdf_optimize.PIKEPDF_INSTALL_HINT)
+        sys.exit(1)
+    
     if missing_system:
         if create_epub and 'pandoc' in missing_system:
             print("Warning: pandoc not found. EPUB creation will be disabled.")
@@ -878,17 +1327,69 @@ def main():
     output_dir = os.path.abspath(args.output_dir)
     os.makedirs(output_dir, exist_ok=True)
     
+    if args.watch:
+        if args.workers > 0 or args.timeout > 0 or args.shard:
+            print("Error: --watch cannot be combined with --workers, --timeout or --shard")
+            sys.exit(1)
+        from conversion_watch import watch_and_convert
+        print(f"Output directory: {output_dir}")
+        print(f"Render profile: {args.profile}")
+        watch_and_convert(html_dir, output_dir, css_file, create_pdf, create_epub,
+                          debounce=args.debounce, profile=args.profile,
+                          prune_css=not args.no_css_pruning, optimize_pdf=args.optimize_pdf)
+        return
+    
+    # Select this runner's share of the essays
+    html_files = None
+    if args.shard:
+        from conversion_shards import parse_shard, plan_shards
+        try:
+            shard_index, shard_count = parse_shard(args.shard)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        all_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+        shards, _, cost_source = plan_shards(html_dir, all_files, shard_count, args.timing_history)
+        html_files = shards[shard_index - 1]
+        print(f"Shard {shard_index}/{shard_count}: {len(html_files)} of {len(all_files)} essays "
+              f"(balanced by {cost_source}, longest first)")
+    
     print(f"Converting files from: {html_dir}")
     print(f"Output directory: {output_dir}")
     print(f"CSS stylesheet: {css_file}")
     print(f"Creating: {'PDF' if create_pdf else ''} {'EPUB' if create_epub else ''}")
+    print(f"Render profile: {args.profile}")
+    print(f"CSS pruning: {'off' if args.no_css_pruning else 'on'}")
     print("Special feature: Enhanced footnote formatting")
     print("=" * 60)
     
+    # A timeout needs a worker process that can be killed
+    if args.timeout > 0 and args.workers <= 0:
+        args.workers = 1
+    
     # Process files
-    successful, total, errors = process_html_files(
-        html_dir, output_dir, css_file, create_pdf, create_epub
-    )
+    timings = []
+    if args.workers > 0:
+        from render_workers import process_html_files_in_workers
+        successful, total, errors = process_html_files_in_workers(
+            html_dir, output_dir, css_file, create_pdf, create_epub, timings,
+            workers=args.workers, max_essays_per_worker=args.max_essays_per_worker,
+            max_worker_rss_mb=args.max_worker_rss, html_files=html_files,
+            timeout=args.timeout or None, profile=args.profile,
+            prune_css=not args.no_css_pruning, optimize_pdf=args.optimize_pdf
+        )
+    else:
+        successful, total, errors = process_html_files(
+            html_dir, output_dir, css_file, create_pdf, create_epub, timings, html_files,
+            profile=args.profile, prune_css=not args.no_css_pruning,
+            optimize_pdf=args.optimize_pdf
+        )
+    timing_json, timing_csv = write_timing_report(timings, output_dir)
+    timing_summary = summarize_timings(timings)
+    if args.shard:
+        from conversion_shards import write_shard_summary
+        formats = (['PDF'] if create_pdf else []) + (['EPUB'] if create_epub else [])
+        write_shard_summary(output_dir, args.shard, html_files, successful, errors, formats)
     
     # Generate summary report
     print("\n" + "=" * 60)
@@ -919,6 +1420,10 @@ def main():
         f.write(f"Output directory: {output_dir}\n")
         f.write(f"CSS stylesheet: {css_file}\n")
         f.write(f"Formats created: {'PDF' if create_pdf else ''} {'EPUB' if create_epub else ''}\n")
+        f.write(f"Render profile: {args.profile}\n")
+        f.write(f"CSS pruning: {'off' if args.no_css_pruning else 'on'}\n")
+        if args.shard:
+            f.write(f"Shard: {args.shard}\n")
         f.write("Special feature: Enhanced footnote formatting\n\n")
         f.write(f"Total files processed: {total}\n")
         f.write(f"Successful conversions: {successful}\n")
@@ -928,8 +1433,32 @@ def main():
             f.write("Errors:\n")
             for error in errors:
                 f.write(f"  - {error}\n")
+            f.write("\n")
+        
+        if args.optimize_pdf:
+            f.write("PDF Optimization\n")
+            f.write("-" * 20 + "\n")
+            for line in pdf_optimize.format_optimization_summary(
+                    pdf_optimize.results_from_timings(timings)):
+                f.write(line + "\n")
+            f.write("\n")
+        
+        f.write("Timing Summary\n")
+        f.write("-" * 20 + "\n")
+        for line in format_timing_summary(timing_summary):
+            f.write(line + "\n")
+    
+    if args.optimize_pdf:
+        print("\nPDF optimization:")
+        for line in pdf_optimize.format_optimization_summary(pdf_optimize.results_from_timings(timings)):
+            print(f"  {line}")
+    
+    print("\nTiming summary:")
+    for line in format_timing_summary(timing_summary)[:8]:
+        print(f"  {line}")
     
     print(f"\nDetailed report saved to: {report_path}")
+    print(f"Timing report saved to: {timing_json} and {timing_csv}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -31,13 +31,17 @@ import argparse
 import subprocess
 import json
 import re
+import copy
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict, Any
 import weasyprint
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 import shutil
 import tempfile
 
+FOOTNOTE_HREF_PATTERN = re.compile(r'^#fn\d+')
+FOOTNOTE_RETURN_PATTERN = re.compile(r'^#fnref')
+
 def check_dependencies():
     """
     Check if required dependencies are installed.
@@ -195,14 +199,52 @@ def create_frontmatter(annotation_id: str, annotations_data: Dict[str, Any],
     
     return '\n'.join(frontmatter_parts)
 
+def _footnote_inline_content(item) -> list:
+    """
+    Extract the content of a footnote item as inline nodes.
+    
+    Paragraph wrappers are unwrapped (consecutive paragraphs are separated by
+    a space) so the content can live inside an inline footnote span, and
+    leading/trailing whitespace is trimmed. Inline markup such as ``<em>``
+    and links is kept.
+    
+    Args:
+        item: Footnote list item (or div) with return links already removed
+        
+    Returns:
+        list: Extracted nodes, in document order
+    """
+    nodes = []
+    for child in list(item.contents):
+        if child.name == 'p':
+            if nodes and child.contents:
+                nodes.append(NavigableString(' '))
+            nodes.extend(node.extract() for node in list(child.contents))
+        else:
+            nodes.append(child.extract())
+    
+    # Trim the whitespace surrounding the footnote text
+    while nodes and isinstance(nodes[0], NavigableString) and not nodes[0].strip():
+        nodes.pop(0)
+    while nodes and isinstance(nodes[-1], NavigableString) and not nodes[-1].strip():
+        nodes.pop()
+    if nodes and isinstance(nodes[0], NavigableString):
+        nodes[0] = NavigableString(nodes[0].lstrip())
+    if nodes and isinstance(nodes[-1], NavigableString):
+        nodes[-1] = NavigableString(nodes[-1].rstrip())
+    return nodes
+
 def convert_endnotes_to_footnotes(soup: BeautifulSoup) -> BeautifulSoup:
     """
     Convert endnotes structure to proper footnotes for PDF generation.
     
     This function:
-    1. Finds all footnote references in the text
-    2. Locates the corresponding footnote content
-    3. Converts them to proper footnote format using CSS regions
+    1. Finds all footnote references and the footnotes section in one traversal
+    2. Indexes the footnote items by id
+    3. Moves each footnote's content, with its inline markup, next to its
+       reference using the footnote markup styled by the footnotes CSS
+    
+    The document is modified in place; no footnote is re-parsed.
     
     Args:
         soup (BeautifulSoup): Parsed HTML document
@@ -212,19 +254,28 @@ def convert_endnotes_to_footnotes(soup: BeautifulSoup) -> BeautifulSoup:
     """
     print("  Converting endnotes to footnotes...")
     
-    # Find footnote references (links with class="footnote-ref" or href starting with "#fn")
-    footnote_refs = soup.find_all('a', class_='footnote-ref')
-    if not footnote_refs:
-        # Also look for links starting with #fn
-        footnote_refs = soup.find_all('a', href=re.compile(r'^#fn\d+'))
+    # Collect footnote references (links with class="footnote-ref" or href
+    # starting with "#fn") and footnote containers in a single traversal
+    class_refs = []
+    href_refs = []
+    containers = {}
+    for tag in soup.find_all(True):
+        classes = tag.get('class', [])
+        if tag.name == 'a':
+            if 'footnote-ref' in classes:
+                class_refs.append(tag)
+            elif FOOTNOTE_HREF_PATTERN.match(tag.get('href', '')):
+                href_refs.append(tag)
+        elif tag.name in ('div', 'section') and 'footnotes' in classes:
+            containers.setdefault(tag.name, tag)
+        if tag.name == 'div' and tag.get('id') == 'footnotes':
+            containers.setdefault('div#footnotes', tag)
+    
+    footnote_refs = class_refs or href_refs
     
     # Find footnotes section (usually at the end of document)
-    footnotes_section = soup.find('div', class_='footnotes')
-    if not footnotes_section:
-        # Look for other common footnote containers
-        footnotes_section = soup.find('section', class_='footnotes')
-        if not footnotes_section:
-            footnotes_section = soup.find('div', id='footnotes')
+    footnotes_section = (containers.get('div') or containers.get('section')
+                         or containers.get('div#footnotes'))
     
     if not footnote_refs:
         print("    No footnote references found")
@@ -236,72 +287,66 @@ def convert_endnotes_to_footnotes(soup: BeautifulSoup) -> BeautifulSoup:
     
     print(f"    Found {len(footnote_refs)} footnote references")
     
-    # Extract footnote content
-    footnotes_content = {}
-    footnotes_full_content = {}
-    
-    # Look for footnote list items
+    # Index footnote items by id
     footnote_items = footnotes_section.find_all('li')
     if not footnote_items:
         # Look for divs or other containers
         footnote_items = footnotes_section.find_all('div', class_=re.compile(r'footnote'))
     
+    footnotes_index = {}
     for item in footnote_items:
         # Try to extract footnote ID
-        footnote_id = None
-        if item.get('id'):
-            footnote_id = item.get('id')
-        elif item.find('a', id=True):
-            footnote_id = item.find('a', id=True).get('id')
+        footnote_id = item.get('id')
+        if not footnote_id:
+            id_link = item.find('a', id=True)
+            footnote_id = id_link.get('id') if id_link else None
         
         if footnote_id:
-            # Get the text content, removing return links
-            content_copy = BeautifulSoup(str(item), 'html.parser')
-            
             # Remove return links (usually links back to the reference)
-            for return_link in content_copy.find_all('a', href=re.compile(r'^#fnref')):
+            for return_link in item.find_all('a', href=FOOTNOTE_RETURN_PATTERN):
                 return_link.decompose()
-            
-            # Extract text content and full HTML content
-            text_content = content_copy.get_text(strip=True)
-            full_content = str(content_copy)
-            if text_content:
-                footnotes_content[footnote_id] = text_content
-                footnotes_full_content[footnote_id] = full_content
+            if item.get_text(strip=True):
+                footnotes_index[footnote_id] = item
     
-    print(f"    Extracted {len(footnotes_content)} footnote contents")
+    print(f"    Extracted {len(footnotes_index)} footnote contents")
     
     # Convert footnote references to proper superscript with CSS footnote markup
+    converted = {}
     footnote_counter = 1
     for ref in footnote_refs:
         href = ref.get('href', '')
         if href.startswith('#'):
             footnote_id = href[1:]  # Remove the #
             
-            if footnote_id in footnotes_content:
-                footnote_text = footnotes_content[footnote_id]
-                
+            if footnote_id in footnotes_index:
                 # Get the reference number from the link text
                 ref_number = ref.get_text(strip=True)
                 if not ref_number or not ref_number.isdigit():
                     ref_number = str(footnote_counter)
                 
                 # Create a proper footnote structure that WeasyPrint can handle
-                footnote_container = soup.new_tag('span', class_='footnote-container')
+                footnote_container = soup.new_tag('span', attrs={'class': 'footnote-container'})
                 
                 # Footnote call (superscript number in text)
-                footnote_call = soup.new_tag('a', class_='footnote-ref')
+                footnote_call = soup.new_tag('a', attrs={'class': 'footnote-ref'})
                 footnote_call['href'] = f'#footnote-{footnote_counter}'
                 footnote_call['id'] = f'footnote-ref-{footnote_counter}'
                 footnote_call_sup = soup.new_tag('sup')
                 footnote_call_sup.string = ref_number
                 footnote_call.append(footnote_call_sup)
                 
-                # Footnote content (hidden, will be moved to page bottom by CSS)
-                footnote_content = soup.new_tag('span', class_='footnote-content')
+                # Footnote content (moved to page bottom by CSS)
+                footnote_content = soup.new_tag('span', attrs={'class': 'footnote-content'})
                 footnote_content['id'] = f'footnote-{footnote_counter}'
                 footnote_content['data-footnote-number'] = ref_number
-                footnote_content.string = footnote_text
+                if footnote_id in converted:
+                    # Referenced more than once: repeat a copy of the content
+                    nodes = [copy.copy(node) for node in converted[footnote_id].contents]
+                else:
+                    nodes = _footnote_inline_content(footnotes_index[footnote_id])
+                    converted[footnote_id] = footnote_content
+                for node in nodes:
+                    footnote_content.append(node)
                 
                 footnote_container.append(footnote_call)
                 footnote_container.append(footnote_content)
@@ -311,8 +356,7 @@ def convert_endnotes_to_footnotes(soup: BeautifulSoup) -> BeautifulSoup:
                 footnote_counter += 1
     
     # Remove the original footnotes section since we've converted them
-    if footnotes_section:
-        footnotes_section.decompose()
+    footnotes_section.decompose()
     
     print("    Endnotes conversion completed")
     return soup
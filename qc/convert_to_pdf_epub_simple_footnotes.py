@@ -27,6 +27,45 @@ import json
 from typing import Dict, Any
 from bs4 import BeautifulSoup
 
+def improve_footnote_formatting(soup: BeautifulSoup) -> int:
+    """
+    Improve superscript formatting of footnote references and style the endnotes.
+    
+    Args:
+        soup (BeautifulSoup): Parsed HTML document
+        
+    Returns:
+        int: Number of footnote references found
+    """
+    print("  Improving footnote formatting...")
+    
+    # Find and enhance footnote references
+    footnote_refs = soup.find_all('a', class_='footnote-ref')
+    if footnote_refs:
+        print(f"    Found {len(footnote_refs)} footnote references")
+        for ref in footnote_refs:
+            # Ensure proper superscript formatting
+            sup_elem = ref.find('sup')
+            if sup_elem:
+                # Add CSS class for consistent styling
+                ref.attrs['class'] = ref.get('class', []) + ['enhanced-footnote-ref']
+                sup_elem.attrs['class'] = sup_elem.get('class', []) + ['enhanced-footnote-sup']
+    
+    # Enhance footnotes section
+    footnotes_section = soup.find('div', class_='footnotes')
+    if footnotes_section:
+        print(f"    Enhanced footnotes section")
+        footnotes_section.attrs['class'] = footnotes_section.get('class', []) + ['enhanced-footnotes']
+        
+        # Add section title if missing
+        h2_title = footnotes_section.find('h2')
+        if not h2_title:
+            title = soup.new_tag('h2')
+            title.string = 'Notes'
+            footnotes_section.insert(0, title)
+    
+    return len(footnote_refs)
+
 def prepare_html_for_conversion(html_file_path: str, css_file_path: str, 
                                html_dir: str = None) -> str:
     """
@@ -108,32 +147,7 @@ def prepare_html_for_conversion(html_file_path: str, css_file_path: str,
     soup.head.append(style_tag)
     
     # Improve footnote formatting (keep as endnotes but enhance styling)
-    print("  Improving footnote formatting...")
-    
-    # Find and enhance footnote references
-    footnote_refs = soup.find_all('a', class_='footnote-ref')
-    if footnote_refs:
-        print(f"    Found {len(footnote_refs)} footnote references")
-        for ref in footnote_refs:
-            # Ensure proper superscript formatting
-            sup_elem = ref.find('sup')
-            if sup_elem:
-                # Add CSS class for consistent styling
-                ref.attrs['class'] = ref.get('class', []) + ['enhanced-footnote-ref']
-                sup_elem.attrs['class'] = sup_elem.get('class', []) + ['enhanced-footnote-sup']
-    
-    # Enhance footnotes section
-    footnotes_section = soup.find('div', class_='footnotes')
-    if footnotes_section:
-        print(f"    Enhanced footnotes section")
-        footnotes_section.attrs['class'] = footnotes_section.get('class', []) + ['enhanced-footnotes']
-        
-        # Add section title if missing
-        h2_title = footnotes_section.find('h2')
-        if not h2_title:
-            title = soup.new_tag('h2')
-            title.string = 'Notes'
-            footnotes_section.insert(0, title)
+    improve_footnote_formatting(soup)
     
     # Create and insert enhanced frontmatter if metadata is available
     if annotations_data and annotation_id in annotations_data:
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Per-Document CSS Pruning
+
+Drops the rules of the print stylesheet that cannot match a prepared
+document before it is handed to WeasyPrint, so the cascade doesn't test
+frontmatter, footnote, figure back-link or table rules against essays that
+have none of those elements.
+
+A selector is treated as matchable unless it requires an element name,
+class or id that does not occur anywhere in the document. Attribute
+selectors, pseudo-classes and pseudo-elements add no requirements, so the
+check only ever removes rules that cannot apply. At-rules are kept as they
+are (``@page``, ``@font-face``, ...), except that the rules inside
+``@media``/``@supports`` blocks are pruned too.
+
+Which rules survive depends only on which of the stylesheet's names occur in
+the document (the selector-usage signature), so the pruned stylesheet is
+cached by (CSS hash, signature) and essays with the same structure share it.
+
+Key Features:
+- Stylesheet parsed once per run with tinycss2
+- One pass over the document to collect element names, classes and ids
+- Pruned stylesheets cached by (CSS hash, selector-usage signature)
+- Conservative: unknown selector syntax keeps the rule
+
+Usage:
+    pruner = CSSPruner(css_content)
+    css_text, dropped = pruner.prune(soup)
+"""
+import hashlib
+from typing import List, Dict, Tuple, Optional, FrozenSet, Any
+
+import tinycss2
+from bs4 import BeautifulSoup
+
+# At-rules whose content is a list of style rules that can be pruned
+GROUPING_AT_RULES = {'media', 'supports'}
+
+# Elements the HTML parser used by WeasyPrint inserts even when the markup
+# omits them, so their absence from the prepared document proves nothing
+IMPLIED_ELEMENTS = {'html', 'head', 'body', 'tbody', 'colgroup'}
+
+Requirement = Tuple[str, str]
+
+
+def selector_requirements(prelude: List[Any]) -> Optional[List[FrozenSet[Requirement]]]:
+    """
+    Extract the names each selector of a selector list requires.
+
+    Args:
+        prelude (list): tinycss2 component values of a style rule prelude
+
+    Returns:
+        list: One set of ('tag'|'class'|'id', name) requirements per selector,
+            or None if the selector list uses syntax that isn't understood
+    """
+    selectors: List[FrozenSet[Requirement]] = []
+    current: set = set()
+    tokens = list(prelude)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token.type == 'literal' and token.value == ',':
+            selectors.append(frozenset(current))
+            current = set()
+        elif token.type == 'ident':
+            tag = token.lower_value
+            if tag not in IMPLIED_ELEMENTS:
+                current.add(('tag', tag))
+        elif token.type == 'hash':
+            if not token.is_identifier:
+                return None
+            current.add(('id', token.value))
+        elif token.type == 'literal' and token.value == '.':
+            if i + 1 >= len(tokens) or tokens[i + 1].type != 'ident':
+                return None
+            current.add(('class', tokens[i + 1].value))
+            i += 1
+        elif token.type == 'literal' and token.value == ':':
+            # Pseudo-class or pseudo-element ('::' is two colons): skip its name
+            while i + 1 < len(tokens) and tokens[i + 1].type == 'literal' and tokens[i + 1].value == ':':
+                i += 1
+            if i + 1 >= len(tokens) or tokens[i + 1].type not in ('ident', 'function'):
+                return None
+            i += 1
+        elif token.type == 'literal' and token.value in ('*', '>', '+', '~'):
+            pass
+        elif token.type in ('whitespace', 'comment', '[] block'):
+            pass
+        else:
+            # Namespaces, column combinators and anything unexpected
+            return None
+        i += 1
+    selectors.append(frozenset(current))
+    return selectors
+
+
+def document_names(soup: BeautifulSoup) -> FrozenSet[Requirement]:
+    """
+    Collect the element names, classes and ids used in a document.
+
+    Args:
+        soup (BeautifulSoup): Prepared HTML document
+
+    Returns:
+        frozenset: ('tag'|'class'|'id', name) pairs present in the document
+    """
+    names = set()
+    for element in soup.find_all(True):
+        names.add(('tag', element.name.lower()))
+        classes = element.get('class')
+        if classes:
+            if isinstance(classes, str):
+                classes = classes.split()
+            names.update(('class', name) for name in classes)
+        element_id = element.get('id')
+        if element_id:
+            names.add(('id', element_id))
+    return frozenset(names)
+
+
+class _Rule:
+    """A top-level stylesheet node with what it needs to decide whether to keep it."""
+
+    def __init__(self, node, requirements=None, children=None):
+        self.node = node
+        self.requirements = requirements
+        self.children = children
+
+    def keep(self, names: FrozenSet[Requirement]) -> bool:
+        if self.requirements is None:
+            return True
+        return any(selector <= names for selector in self.requirements)
+
+
+class CSSPruner:
+    """
+    Prune one stylesheet against many documents.
+
+    The stylesheet is parsed once; ``prune()`` costs one pass over the
+    document plus a set comparison per rule, and is served from the cache
+    when another document had the same selector-usage signature.
+    """
+
+    def __init__(self, css_content: str):
+        self.css_hash = hashlib.sha1(css_content.encode('utf-8')).hexdigest()
+        self.rules = self._parse_rules(tinycss2.parse_stylesheet(css_content))
+        self.names = frozenset(self._collect_names(self.rules))
+        self.rule_count = self._count_rules(self.rules)
+        self._cache: Dict[Tuple[str, FrozenSet[Requirement]], Tuple[str, int]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _parse_rules(self, nodes) -> List[_Rule]:
+        rules = []
+        for node in nodes:
+            if node.type == 'qualified-rule':
+                rules.append(_Rule(node, requirements=selector_requirements(node.prelude)))
+            elif node.type == 'at-rule' and node.lower_at_keyword in GROUPING_AT_RULES and node.content is not None:
+                rules.append(_Rule(node, children=self._parse_rules(tinycss2.parse_rule_list(node.content))))
+            elif node.type == 'error':
+                continue
+            else:
+                # Comments, whitespace and other at-rules are kept as they are
+                rules.append(_Rule(node))
+        return rules
+
+    def _collect_names(self, rules: List[_Rule]):
+        for rule in rules:
+            if rule.children is not None:
+                yield from self._collect_names(rule.children)
+            elif rule.requirements:
+                for selector in rule.requirements:
+                    yield from selector
+
+    def _count_rules(self, rules: List[_Rule]) -> int:
+        return sum(self._count_rules(rule.children) if rule.children is not None
+                   else int(rule.node.type == 'qualified-rule') for rule in rules)
+
+    def _serialize(self, rules: List[_Rule], names: FrozenSet[Requirement]) -> Tuple[str, int]:
+        parts = []
+        dropped = 0
+        for rule in rules:
+            if rule.children is not None:
+                content, child_dropped = self._serialize(rule.children, names)
+                dropped += child_dropped
+                if child_dropped and child_dropped == self._count_rules(rule.children):
+                    continue
+                node = rule.node
+                parts.append(f"@{node.at_keyword}{tinycss2.serialize(node.prelude)}{{{content}}}")
+            elif rule.keep(names):
+                parts.append(rule.node.serialize())
+            else:
+                dropped += 1
+        return ''.join(parts), dropped
+
+    def signature(self, soup: BeautifulSoup) -> FrozenSet[Requirement]:
+        """
+        Compute the selector-usage signature of a document.
+
+        Args:
+            soup (BeautifulSoup): Prepared HTML document
+
+        Returns:
+            frozenset: The stylesheet's names that occur in the document
+        """
+        return document_names(soup) & self.names
+
+    def prune(self, soup: BeautifulSoup) -> Tuple[str, int]:
+        """
+        Return the stylesheet without the rules that cannot match ``soup``.
+
+        Args:
+            soup (BeautifulSoup): Prepared HTML document
+
+        Returns:
+            tuple: (pruned CSS text, number of style rules dropped)
+        """
+        key = (self.css_hash, self.signature(soup))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        result = self._serialize(self.rules, key[1])
+        self._cache[key] = result
+        return result
+
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+HTML File Encoding Detection
+
+Decodes HTML files for the well-formedness checks. Almost every file is
+UTF-8, so a strict UTF-8 decode is tried first; a charset detector only
+runs when that fails, and only on the first ``DETECTION_PREFIX`` bytes.
+charset-normalizer is used when installed (it is much faster than
+chardet), otherwise chardet, otherwise the file is read as Latin-1.
+
+The same pass reports a byte order mark and the charsets declared in
+``<meta>`` tags that don't match the encoding the file is actually in.
+
+Key Features:
+- Strict UTF-8 fast path, no detector for UTF-8 files
+- Byte order marks (UTF-8, UTF-16, UTF-32) take precedence over detection
+- Declared-vs-actual charset mismatches
+
+Usage:
+    decoded = decode_html(raw_data)
+    if decoded.mismatched:
+        ...
+"""
+import re
+import codecs
+from typing import List, Optional
+
+try:
+    from charset_normalizer import from_bytes
+except ImportError:
+    from_bytes = None
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+# Bytes handed to the detector; enough for the head and several paragraphs
+DETECTION_PREFIX = 64 * 1024
+
+# Declarations are looked for in the first bytes only, like browsers do
+DECLARATION_PREFIX = 4096
+
+# UTF-32 first: its little-endian BOM starts with the UTF-16 one
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+DECLARED_CHARSET_PATTERN = re.compile(rb'<meta\s+[^>]*charset\s*=\s*["\']?([^"\'>\s]+)', re.IGNORECASE)
+DECLARED_CHARSET_TEXT_PATTERN = re.compile(r'<meta\s+[^>]*charset\s*=\s*["\']?([^"\'>\s]+)', re.IGNORECASE)
+
+
+class DecodedHTML:
+    """
+    Decoded content of one file.
+
+    Attributes:
+        content (str): Decoded text; a UTF-8 BOM is kept as '\\ufeff'
+        encoding (str): Codec the content was decoded with
+        utf8 (bool): The file is valid UTF-8
+        bom (str): Encoding named by the byte order mark, or None
+        detected (str): Encoding reported by the detector, or None if no
+            detector ran
+        declared (list): Charsets declared in meta tags, in order
+        mismatched (list): Declared charsets that don't match ``encoding``
+    """
+
+    def __init__(self):
+        self.content: str = ''
+        self.encoding: str = 'utf-8'
+        self.utf8 = True
+        self.bom: Optional[str] = None
+        self.detected: Optional[str] = None
+        self.declared: List[str] = []
+        self.mismatched: List[str] = []
+
+
+def detect_encoding(raw_data: bytes) -> Optional[str]:
+    """
+    Guess the encoding of a byte prefix.
+
+    Args:
+        raw_data (bytes): Start of the file (at most ``DETECTION_PREFIX``
+            bytes are used)
+
+    Returns:
+        str: Encoding name, or None if no detector is installed or none
+            could decide
+    """
+    prefix = raw_data[:DETECTION_PREFIX]
+    if from_bytes is not None:
+        best = from_bytes(prefix).best()
+        return best.encoding if best else None
+    if chardet is not None:
+        return chardet.detect(prefix)['encoding']
+    return None
+
+
+def codec_name(encoding: str) -> Optional[str]:
+    """Normalized codec name ('UTF8' -> 'utf-8'), or None if unknown."""
+    try:
+        return codecs.lookup(encoding).name
+    except LookupError:
+        return None
+
+
+def ascii_compatible(encoding: str) -> bool:
+    """Whether ASCII text is encoded the same in ``encoding``."""
+    try:
+        return codecs.encode('<meta>', encoding) == b'<meta>'
+    except (LookupError, TypeError, ValueError):
+        return False
+
+
+def decode_html(raw_data: bytes) -> DecodedHTML:
+    """
+    Decode an HTML file, detecting the encoding only if it isn't UTF-8.
+
+    Args:
+        raw_data (bytes): File content
+
+    Returns:
+        DecodedHTML: Content, encoding and what was found about it
+    """
+    decoded = DecodedHTML()
+    for bom, encoding in BOMS:
+        if raw_data.startswith(bom):
+            decoded.bom = encoding
+            break
+
+    try:
+        decoded.content = raw_data.decode('utf-8')
+    except UnicodeDecodeError:
+        decoded.utf8 = False
+
+    if not decoded.utf8:
+        candidates = []
+        if decoded.bom:
+            candidates.append(decoded.bom)
+        else:
+            decoded.detected = detect_encoding(raw_data)
+            if decoded.detected:
+                candidates.append(decoded.detected)
+        for encoding in candidates:
+            try:
+                decoded.content = raw_data.decode(encoding)
+                decoded.encoding = codec_name(encoding) or encoding
+                break
+            except (UnicodeDecodeError, LookupError):
+                continue
+        else:
+            decoded.content = raw_data.decode('latin-1', errors='replace')
+            decoded.encoding = codec_name('latin-1')
+
+    # ASCII-compatible declarations can be read from the raw bytes; a
+    # UTF-16/32 file declares its charset in the decoded text
+    if decoded.encoding.startswith('utf-16') or decoded.encoding.startswith('utf-32'):
+        declared = DECLARED_CHARSET_TEXT_PATTERN.findall(decoded.content[:DECLARATION_PREFIX])
+    else:
+        declared = [charset.decode('ascii', errors='replace')
+                    for charset in DECLARED_CHARSET_PATTERN.findall(raw_data[:DECLARATION_PREFIX])]
+    decoded.declared = declared
+
+    # A pure ASCII file is valid in any ASCII-compatible declared charset
+    ascii_only = decoded.utf8 and raw_data.isascii()
+    for charset in declared:
+        name = codec_name(charset)
+        if name == decoded.encoding:
+            continue
+        if ascii_only and ascii_compatible(charset):
+            continue
+        decoded.mismatched.append(charset)
+    return decoded
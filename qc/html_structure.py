@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Single-Pass HTML Structure Scanner
+
+Walks a document once with one compiled tokenizer and collects everything
+the structural checks of ``comprehensive_html_check.py``,
+``html_wellformedness_check.py`` and ``quick_html_analysis.py`` look at:
+the DOCTYPE, which of ``<html>``/``<head>``/``<body>``/``<title>`` are
+opened and literally closed, the declared charsets, the tag stream used for
+the nesting checks, the content of the first ``<head>`` and the number of
+potentially malformed attributes.
+
+The scanner reproduces the regular expressions those checks used to run as
+a dozen separate passes over the full text, including their quirks (tags
+are matched non-overlapping, ``<name/>`` only counts as a tag for the
+comprehensive check, markup inside attribute values is still seen by the
+presence checks), so the findings are unchanged.
+
+Documents in which every '<' starts a complete tag (all essays in the
+corpus) are tokenized with a single ``findall``; anything else falls back
+to a position-tracking scan that keeps the exact regex semantics. The
+malformed-attribute count stays its own pass in the common case: as a
+lookahead inside the tokenizer it cost more than the pass it replaced.
+
+Key Features:
+- One tokenizer pass per document instead of one regex pass per rule
+- Light mode that only tokenizes the structural tags (for quick checks)
+- Same findings as the regex passes it replaces
+
+Usage:
+    scan = scan_structure(content)
+    if not scan.doctype:
+        ...
+"""
+import re
+from typing import List, Tuple, Optional, Set
+
+STRUCTURAL_NAMES = {'html', 'head', 'body', 'title', 'meta'}
+
+# '<' followed by a DOCTYPE or a tag. A tag only consumes its attributes
+# when it is closed by '>' (like '<(/?)(\w+)(?:\s[^>]*)?/?>'); 'inner' is set
+# when the attributes contain another '<' that the checks still need to see,
+# and the lookahead records where a potentially malformed attribute starts.
+TOKEN_PATTERN = re.compile(r"""
+    <(?:
+        (?P<doctype>!DOCTYPE\s+html)
+      | (?=(?P<malformed>\w+[^>]*=[^"'\s][^>\s]*[^"'>])|)
+        (?P<closing>/?)(?P<name>\w+)
+        (?:
+            (?P<bare>>)
+          | (?:\s[^<>]*(?P<inner><)?[^>]*)?(?P<end>/?>)
+        )?
+    )""", re.IGNORECASE | re.VERBOSE)
+
+# Tags and DOCTYPEs of documents in which every '<' starts one of them, as
+# one string per token: 'p' for '<p>', 'p ' when attributes follow the
+# name, '/p', 'br/' for '<br/>', or the DOCTYPE
+COMMON_TOKEN_PATTERN = re.compile(r'''<(/?\w+(?:\s|/(?=>))?|!DOCTYPE\s+html)(?:(?<=\s)[^>]*)?/?>''', re.IGNORECASE)
+
+# Only the DOCTYPE and the structural tags, for checks that don't need the
+# full tag stream
+STRUCTURAL_PATTERN = re.compile(r"""
+    <(?:
+        (?P<doctype>!DOCTYPE\s+html)
+      | (?P<closing>/?)(?P<name>html|head|body|title|meta)\b(?P<bare>>)?
+    )""", re.IGNORECASE | re.VERBOSE)
+
+STRUCTURAL_NAME = re.compile(r'html|head|body|title|meta', re.IGNORECASE)
+
+CHARSET_PATTERN = re.compile(r'<meta\s+[^>]*charset\s*=\s*["\']?([^"\'>\s]+)', re.IGNORECASE)
+CHARSET_MENTION_PATTERN = re.compile(r'<meta\s+[^>]*charset', re.IGNORECASE)
+HEAD_PATTERN = re.compile(r'<head\b[^>]*>(.*?)</head>', re.IGNORECASE | re.DOTALL)
+MALFORMED_ATTRIBUTE_PATTERN = re.compile(r'<\w+[^>]*=[^"\'\s][^>\s]*[^"\'>]')
+
+
+class StructureScan:
+    """
+    Result of scanning one document.
+
+    Attributes:
+        doctype (bool): '<!DOCTYPE html' occurs
+        opened (set): Structural names ('html', 'head', 'body', 'title',
+            'meta') that occur as '<name'
+        closed (set): Structural names that occur as '</name>'
+        charsets (list): Values of 'charset=' in meta tags, in order
+        charset_mentioned (bool): A meta tag mentions 'charset' at all
+        tags (list): (closing '/' or '', lowercased name) of every tag
+            matched by '<(/?)(\\w+)(?:\\s[^>]*)?/?>' (full scans only)
+        slash_only (set): Indices into ``tags`` of '<name/>' tags, which
+            aren't tags for the stricter '<(/?)(\\w+)(?:\\s[^>]*)?>'
+        malformed (int): Number of potentially malformed attributes
+        head_content (str): Content of the first '<head ...>...</head>', or
+            None if there is none (full scans only)
+    """
+
+    def __init__(self):
+        self.doctype = False
+        self.opened: Set[str] = set()
+        self.closed: Set[str] = set()
+        self.charsets: List[str] = []
+        self.charset_mentioned = False
+        self.tags: List[Tuple[str, str]] = []
+        self.slash_only: Set[int] = set()
+        self.malformed = 0
+        self.head_content: Optional[str] = None
+
+    def stricter_tags(self) -> List[Tuple[str, str]]:
+        """Tags as matched by '<(/?)(\\w+)(?:\\s[^>]*)?>' (without '<name/>')."""
+        if not self.slash_only:
+            return self.tags
+        return [tag for i, tag in enumerate(self.tags) if i not in self.slash_only]
+
+
+class _Scanner:
+    """State of one scan; positions keep the non-overlapping regex semantics."""
+
+    def __init__(self, content: str, scan: StructureScan):
+        self.content = content
+        self.scan = scan
+        self.malformed_end = 0
+        self.charset_end = 0
+        self.first_head: Optional[int] = None
+        self.head_closes: List[int] = []
+
+    def structural(self, match, closing: str, name: str) -> None:
+        """Record a structural tag ('<name' or '</name') at ``match``."""
+        scan = self.scan
+        lowered = name.lower()
+        if lowered not in STRUCTURAL_NAMES:
+            # Non-ASCII letters like 'ı' still match case-insensitively
+            if not STRUCTURAL_NAME.fullmatch(name):
+                return
+            lowered = next(n for n in STRUCTURAL_NAMES if re.fullmatch(n, name, re.IGNORECASE))
+        start = match.start()
+        if closing:
+            if match.group('bare'):
+                scan.closed.add(lowered)
+                if lowered == 'head':
+                    self.head_closes.append(start)
+            return
+        scan.opened.add(lowered)
+        if lowered == 'head' and self.first_head is None:
+            self.first_head = start
+        elif lowered == 'meta':
+            if not scan.charset_mentioned and CHARSET_MENTION_PATTERN.match(self.content, start):
+                scan.charset_mentioned = True
+            if start >= self.charset_end:
+                charset = CHARSET_PATTERN.match(self.content, start)
+                if charset:
+                    scan.charsets.append(charset.group(1))
+                    self.charset_end = charset.end()
+
+    def observe(self, match) -> None:
+        """Record everything but the tag itself for a '<' inside another tag."""
+        if match.group('doctype'):
+            self.scan.doctype = True
+            return
+        if match.group('malformed') is not None and match.start() >= self.malformed_end:
+            self.scan.malformed += 1
+            self.malformed_end = match.end('malformed')
+        self.structural(match, match.group('closing'), match.group('name'))
+
+    def observe_inner(self, start: int, end: int) -> None:
+        """Observe every '<' strictly between ``start`` and ``end``."""
+        content = self.content
+        position = content.find('<', start + 1, end)
+        while position != -1:
+            match = TOKEN_PATTERN.match(content, position)
+            if match:
+                self.observe(match)
+            position = content.find('<', position + 1, end)
+
+    def finish(self) -> None:
+        """Resolve the content of the first head element."""
+        if self.first_head is None:
+            return
+        content = self.content
+        gt = content.find('>', self.first_head)
+        if gt == -1:
+            return
+        for close in self.head_closes:
+            if close > gt:
+                self.scan.head_content = content[gt + 1:close]
+                return
+
+
+def scan_structure(content: str, tags: bool = True, malformed: bool = True) -> StructureScan:
+    """
+    Scan a document once for the structural checks.
+
+    Args:
+        content (str): HTML content
+        tags (bool): Tokenize every tag (for the nesting, head and attribute
+            checks); when False only the DOCTYPE, structural tags and
+            charset declarations are collected
+        malformed (bool): Count potentially malformed attributes
+
+    Returns:
+        StructureScan: Scan result
+    """
+    scan = StructureScan()
+    scanner = _Scanner(content, scan)
+
+    if not tags:
+        for match in STRUCTURAL_PATTERN.finditer(content):
+            closing, name = match.group('closing', 'name')
+            if name is None:
+                scan.doctype = True
+            else:
+                scanner.structural(match, closing, name)
+        return scan
+
+    if _scan_common_case(content, scan):
+        if malformed:
+            scan.malformed = len(MALFORMED_ATTRIBUTE_PATTERN.findall(content))
+    else:
+        _scan_exactly(content, scan, scanner)
+    return scan
+
+
+def _scan_common_case(content: str, scan: StructureScan) -> bool:
+    """
+    Scan a document in which every '<' starts a DOCTYPE or a complete tag.
+
+    Returns:
+        bool: False, without touching ``scan``, for any other document
+    """
+    tokens = COMMON_TOKEN_PATTERN.findall(content)
+    if len(tokens) != content.count('<'):
+        return False
+    distinct = set(tokens)
+    if not ''.join(distinct).isascii():
+        return False
+
+    # Every distinct token maps to one shared (closing, name) pair
+    pairs = {}
+    for token in distinct:
+        lowered = token.lower()
+        if lowered.startswith('!'):
+            scan.doctype = True
+            pairs[token] = None
+            continue
+        closing = '/' if lowered.startswith('/') else ''
+        name = lowered[len(closing):]
+        # A trailing '/' or whitespace character isn't part of the name
+        last = name[-1]
+        bare = last.isalnum() or last == '_'
+        if not bare:
+            name = name[:-1]
+        pairs[token] = (closing, name)
+        if name in STRUCTURAL_NAMES:
+            if not closing:
+                scan.opened.add(name)
+            elif bare:
+                # Only literal '</name>' counts
+                scan.closed.add(name)
+
+    tags = list(map(pairs.__getitem__, tokens))
+    if scan.doctype:
+        tags = list(filter(None, tags))
+        tokens = [token for token in tokens if pairs[token]]
+    scan.tags = tags
+    if any(token.endswith('/') for token in distinct):
+        scan.slash_only = {i for i, token in enumerate(tokens) if token.endswith('/')}
+
+    # Charset declarations and the head content are only looked for when
+    # the tag stream has a meta or head tag
+    if 'meta' in scan.opened:
+        scan.charsets = CHARSET_PATTERN.findall(content)
+        scan.charset_mentioned = bool(CHARSET_MENTION_PATTERN.search(content))
+    if 'head' in scan.opened:
+        head = HEAD_PATTERN.search(content)
+        if head:
+            scan.head_content = head.group(1)
+    return True
+
+
+def _scan_exactly(content: str, scan: StructureScan, scanner: _Scanner) -> None:
+    """Scan any document, tracking positions to keep the regex semantics."""
+    token_list = scan.tags
+    append = token_list.append
+    for match in TOKEN_PATTERN.finditer(content):
+        doctype, malformed, closing, name, bare, inner, end = match.groups()
+        if doctype:
+            scan.doctype = True
+            continue
+        if malformed is not None and match.start() >= scanner.malformed_end:
+            scan.malformed += 1
+            scanner.malformed_end = match.end('malformed')
+        lowered = name.lower()
+        if lowered in STRUCTURAL_NAMES or not name.isascii():
+            scanner.structural(match, closing, name)
+        if bare:
+            append((closing, lowered))
+        elif end:
+            if end == '/>':
+                scan.slash_only.add(len(token_list))
+            append((closing, lowered))
+            if inner:
+                scanner.observe_inner(match.start(), match.end())
+    scanner.finish()
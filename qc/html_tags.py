@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Regex Tag and Attribute Tokenizer
+
+The tag and attribute patterns shared by the checks that scan essays
+without building a DOM: ``check_anchors.py`` (ids and links),
+``media_audit.py`` (image sources and alt text) and ``inject_alt_text.py``
+(which rewrites alt values in place and so needs their exact positions).
+
+Attribute values can be double-quoted, single-quoted or unquoted, and
+whitespace is allowed around the ``=``; names are matched as written and
+lowercased by the callers.
+
+Key Features:
+- Opening tags with attributes and ``<img>`` tags
+- Attribute values with their position in the scanned text
+
+Usage:
+    for attribute in ATTRIBUTE_PATTERN.finditer(tag_text):
+        value, start, end, quoted = attribute_value(attribute)
+"""
+import re
+import html
+from typing import Tuple
+
+# Opening tags with attributes; comments and closing tags never match
+TAG_PATTERN = re.compile(r'<([a-zA-Z][\w:-]*)(\s[^>]*)>')
+IMG_PATTERN = re.compile(r'<img\b([^>]*)>', re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'''([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+
+
+def attribute_value(attribute: re.Match) -> Tuple[str, int, int, bool]:
+    """
+    Value of an ``ATTRIBUTE_PATTERN`` match.
+
+    Returns:
+        tuple: (unescaped value, start, end of the raw value without its
+            quotes, whether the value is quoted)
+    """
+    group = next(i for i in (2, 3, 4) if attribute.group(i) is not None)
+    start, end = attribute.span(group)
+    return html.unescape(attribute.group(group)), start, end, group != 4
@@ -11,41 +11,36 @@ from pathlib import Path
 from collections import defaultdict
 import html
 
+from html_encoding import decode_html
+from html_structure import scan_structure
+
 def check_html_structure(content, filename):
     """Check basic HTML structure and return issues found."""
     issues = []
     
+    # One pass over the document collects what every check below needs
+    scan = scan_structure(content, malformed=False)
+    
     # Check for DOCTYPE
-    if not re.search(r'<!DOCTYPE\s+html', content, re.IGNORECASE):
+    if not scan.doctype:
         issues.append("Missing DOCTYPE declaration")
     
     # Check for basic HTML structure
-    if not re.search(r'<html\b', content, re.IGNORECASE):
-        issues.append("Missing <html> tag")
-    
-    if not re.search(r'<head\b', content, re.IGNORECASE):
-        issues.append("Missing <head> tag")
-    
-    if not re.search(r'<body\b', content, re.IGNORECASE):
-        issues.append("Missing <body> tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.opened:
+            issues.append(f"Missing <{tag}> tag")
     
     # Check for closing tags
-    if not re.search(r'</html>', content, re.IGNORECASE):
-        issues.append("Missing </html> closing tag")
-    
-    if not re.search(r'</head>', content, re.IGNORECASE):
-        issues.append("Missing </head> closing tag")
-    
-    if not re.search(r'</body>', content, re.IGNORECASE):
-        issues.append("Missing </body> closing tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.closed:
+            issues.append(f"Missing </{tag}> closing tag")
     
     # Check for common unclosed tags
     unclosed_tags = []
     
-    # Simple regex to find opening and closing tags
+    # Opening and closing tags, names lowercased ('<br/>' is not counted)
     # This is a basic check - more sophisticated parsing would be needed for complex cases
-    tag_pattern = r'<(/?)(\w+)(?:\s[^>]*)?>'
-    tags = re.findall(tag_pattern, content, re.IGNORECASE)
+    tags = scan.stricter_tags()
     
     # Track self-closing and void elements
     void_elements = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 
@@ -53,8 +48,6 @@ def check_html_structure(content, filename):
     
     tag_stack = []
     for is_closing, tag_name in tags:
-        tag_name = tag_name.lower()
-        
         if is_closing:  # Closing tag
             if tag_stack and tag_stack[-1] == tag_name:
                 tag_stack.pop()
@@ -78,12 +71,26 @@ def check_encoding(file_path):
     issues = []
     
     try:
-        # Try to read as UTF-8
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(file_path, 'rb') as f:
+            raw_data = f.read()
+    except Exception as e:
+        issues.append(f"Could not read file: {e}")
+        return None, issues
+    
+    # UTF-8 is decoded directly; the detector only runs for other files
+    decoded = decode_html(raw_data)
+    content = decoded.content
+    
+    if not decoded.utf8:
+        issues.append("File is not valid UTF-8")
         
+        # Check declared charsets against the actual encoding (in a UTF-8
+        # file a mismatch is a non-UTF-8 declaration, reported below)
+        for charset in decoded.mismatched:
+            issues.append(f"Declared charset {charset} does not match actual encoding {decoded.encoding}")
+    else:
         # Check for BOM
-        if content.startswith('\ufeff'):
+        if decoded.bom:
             issues.append("File contains UTF-8 BOM")
         
         # Check for common encoding declarations
@@ -96,19 +103,8 @@ def check_encoding(file_path):
             for charset in encoding_matches:
                 if charset.lower() not in ['utf-8', 'utf8']:
                     issues.append(f"Non-UTF-8 charset declared: {charset}")
-        
-        return content, issues
-        
-    except UnicodeDecodeError:
-        issues.append("File is not valid UTF-8")
-        # Try to read with latin-1 as fallback
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                content = f.read()
-            return content, issues
-        except Exception as e:
-            issues.append(f"Could not read file: {e}")
-            return None, issues
+    
+    return content, issues
 
 def main():
     html_dir = Path('/Users/thc4/Github/m-k-annotation-data/html')
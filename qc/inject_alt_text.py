@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Alt Text Injector
+
+Copies the alt text of the media permissions spreadsheet into the ``alt``
+attributes of the essay images. Images are matched by the Drive id in their
+URL (``.../<ann_id>/<drive id>.jpg``), the same key ``media_audit.py``
+reports on.
+
+Each essay is streamed through the ``<img>`` tokenizer of ``media_audit.py``
+instead of being parsed into a DOM: the text between image tags is copied
+unchanged, and inside a tag only the value of the ``alt`` attribute is
+replaced (or an ``alt`` attribute is added after ``src``). Files are read
+and written as bytes with the UTF-8 ``surrogateescape`` error handler, so
+everything else in the file, including line endings, stays byte-for-byte
+the same.
+
+Essays are rewritten in parallel worker processes. Each file is written to
+``<file>.injecting`` and then renamed over the original, so an interrupted
+run never leaves a half-written essay.
+
+Key Features:
+- Fills in empty and ``fig. N`` placeholder alt text, and updates alt text
+  that differs from the spreadsheet (``--placeholders-only`` to keep it)
+- Byte-preserving rewrite of only the ``alt`` attributes
+- Atomic writes, essays processed in parallel (``--workers``)
+- ``--dry-run`` prints a unified diff instead of writing
+
+Usage:
+    python inject_alt_text.py --dry-run [--html-dir ../html]
+    python inject_alt_text.py [--placeholders-only] [--workers 4]
+"""
+import os
+import re
+import sys
+import html
+import shutil
+import difflib
+import argparse
+from functools import partial
+from typing import List, Dict, Tuple, Optional, Any
+
+from check_pool import map_in_order, add_workers_argument
+from html_tags import IMG_PATTERN, ATTRIBUTE_PATTERN, attribute_value
+from media_audit import ASSET_PATTERN, PLACEHOLDER_ALT_PATTERN
+from media_index import MediaIndex, DEFAULT_EXCEL_FILE
+
+PLACEHOLDER_ALT = re.compile(PLACEHOLDER_ALT_PATTERN, re.IGNORECASE)
+
+
+def alt_texts_by_drive_id(index: MediaIndex) -> Dict[str, str]:
+    """
+    Spreadsheet alt text of every Drive id.
+
+    Args:
+        index (MediaIndex): Media index
+
+    Returns:
+        dict: Drive id -> alt text with whitespace collapsed (ids without
+            alt text are left out; for repeated ids the first row counts)
+    """
+    alt_texts = {}
+    for drive_id, rows in index.by_drive_id.items():
+        text = ' '.join((rows[0]['alt_text'] or '').split())
+        if text:
+            alt_texts[drive_id] = text
+    return alt_texts
+
+
+def rewrite_images(content: str, alt_texts: Dict[str, str],
+                   placeholders_only: bool = False) -> Tuple[str, List[Tuple[int, str, Optional[str], str]]]:
+    """
+    Set the alt text of every image that has alt text in the spreadsheet.
+
+    Only the alt values change; all other text is copied unchanged.
+
+    Args:
+        content (str): HTML content
+        alt_texts (dict): Drive id -> alt text
+        placeholders_only (bool): Only fill in missing, empty and ``fig. N``
+            alt attributes
+
+    Returns:
+        tuple: (new content, (line, drive id, old alt or None, new alt) of
+            every changed image)
+    """
+    output = []
+    changes = []
+    copied = 0
+    line = 1
+    position = 0
+    for match in IMG_PATTERN.finditer(content):
+        attributes = {}
+        for attribute in ATTRIBUTE_PATTERN.finditer(content, match.start(1), match.end(1)):
+            attributes.setdefault(attribute.group(1).lower(), attribute)
+        if 'src' not in attributes:
+            continue
+        asset = ASSET_PATTERN.search(attribute_value(attributes['src'])[0].split('?')[0])
+        alt_text = alt_texts.get(asset.group(2)) if asset else None
+        if alt_text is None:
+            continue
+
+        escaped = html.escape(alt_text, quote=True)
+        if 'alt' in attributes:
+            old_alt, start, end, quoted = attribute_value(attributes['alt'])
+            if old_alt == alt_text or (placeholders_only and not PLACEHOLDER_ALT.fullmatch(old_alt)):
+                continue
+            replacement = escaped if quoted else f'"{escaped}"'
+        else:
+            old_alt = None
+            start = end = attributes['src'].end()
+            replacement = f' alt="{escaped}"'
+
+        line += content.count('\n', position, match.start())
+        position = match.start()
+        changes.append((line, asset.group(2), old_alt, alt_text))
+        output.append(content[copied:start])
+        output.append(replacement)
+        copied = end
+
+    output.append(content[copied:])
+    return ''.join(output), changes
+
+
+def inject_file(html_path: str, alt_texts: Dict[str, str], placeholders_only: bool = False,
+                dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Rewrite the alt text of one essay (runs in a worker process).
+
+    Args:
+        html_path (str): Path to the essay
+        alt_texts (dict): Drive id -> alt text
+        placeholders_only (bool): Only fill in placeholder alt text
+        dry_run (bool): Return a unified diff instead of writing the file
+
+    Returns:
+        dict: changes (see ``rewrite_images``), diff (dry run only) and
+            error (None if the essay was processed)
+    """
+    result = {'changes': [], 'diff': '', 'error': None}
+    try:
+        with open(html_path, 'rb') as f:
+            raw_data = f.read()
+    except OSError as e:
+        result['error'] = f"Could not read file: {e}"
+        return result
+
+    # surrogateescape round-trips any byte, so unchanged text is written back as read
+    content = raw_data.decode('utf-8', errors='surrogateescape')
+    new_content, result['changes'] = rewrite_images(content, alt_texts, placeholders_only)
+    if not result['changes']:
+        return result
+
+    if dry_run:
+        name = os.path.basename(html_path)
+        result['diff'] = ''.join(difflib.unified_diff(
+            content.splitlines(keepends=True), new_content.splitlines(keepends=True),
+            fromfile=f"a/{name}", tofile=f"b/{name}"
+        )).encode('utf-8', errors='surrogateescape').decode('utf-8', errors='replace')
+        return result
+
+    temp_path = f"{html_path}.injecting"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(new_content.encode('utf-8', errors='surrogateescape'))
+        shutil.copymode(html_path, temp_path)
+        os.replace(temp_path, html_path)
+    except OSError as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        result['error'] = f"Could not write file: {e}"
+    return result
+
+
+def main():
+    """Inject spreadsheet alt text into every essay."""
+    parser = argparse.ArgumentParser(description='Copy alt text from the media spreadsheet into the essay images')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--excel-file', default=DEFAULT_EXCEL_FILE,
+                       help='Media permissions workbook')
+    parser.add_argument('--placeholders-only', action='store_true',
+                       help='Only fill in missing, empty and "fig. N" alt text; keep other alt text')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Print a unified diff of the changes instead of writing the files')
+    add_workers_argument(parser)
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+    if not os.path.exists(args.excel_file):
+        print(f"Error: workbook not found: {args.excel_file}")
+        sys.exit(1)
+
+    alt_texts = alt_texts_by_drive_id(MediaIndex(args.excel_file))
+    html_files = sorted(name for name in os.listdir(html_dir) if name.endswith('.html'))
+
+    inject = partial(inject_file, alt_texts=alt_texts, placeholders_only=args.placeholders_only,
+                     dry_run=args.dry_run)
+    results = map_in_order(inject, [os.path.join(html_dir, name) for name in html_files], args.workers)
+
+    if args.dry_run:
+        for result in results:
+            sys.stdout.write(result['diff'])
+        # Keep the diff clean for patch/less; the summary goes to stderr
+        out = sys.stderr
+    else:
+        out = sys.stdout
+
+    changed_files = 0
+    errors = 0
+    for name, result in zip(html_files, results):
+        if result['error']:
+            print(f"✗ {name}: {result['error']}", file=out)
+            errors += 1
+        elif result['changes']:
+            changed_files += 1
+            if not args.dry_run:
+                print(f"✓ {name}: {len(result['changes'])} alt attributes updated", file=out)
+
+    total = sum(len(result['changes']) for result in results)
+    action = "would be updated" if args.dry_run else "updated"
+    print("=" * 60, file=out)
+    print(f"{total} alt attributes in {changed_files} of {len(html_files)} essays {action} "
+          f"({len(alt_texts)} Drive ids have alt text in the spreadsheet)", file=out)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Alt Text and Rights Coverage Audit
+
+Checks every figure of the corpus against the media permissions spreadsheet
+in one run, instead of looking Drive ids up one at a time with
+``debug_uuid.py``.
+
+The ``<img>`` tags of all essays are extracted in parallel worker processes
+(results are cached per file content, see ``check_cache.py``). Image URLs
+have the form ``.../<ann_id>/<drive id>.jpg``; the Drive ids are joined
+against the media index (``media_index.py``) in one pandas merge, and the
+report is built with group-bys over the merged table.
+
+Per essay it reports:
+- images that are not in the spreadsheet
+- missing alt text: the ``alt`` attribute is empty or a ``fig. N``
+  placeholder and the spreadsheet has no alt text for the image either
+- missing permission: the image is in the spreadsheet without an image
+  permission
+- orphaned rows: spreadsheet rows of the essay's folder whose Drive file
+  is not the image of any essay (videos listed in the sheet show up here)
+
+Orphaned rows whose folder names an essay that doesn't exist are listed
+separately as "orphaned (no such essay)".
+
+Key Features:
+- One vectorized join of all images against the spreadsheet
+- Parallel, cached image extraction (``--workers``, ``--changed-since``)
+- Per-essay summary, ``--details`` for every image and row
+
+Usage:
+    python media_audit.py [--html-dir ../html] [--details]
+    python media_audit.py --changed-since HEAD
+"""
+import os
+import re
+import sys
+import time
+import argparse
+from typing import List, Dict, Tuple, Optional, Any
+
+import pandas as pd
+
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, run_cached
+from html_tags import IMG_PATTERN, ATTRIBUTE_PATTERN, attribute_value
+from media_index import MediaIndex, DEFAULT_EXCEL_FILE
+
+# Annotation folder and Drive id of an edition image URL
+ASSET_PATTERN = re.compile(r'/(ann_\d{3}_[a-z]{2}_\d{2})/([\w-]+)\.\w+$')
+ANNOTATION_ID_PATTERN = r'(ann_\d{3}_[a-z]{2}_\d{2})'
+
+# Alt text that only numbers the figure
+PLACEHOLDER_ALT_PATTERN = r'\s*(?:fig(?:ure)?\.?\s*\d+[a-z]?\.?)?\s*'
+
+# Problem categories (column name -> report label), in report order
+CATEGORIES = {
+    'not_in_spreadsheet': 'not in spreadsheet',
+    'missing_alt_text': 'missing alt text',
+    'missing_permission': 'missing permission',
+    'orphaned_row': 'orphaned row',
+}
+NO_ESSAY_LABEL = 'orphaned (no such essay)'
+IMAGE_CATEGORIES = ['not_in_spreadsheet', 'missing_alt_text', 'missing_permission']
+
+
+def extract_images(html_path: str) -> Tuple[List[List[Any]], Optional[str]]:
+    """
+    Collect the images of one essay (runs in a worker process).
+
+    Args:
+        html_path (str): Path to the essay
+
+    Returns:
+        tuple: (images, error) where images holds [line, src, ann_id,
+            drive_id, alt] of every ``<img>`` (ann_id and drive_id are None
+            for URLs that are not edition images, alt is None if the
+            attribute is missing) and error is the read error message or None
+    """
+    try:
+        with open(html_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return [], str(e)
+
+    images = []
+    line = 1
+    position = 0
+    for match in IMG_PATTERN.finditer(content):
+        line += content.count('\n', position, match.start())
+        position = match.start()
+
+        attributes = {}
+        for attribute in ATTRIBUTE_PATTERN.finditer(match.group(1)):
+            attributes.setdefault(attribute.group(1).lower(), attribute_value(attribute)[0])
+        src = attributes.get('src', '')
+        asset = ASSET_PATTERN.search(src.split('?')[0])
+        images.append([line, src,
+                       asset.group(1) if asset else None,
+                       asset.group(2) if asset else None,
+                       attributes.get('alt')])
+    return images, None
+
+
+def image_table(html_files: List[str], results: List[List[List[Any]]]) -> pd.DataFrame:
+    """Images of all essays as one table (essay, line, src, ann_id, drive_id, alt)."""
+    frames = [pd.DataFrame(images, columns=['line', 'src', 'ann_id', 'drive_id', 'alt']).assign(essay=name)
+              for name, images in zip(html_files, results) if images]
+    if not frames:
+        return pd.DataFrame(columns=['essay', 'line', 'src', 'ann_id', 'drive_id', 'alt'])
+    return pd.concat(frames, ignore_index=True)[['essay', 'line', 'src', 'ann_id', 'drive_id', 'alt']]
+
+
+def audit(images: pd.DataFrame, media: pd.DataFrame, essays: List[str],
+          unreadable: List[str] = ()) -> Dict[str, pd.DataFrame]:
+    """
+    Join the images with the spreadsheet and classify the problems.
+
+    Args:
+        images (DataFrame): Output of ``image_table``
+        media (DataFrame): Rows of the media index
+        essays (list): File names of all audited essays
+        unreadable (list): Essays that could not be read; their images are
+            unknown, so the rows of their folders are not reported as orphaned
+
+    Returns:
+        dict: 'images' (merged image table with one boolean column per
+            image category), 'orphans' (spreadsheet rows no essay image
+            uses, with the essay of their folder) and 'orphans_without_essay'
+            (such rows whose folder names an essay that doesn't exist)
+    """
+    sheet = media[media['drive_id'].notna()].drop_duplicates('drive_id')
+    merged = images.merge(sheet[['drive_id', 'row', 'alt_text', 'image_permission']],
+                          on='drive_id', how='left', indicator=True)
+
+    in_sheet = merged.pop('_merge') == 'both'
+    placeholder_alt = merged['alt'].fillna('').str.fullmatch(PLACEHOLDER_ALT_PATTERN, case=False)
+    merged['not_in_spreadsheet'] = ~in_sheet
+    merged['missing_alt_text'] = placeholder_alt & merged['alt_text'].fillna('').str.strip().eq('')
+    # Images missing from the sheet have no permission either; count them once
+    merged['missing_permission'] = in_sheet & merged['image_permission'].fillna('').str.strip().eq('')
+
+    orphans = sheet[~sheet['drive_id'].isin(images['drive_id'])].copy()
+    orphans['essay'] = orphans['folder'].fillna('').str.extract(ANNOTATION_ID_PATTERN, expand=False) + '.html'
+    orphans = orphans[orphans['essay'].notna() & ~orphans['essay'].isin(unreadable)]
+    has_essay = orphans['essay'].isin(essays)
+    return {'images': merged, 'orphans': orphans[has_essay], 'orphans_without_essay': orphans[~has_essay]}
+
+
+def summarize(result: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Per-essay counts: images and one column per problem category."""
+    merged = result['images']
+    summary = merged.groupby('essay').agg(
+        images=('src', 'size'),
+        **{category: (category, 'sum') for category in IMAGE_CATEGORIES}
+    )
+    orphans = result['orphans'].groupby('essay').size().rename('orphaned_row')
+    summary = summary.join(orphans, how='outer').fillna(0).astype(int)
+    return summary.sort_index()
+
+
+def print_details(essay: str, result: Dict[str, pd.DataFrame]) -> None:
+    """Every image problem and orphaned row of one essay."""
+    merged = result['images']
+    for image in merged[merged['essay'] == essay].itertuples(index=False):
+        problems = [CATEGORIES[category] for category in IMAGE_CATEGORIES if getattr(image, category)]
+        if problems:
+            print(f"    ✗ line {image.line}: {image.drive_id or image.src}: {', '.join(problems)}")
+    for row in result['orphans'][result['orphans']['essay'] == essay].itertuples(index=False):
+        print(f"    ✗ spreadsheet row {row.row}: {row.drive_id} ({row.name}): {CATEGORIES['orphaned_row']}")
+
+
+def print_orphans_without_essay(orphans: pd.DataFrame, details: bool) -> None:
+    """Orphaned rows whose folder names an essay that doesn't exist, by essay name."""
+    for essay, rows in orphans.groupby('essay'):
+        print(f"✗ {essay}: {len(rows)} {NO_ESSAY_LABEL}")
+        if details:
+            for row in rows.itertuples(index=False):
+                print(f"    ✗ spreadsheet row {row.row}: {row.drive_id} ({row.name})")
+
+
+def main():
+    """Audit alt text and permissions of every essay image."""
+    parser = argparse.ArgumentParser(description='Audit image alt text and permissions against the spreadsheet')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    parser.add_argument('--excel-file', default=DEFAULT_EXCEL_FILE,
+                       help='Media permissions workbook')
+    parser.add_argument('--details', action='store_true',
+                       help='List every image and spreadsheet row with a problem')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+    if not os.path.exists(args.excel_file):
+        print(f"Error: workbook not found: {args.excel_file}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    html_files = sorted(name for name in os.listdir(html_dir) if name.endswith('.html'))
+    try:
+        results = run_cached(extract_images, [os.path.join(html_dir, name) for name in html_files],
+                             'media_audit', checker_version(extract_images, attribute_value), args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    unreadable = {name: error for name, (_, error) in zip(html_files, results) if error is not None}
+
+    index = MediaIndex(args.excel_file)
+    images = image_table(html_files, [essay_images for essay_images, _ in results])
+    result = audit(images, pd.DataFrame(index.rows), html_files, list(unreadable))
+    summary = summarize(result)
+
+    print(f"Auditing {len(images)} images in {len(html_files)} essays "
+          f"against {len(index.rows)} spreadsheet rows")
+    print("=" * 60)
+
+    for name, error in unreadable.items():
+        print(f"✗ {name}: could not be read: {error}")
+
+    problems = summary[list(CATEGORIES)].sum(axis=1) > 0
+    for essay, counts in summary[problems].iterrows():
+        found = ', '.join(f"{counts[category]} {label}" for category, label in CATEGORIES.items() if counts[category])
+        print(f"✗ {essay} ({counts['images']} images): {found}")
+        if args.details:
+            print_details(essay, result)
+    orphans_without_essay = result['orphans_without_essay']
+    print_orphans_without_essay(orphans_without_essay, args.details)
+
+    print("\n" + "=" * 60)
+    elapsed = time.perf_counter() - start
+    if not problems.any() and orphans_without_essay.empty and not unreadable:
+        print(f"✓ All {len(images)} images have alt text and permissions ({elapsed:.2f}s)")
+        return
+    essays_with_problems = len(set(summary[problems].index) | set(unreadable))
+    print(f"{essays_with_problems} of {len(html_files)} essays have problems ({elapsed:.2f}s):")
+    print(f"  unreadable: {len(unreadable)}")
+    for category, label in CATEGORIES.items():
+        print(f"  {label}: {summary[category].sum()}")
+    print(f"  {NO_ESSAY_LABEL}: {len(orphans_without_essay)}")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Media Index for the Permissions Spreadsheet
+
+Parsing ``media-full-list-alt-text-permissions.xlsx`` with openpyxl takes
+about 1.5 s, and the scripts that look up a Drive file in it used to parse
+it on every call and then walk every row. The index parses the ``release2``
+sheet once, extracts the Google Drive id of every row's link (column C) in
+one vectorized pass and stores the columns the QC tools need in a SQLite
+cache next to the workbook. The cache is rebuilt when the workbook's
+modification time or size changes.
+
+Lookups by Drive id go through an in-memory dict (O(1)); a lookup for a
+partial id falls back to a substring search over the cached links.
+
+Key Features:
+- One workbook parse, cached in ``.media_index.sqlite``
+- Vectorized Drive id extraction from column C
+- O(1) Drive id -> alt text / credit / permission lookups
+
+Usage:
+    index = MediaIndex()
+    for row in index.lookup('1tpkpHvN9d2Am_e4Cmx4WnIPrseuytqHh'):
+        print(row['row'], row['alt_text'], row['image_permission'])
+
+    python media_index.py 1tpkpHvN9d2Am_e4Cmx4WnIPrseuytqHh [--rebuild]
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from typing import List, Dict, Any, Optional
+
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_EXCEL_FILE = os.path.join(SCRIPT_DIR, 'media-full-list-alt-text-permissions.xlsx')
+DEFAULT_SHEET = 'release2'
+
+# Cached columns of the sheet by position (A, B, C, O, P, Q, U)
+COLUMNS = {
+    'folder': 0,
+    'name': 1,
+    'url': 2,
+    'image_credit': 14,
+    'image_permission': 15,
+    'status': 16,
+    'alt_text': 20,
+}
+
+# Google Drive link shapes: the text in front of the id, by format. Only the
+# first shape found in a link counts, so '/open?id=' is 'open', not 'query'.
+DRIVE_URL_FORMATS = {
+    'file': r'/file/d/',                       # /file/d/<id>/view?usp=drivesdk
+    'open': r'/open\?(?:[^#]*&)?id=',          # /open?id=<id>
+    'uc': r'/uc\?(?:[^#]*&)?id=',              # /uc?export=download&id=<id>
+    'docs': r'docs\.google\.com/\w+/d/',       # Docs, Sheets and Slides
+    'query': r'[?&]id=',                       # any other ...?id=<id>
+}
+DRIVE_URL_PATTERN = f"({'|'.join(DRIVE_URL_FORMATS.values())})([\\w-]+)"
+
+# The first two characters of the matched prefix tell the formats apart
+_PREFIX_FORMATS = {'/f': 'file', '/o': 'open', '/u': 'uc', 'do': 'docs', '?i': 'query', '&i': 'query'}
+
+# Bump when the cached table changes shape
+CACHE_FORMAT = 2
+
+
+def extract_drive_id_formats(urls: pd.Series) -> pd.DataFrame:
+    """
+    Extract the Google Drive file id and link format of every link.
+
+    One compiled regex runs over the whole column (``Series.str.extract``;
+    Arrow-backed when pyarrow is installed) instead of parsing each link in
+    Python.
+
+    Args:
+        urls (Series): Links (missing values allowed)
+
+    Returns:
+        DataFrame: 'drive_id' and 'format' (a ``DRIVE_URL_FORMATS`` key)
+            columns with the index of ``urls``; None where a link has no id
+    """
+    groups = urls.astype('string').str.extract(DRIVE_URL_PATTERN)
+    formats = groups[0].str[:2].map(_PREFIX_FORMATS)
+    return pd.DataFrame({
+        'drive_id': groups[1].astype(object).where(groups[1].notna(), None),
+        'format': formats.astype(object).where(formats.notna(), None),
+    }, index=urls.index)
+
+
+def extract_drive_ids(urls: pd.Series) -> pd.Series:
+    """
+    Extract the Google Drive file id of every link in one vectorized pass.
+
+    Args:
+        urls (Series): Links (missing values allowed)
+
+    Returns:
+        Series: Drive ids, None where a link has none
+    """
+    return extract_drive_id_formats(urls)['drive_id']
+
+
+def cache_path_for(excel_file: str) -> str:
+    """Path of the SQLite cache belonging to a workbook."""
+    return os.path.join(os.path.dirname(os.path.abspath(excel_file)), '.media_index.sqlite')
+
+
+class MediaIndex:
+    """
+    Drive id -> spreadsheet rows of the media permissions workbook.
+
+    Attributes:
+        rows (list): One dict per sheet row (row, drive_id, url_format and
+            ``COLUMNS``); 'row' is the position of the row below the header,
+            starting at 1
+        by_drive_id (dict): Drive id -> list of rows with that id
+        rebuilt (bool): The cache was (re)built from the workbook on load
+    """
+
+    def __init__(self, excel_file: str = DEFAULT_EXCEL_FILE, sheet: str = DEFAULT_SHEET,
+                 cache_path: Optional[str] = None, rebuild: bool = False):
+        """
+        Load the index, parsing the workbook only if the cache is stale.
+
+        Args:
+            excel_file (str): Path to the workbook
+            sheet (str): Sheet name
+            cache_path (str): SQLite cache (default: ``.media_index.sqlite``
+                next to the workbook)
+            rebuild (bool): Parse the workbook even if the cache is current
+        """
+        self.excel_file = excel_file
+        self.sheet = sheet
+        self.cache_path = cache_path or cache_path_for(excel_file)
+        self.rows: List[Dict[str, Any]] = []
+        self.by_drive_id: Dict[str, List[Dict[str, Any]]] = {}
+
+        connection = sqlite3.connect(self.cache_path)
+        try:
+            self.rebuilt = rebuild or not self._cache_is_current(connection)
+            if self.rebuilt:
+                self._build(connection)
+            self._load(connection)
+        finally:
+            connection.close()
+
+        for row in self.rows:
+            if row['drive_id']:
+                self.by_drive_id.setdefault(row['drive_id'], []).append(row)
+
+    def _signature(self) -> Dict[str, str]:
+        stat = os.stat(self.excel_file)
+        return {
+            'format': str(CACHE_FORMAT),
+            'sheet': self.sheet,
+            'mtime_ns': str(stat.st_mtime_ns),
+            'size': str(stat.st_size),
+        }
+
+    def _cache_is_current(self, connection: sqlite3.Connection) -> bool:
+        try:
+            stored = dict(connection.execute("SELECT key, value FROM meta"))
+        except sqlite3.OperationalError:
+            return False
+        return stored == self._signature()
+
+    def _build(self, connection: sqlite3.Connection) -> None:
+        """Parse the workbook and replace the cached table."""
+        df = pd.read_excel(self.excel_file, sheet_name=self.sheet)
+        table = pd.DataFrame({name: df.iloc[:, position] for name, position in COLUMNS.items()})
+        table = table.astype(object).where(table.notna(), None)
+        # Keep values as text, the way they are shown in the workbook
+        table = table.apply(lambda column: column.map(lambda value: None if value is None else str(value)))
+        table.insert(0, 'row', range(1, len(table) + 1))
+        drive_ids = extract_drive_id_formats(table['url'])
+        table.insert(1, 'drive_id', drive_ids['drive_id'])
+        table.insert(2, 'url_format', drive_ids['format'])
+
+        with connection:
+            connection.execute("DROP TABLE IF EXISTS media")
+            connection.execute("DROP TABLE IF EXISTS meta")
+            columns = ', '.join(f"{name} TEXT" for name in COLUMNS)
+            connection.execute(f"CREATE TABLE media (row INTEGER, drive_id TEXT, url_format TEXT, {columns})")
+            connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            placeholders = ', '.join('?' * len(table.columns))
+            connection.executemany(f"INSERT INTO media VALUES ({placeholders})",
+                                   table.itertuples(index=False, name=None))
+            connection.executemany("INSERT INTO meta VALUES (?, ?)", self._signature().items())
+
+    def _load(self, connection: sqlite3.Connection) -> None:
+        cursor = connection.execute("SELECT * FROM media ORDER BY row")
+        names = [description[0] for description in cursor.description]
+        self.rows = [dict(zip(names, values)) for values in cursor]
+
+    def lookup(self, drive_id: str) -> List[Dict[str, Any]]:
+        """
+        Rows whose link has the given Drive id.
+
+        Args:
+            drive_id (str): Drive file id
+
+        Returns:
+            list: Matching rows; if no link has exactly this id, rows whose
+                link contains it as a substring
+        """
+        rows = self.by_drive_id.get(drive_id)
+        if rows:
+            return rows
+        return [row for row in self.rows if row['url'] and drive_id in row['url']]
+
+
+def main():
+    """Look up Drive ids in the media index."""
+    parser = argparse.ArgumentParser(description='Look up Drive files in the media permissions spreadsheet')
+    parser.add_argument('drive_ids', nargs='*', help='Google Drive file ids')
+    parser.add_argument('--excel-file', default=DEFAULT_EXCEL_FILE,
+                       help='Media permissions workbook')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Rebuild the cache even if the workbook has not changed')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.excel_file):
+        print(f"Error: workbook not found: {args.excel_file}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    index = MediaIndex(args.excel_file, rebuild=args.rebuild)
+    source = "parsed workbook" if index.rebuilt else "cache"
+    print(f"Loaded {len(index.rows)} rows, {len(index.by_drive_id)} Drive ids "
+          f"({source}, {time.perf_counter() - start:.2f}s)")
+
+    for drive_id in args.drive_ids:
+        rows = index.lookup(drive_id)
+        if not rows:
+            print(f"✗ {drive_id}: not found")
+            continue
+        for row in rows:
+            print(f"✓ {drive_id}: row {row['row']} ({row['name']})")
+            print(f"    Alt text: {row['alt_text'] or 'N/A'}")
+            print(f"    Permission: {row['image_permission'] or 'N/A'}")
+
+
+if __name__ == "__main__":
+    main()
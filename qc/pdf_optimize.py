@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+PDF Post-Processing for Web Delivery
+
+Rewrites the PDFs produced by ``convert_to_pdf`` so readers of the edition
+site see the first page before the whole file has downloaded:
+
+- Per-page resources: WeasyPrint gives every page one shared resource
+  dictionary, so the first page depends on every image and font in the
+  essay. Unused entries are removed from each page's resources so the first
+  page only pulls in what it draws.
+- Linearization (fast web view): the objects of the first page come first
+  in the file, with hint tables for the rest.
+- Identical streams (images, fonts, ...) stored more than once are merged,
+  which matters for merged documents such as cohort volumes.
+- Streams that were written uncompressed are compressed.
+
+Image and font streams are not decoded or recompressed, so the output is
+lossless. WeasyPrint already subsets fonts and compresses its streams
+(recompressing them or packing objects into object streams made the files
+larger), so the linearization hint tables usually make a file slightly
+larger overall; the gain is in the bytes needed before page one. Every optimized file is
+checked before it replaces the original: it must open, pass qpdf's syntax
+and linearization checks and have the same pages with the same content
+streams. Otherwise the original is kept.
+
+Requires pikepdf (``pip install pikepdf``).
+
+Key Features:
+- ``--optimize-pdf`` option for ``convert_to_pdf_epub.py``
+- Bytes saved and bytes needed before the first page can be shown
+- Estimated time-to-first-page at a given bandwidth
+- ``--check`` to validate existing PDFs without rewriting them
+
+Usage:
+    python convert_to_pdf_epub.py --pdf-only --optimize-pdf
+    python pdf_optimize.py converted_documents/pdfs [--bandwidth 5] [--check]
+"""
+import os
+import re
+import sys
+import time
+import hashlib
+import argparse
+import statistics
+from typing import List, Dict, Any, Optional, Tuple
+
+try:
+    import pikepdf
+except ImportError:
+    pikepdf = None
+
+PIKEPDF_INSTALL_HINT = "Install with: pip install pikepdf"
+
+# Bandwidth for the time-to-first-page estimate, in Mbit/s
+DEFAULT_BANDWIDTH_MBPS = 5.0
+
+# The linearization dictionary is within the first 1024 bytes; /E is the
+# offset of the end of the first page's objects
+LINEARIZATION_PATTERN = re.compile(rb'/Linearized\b.*?/E\s+(\d+)', re.S)
+
+
+def first_page_bytes(pdf_path: str) -> int:
+    """
+    Number of bytes a viewer must download before it can show page one.
+
+    Args:
+        pdf_path (str): Path to a PDF file
+
+    Returns:
+        int: End of the first-page section for linearized files, otherwise
+            the file size (the cross-reference table is at the end)
+    """
+    with open(pdf_path, 'rb') as f:
+        match = LINEARIZATION_PATTERN.search(f.read(1024))
+    return int(match.group(1)) if match else os.path.getsize(pdf_path)
+
+
+def _object_key(value) -> bytes:
+    """Serialize a stream dictionary value, keeping indirect references unresolved."""
+    if isinstance(value, pikepdf.Object):
+        if value.is_indirect:
+            return b'%d %d R' % value.objgen
+        return value.unparse()
+    return repr(value).encode()
+
+
+def _stream_key(stream) -> Tuple[bytes, bytes]:
+    """Identify a stream by its raw data and its dictionary (minus /Length)."""
+    entries = b' '.join(key.encode() + b' ' + _object_key(value)
+                        for key, value in sorted(stream.stream_dict.items()) if key != '/Length')
+    return hashlib.sha256(stream.read_raw_bytes()).digest(), entries
+
+
+def _replace_references(container, duplicates: Dict[Tuple[int, int], Any]) -> None:
+    """Point references to duplicate streams at the stream that is kept."""
+    if isinstance(container, pikepdf.Stream):
+        container = container.stream_dict
+    if isinstance(container, pikepdf.Dictionary):
+        keys = list(container.keys())
+    elif isinstance(container, pikepdf.Array):
+        keys = range(len(container))
+    else:
+        return
+
+    for key in keys:
+        value = container[key]
+        if not isinstance(value, pikepdf.Object):
+            continue
+        if value.is_indirect:
+            if value.objgen in duplicates:
+                container[key] = duplicates[value.objgen]
+        else:
+            _replace_references(value, duplicates)
+
+
+def dedupe_streams(pdf) -> int:
+    """
+    Merge streams with identical data and dictionaries.
+
+    References to a duplicate are redirected to the first copy; the
+    duplicates are then unreferenced and dropped when the file is saved.
+
+    Args:
+        pdf (pikepdf.Pdf): Open PDF
+
+    Returns:
+        int: Number of duplicate streams merged
+    """
+    kept: Dict[Tuple[bytes, bytes], Any] = {}
+    duplicates: Dict[Tuple[int, int], Any] = {}
+    for obj in pdf.objects:
+        if isinstance(obj, pikepdf.Stream):
+            key = _stream_key(obj)
+            if key in kept:
+                duplicates[obj.objgen] = kept[key]
+            else:
+                kept[key] = obj
+
+    if duplicates:
+        for obj in pdf.objects:
+            _replace_references(obj, duplicates)
+        _replace_references(pdf.trailer, duplicates)
+    return len(duplicates)
+
+
+def page_fingerprints(pdf) -> List[str]:
+    """
+    Hash the content streams of every page.
+
+    Args:
+        pdf (pikepdf.Pdf): Open PDF
+
+    Returns:
+        list: One digest per page
+    """
+    fingerprints = []
+    for page in pdf.pages:
+        digest = hashlib.sha256()
+        contents = page.obj.get('/Contents')
+        streams = contents if isinstance(contents, pikepdf.Array) else [contents]
+        for stream in streams:
+            if stream is not None:
+                digest.update(stream.read_bytes())
+        fingerprints.append(digest.hexdigest())
+    return fingerprints
+
+
+def verify_pdf(pdf_path: str, expected_pages: Optional[List[str]] = None,
+               linearized: bool = False) -> List[str]:
+    """
+    Check that a PDF is valid.
+
+    Args:
+        pdf_path (str): Path to the PDF
+        expected_pages (list): Page fingerprints the file must have (optional)
+        linearized (bool): Also require a valid linearization
+
+    Returns:
+        list: Problems found (empty if the file is valid)
+    """
+    try:
+        with pikepdf.open(pdf_path) as pdf:
+            problems = list(pdf.check_pdf_syntax())
+            if linearized and not (pdf.is_linearized and pdf.check_linearization()):
+                problems.append("linearization is missing or invalid")
+            if expected_pages is not None:
+                pages = page_fingerprints(pdf)
+                if len(pages) != len(expected_pages):
+                    problems.append(f"page count changed ({len(expected_pages)} -> {len(pages)})")
+                elif pages != expected_pages:
+                    changed = sum(1 for a, b in zip(pages, expected_pages) if a != b)
+                    problems.append(f"content of {changed} page(s) changed")
+    except Exception as e:
+        problems = [f"cannot be opened: {e}"]
+    return problems
+
+
+def optimize_pdf(pdf_path: str) -> Dict[str, Any]:
+    """
+    Linearize and dedupe a PDF in place.
+
+    The optimized file replaces the original only if it passes
+    ``verify_pdf()``.
+
+    Args:
+        pdf_path (str): Path to the PDF
+
+    Returns:
+        dict: Sizes before/after, first-page bytes before/after, duplicate
+            streams merged, and any verification problems
+    """
+    original_bytes = os.path.getsize(pdf_path)
+    original_first_page = first_page_bytes(pdf_path)
+    temp_path = f"{pdf_path}.optimizing"
+
+    duplicates = 0
+    try:
+        with pikepdf.open(pdf_path) as pdf:
+            expected_pages = page_fingerprints(pdf)
+            duplicates = dedupe_streams(pdf)
+            pdf.remove_unreferenced_resources()
+            pdf.save(temp_path, linearize=True, compress_streams=True)
+    except Exception as e:
+        problems = [f"cannot be optimized: {e}"]
+    else:
+        problems = verify_pdf(temp_path, expected_pages, linearized=True)
+
+    if problems:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    else:
+        os.replace(temp_path, pdf_path)
+
+    return {
+        'original_bytes': original_bytes,
+        'optimized_bytes': os.path.getsize(pdf_path),
+        'original_first_page_bytes': original_first_page,
+        'first_page_bytes': first_page_bytes(pdf_path),
+        'duplicate_streams': duplicates,
+        'problems': problems,
+    }
+
+
+def results_from_timings(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Rebuild optimization results from the counters of timing records.
+
+    Args:
+        records (list): Records produced by ``StageTimer.as_record()``
+
+    Returns:
+        list: Results in the format of ``optimize_pdf()``
+    """
+    results = []
+    for record in records:
+        counters = record['counters']
+        if 'pdf_optimized_bytes' not in counters:
+            continue
+        results.append({
+            'original_bytes': counters['pdf_bytes'],
+            'optimized_bytes': counters['pdf_optimized_bytes'],
+            'original_first_page_bytes': counters['pdf_bytes'],
+            'first_page_bytes': counters['pdf_first_page_bytes'],
+            'duplicate_streams': counters.get('pdf_duplicate_streams', 0),
+            'problems': ['verification failed'] if counters.get('pdf_optimize_failed') else [],
+        })
+    return results
+
+
+def format_optimization_summary(results: List[Dict[str, Any]],
+                                bandwidth_mbps: float = DEFAULT_BANDWIDTH_MBPS) -> List[str]:
+    """
+    Summarize optimization results as report lines.
+
+    Args:
+        results (list): Results of ``optimize_pdf()``
+        bandwidth_mbps (float): Bandwidth for the time-to-first-page estimate
+
+    Returns:
+        list: Lines of text (without trailing newlines)
+    """
+    if not results:
+        return ["Optimized PDFs: 0"]
+
+    before = sum(r['original_bytes'] for r in results)
+    after = sum(r['optimized_bytes'] for r in results)
+    bytes_per_second = bandwidth_mbps * 1_000_000 / 8
+    first_before = statistics.median(r['original_first_page_bytes'] for r in results)
+    first_after = statistics.median(r['first_page_bytes'] for r in results)
+    failed = sum(1 for r in results if r['problems'])
+
+    return [
+        f"Optimized PDFs: {len(results) - failed}" + (f" ({failed} kept unoptimized)" if failed else ""),
+        f"Total size: {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB "
+        f"(saved {(before - after) / 1024:,.0f} KB, {(before - after) / before * 100:.1f}%)",
+        f"Duplicate streams merged: {sum(r['duplicate_streams'] for r in results)}",
+        f"Median bytes before first page: {first_before / 1024:,.0f} KB -> {first_after / 1024:,.0f} KB",
+        f"Median time to first page at {bandwidth_mbps:g} Mbit/s: "
+        f"{first_before / bytes_per_second:.2f}s -> {first_after / bytes_per_second:.2f}s",
+    ]
+
+
+def main():
+    """Optimize or check the PDFs in a directory."""
+    parser = argparse.ArgumentParser(description='Linearize and size-optimize PDFs for web delivery')
+    parser.add_argument('pdf_dir', help='Directory containing PDF files (e.g. converted_documents/pdfs)')
+    parser.add_argument('--bandwidth', type=float, default=DEFAULT_BANDWIDTH_MBPS,
+                        help=f'Bandwidth in Mbit/s for the time-to-first-page estimate '
+                             f'(default: {DEFAULT_BANDWIDTH_MBPS:g})')
+    parser.add_argument('--check', action='store_true',
+                        help='Only check that the PDFs are valid, without rewriting them')
+
+    args = parser.parse_args()
+
+    if pikepdf is None:
+        print("Error: pikepdf is required for PDF optimization")
+        print(PIKEPDF_INSTALL_HINT)
+        sys.exit(1)
+
+    pdf_dir = os.path.abspath(args.pdf_dir)
+    if not os.path.isdir(pdf_dir):
+        print(f"Error: PDF directory not found: {pdf_dir}")
+        sys.exit(1)
+
+    pdf_files = sorted(f for f in os.listdir(pdf_dir) if f.endswith('.pdf'))
+    print(f"{'Checking' if args.check else 'Optimizing'} {len(pdf_files)} PDF files in {pdf_dir}")
+    print("=" * 60)
+
+    results = []
+    invalid = 0
+    start = time.perf_counter()
+    for filename in pdf_files:
+        pdf_path = os.path.join(pdf_dir, filename)
+        if args.check:
+            problems = verify_pdf(pdf_path)
+            invalid += bool(problems)
+            linearized = first_page_bytes(pdf_path) < os.path.getsize(pdf_path)
+            status = '✗ ' + '; '.join(problems) if problems else '✓'
+            print(f"{status} {filename}" + (" (linearized)" if linearized else ""))
+            continue
+
+        result = optimize_pdf(pdf_path)
+        results.append(result)
+        if result['problems']:
+            invalid += 1
+            print(f"✗ {filename}: kept original ({'; '.join(result['problems'])})")
+        else:
+            print(f"✓ {filename}: {result['original_bytes']:,} -> {result['optimized_bytes']:,} bytes, "
+                  f"first page {result['original_first_page_bytes']:,} -> {result['first_page_bytes']:,} bytes")
+
+    print("=" * 60)
+    if not args.check:
+        for line in format_optimization_summary(results, args.bandwidth):
+            print(line)
+    print(f"Time: {time.perf_counter() - start:.1f}s")
+    if invalid:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
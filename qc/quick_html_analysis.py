@@ -5,43 +5,37 @@ Performs basic well-formedness checks on HTML files
 """
 
 import os
-import re
 from pathlib import Path
 
+from html_structure import scan_structure
+
 def check_basic_structure(content, filename):
     """Check basic HTML structure"""
     issues = []
     
+    # One pass over the structural tags collects what every check below needs
+    scan = scan_structure(content, tags=False)
+    
     # Check for DOCTYPE
-    if not re.search(r'<!DOCTYPE\s+html', content, re.IGNORECASE):
+    if not scan.doctype:
         issues.append("Missing DOCTYPE declaration")
     
     # Check for basic tags
-    if not re.search(r'<html\b', content, re.IGNORECASE):
-        issues.append("Missing <html> tag")
-    
-    if not re.search(r'<head\b', content, re.IGNORECASE):
-        issues.append("Missing <head> tag")
-    
-    if not re.search(r'<body\b', content, re.IGNORECASE):
-        issues.append("Missing <body> tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.opened:
+            issues.append(f"Missing <{tag}> tag")
     
     # Check for closing tags
-    if not re.search(r'</html>', content, re.IGNORECASE):
-        issues.append("Missing </html> closing tag")
-    
-    if not re.search(r'</head>', content, re.IGNORECASE):
-        issues.append("Missing </head> closing tag")
-    
-    if not re.search(r'</body>', content, re.IGNORECASE):
-        issues.append("Missing </body> closing tag")
+    for tag in ('html', 'head', 'body'):
+        if tag not in scan.closed:
+            issues.append(f"Missing </{tag}> closing tag")
     
     # Check for charset
-    if not re.search(r'<meta\s+[^>]*charset', content, re.IGNORECASE):
+    if not scan.charset_mentioned:
         issues.append("No charset declaration found")
     
     # Check for title
-    if not re.search(r'<title\b', content, re.IGNORECASE):
+    if 'title' not in scan.opened:
         issues.append("Missing <title> tag")
     
     return issues
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Client for the PDF/EPUB Render Service
+
+Thin command-line client that asks a running ``render_service.py`` to render
+one or more essays. It only uses the standard library, so it starts instantly.
+
+Usage:
+    python render_client.py ann_003_fa_14 [ann_310_ie_19 ...] [--epub] [--port 8765]
+    python render_client.py --health
+"""
+import sys
+import json
+import argparse
+import urllib.request
+import urllib.error
+
+DEFAULT_PORT = 8765
+
+
+def request_json(url: str, payload: dict = None, timeout: float = 600) -> dict:
+    """
+    Send a request to the render service and decode the JSON response.
+
+    Args:
+        url (str): Endpoint URL
+        payload (dict): JSON body for a POST request, or None for GET
+        timeout (float): Request timeout in seconds
+
+    Returns:
+        dict: Decoded JSON response (also for HTTP error responses)
+    """
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return json.loads(e.read())
+
+
+def main():
+    """Render the requested essays through the render service."""
+    parser = argparse.ArgumentParser(description='Render essays through the running render service')
+    parser.add_argument('essays', nargs='*', help='Essay ids to render (e.g. ann_003_fa_14)')
+    parser.add_argument('--epub', action='store_true', help='Also create EPUB files')
+    parser.add_argument('--epub-only', action='store_true', help='Create only EPUB files')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port of the render service (default: {DEFAULT_PORT})')
+    parser.add_argument('--health', action='store_true', help='Show the service status')
+
+    args = parser.parse_args()
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        if args.health:
+            print(json.dumps(request_json(f"{base_url}/health"), indent=2))
+            return
+
+        if not args.essays:
+            parser.error("no essays given")
+
+        formats = ['epub'] if args.epub_only else (['pdf', 'epub'] if args.epub else ['pdf'])
+        failures = 0
+        for essay in args.essays:
+            result = request_json(f"{base_url}/render", {'essay': essay, 'formats': formats})
+            if result.get('success'):
+                print(f"✓ {result['essay']} ({result['timing']['total_seconds']:.2f}s)")
+                for fmt, path in result['outputs'].items():
+                    print(f"  {fmt.upper()}: {path}")
+                for warning in result.get('warnings', []):
+                    print(f"  Warning: {warning}")
+            else:
+                failures += 1
+                print(f"✗ {result.get('essay', essay)}")
+                for error in result.get('errors', [result.get('error', 'Unknown error')]):
+                    print(f"  - {error}")
+    except urllib.error.URLError as e:
+        print(f"Error: could not reach render service at {base_url}: {e.reason}")
+        print("Start it with: python render_service.py")
+        sys.exit(1)
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
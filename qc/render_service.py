@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Render Service for Single-Essay PDF/EPUB Conversion
+
+Long-lived local HTTP service that keeps WeasyPrint warm between renders.
+Python, WeasyPrint and BeautifulSoup are imported once, the dependency check
+(including the ``pandoc --version`` subprocess) runs once at startup, and the
+parsed stylesheet, font configuration and metadata store stay in memory.
+Each request then only pays for preparing and laying out one essay.
+
+Key Features:
+- Holds the parsed academic stylesheet and a shared FontConfiguration
+- Keeps annotations/authors metadata in a MetadataStore (reloaded on change)
+- Re-parses the stylesheet automatically when the CSS file is modified
+- Returns per-stage timings for every render
+- Binds to localhost only
+
+Endpoints:
+    GET  /health   - Service status and loaded configuration
+    POST /render   - Render one essay; JSON body:
+                     {"essay": "ann_003_fa_14", "formats": ["pdf", "epub"]}
+
+Usage:
+    python render_service.py [--port 8765] [--output-dir OUTPUT] [--html-dir DIR]
+    python render_client.py ann_003_fa_14
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+
+import weasyprint
+from weasyprint.text.fonts import FontConfiguration
+
+from convert_to_pdf_epub import check_dependencies, convert_html_file, MetadataStore
+from conversion_timing import StageTimer
+from css_pruning import CSSPruner
+
+DEFAULT_PORT = 8765
+OUTPUT_FORMATS = ('pdf', 'epub')
+
+
+class RenderService:
+    """
+    Rendering state shared across requests.
+
+    Rendering is serialized with a lock; WeasyPrint layouts are CPU-bound and
+    the service is meant for one editor's machine.
+    """
+
+    def __init__(self, html_dir: str, output_dir: str, css_file: str, epub_available: bool,
+                 profile: str = 'final', prune_css: bool = False, optimize_pdf: bool = False):
+        """
+        Load the stylesheet and metadata.
+
+        Args:
+            html_dir (str): Directory containing HTML files and metadata
+            output_dir (str): Directory to save converted files
+            css_file (str): Path to CSS stylesheet
+            epub_available (bool): pandoc was found
+            profile (str): Render profile ('final' or 'draft')
+            prune_css (bool): Embed a pruned stylesheet per essay instead of
+                using one pre-parsed stylesheet
+            optimize_pdf (bool): Linearize and dedupe every PDF
+        """
+        self.html_dir = html_dir
+        self.output_dir = output_dir
+        self.css_file = css_file
+        self.epub_available = epub_available
+        self.profile = profile
+        self.prune_css = prune_css
+        self.optimize_pdf = optimize_pdf
+        self.metadata_store = MetadataStore(html_dir)
+        self.font_config = FontConfiguration()
+        self.stylesheets: Optional[List[Any]] = []
+        self.css_pruner: Optional[CSSPruner] = None
+        self._css_mtime = None
+        self._lock = threading.Lock()
+        self._temp_dir = tempfile.mkdtemp(prefix='render_service_')
+        self.renders = 0
+        self._load_stylesheet()
+
+    def _load_stylesheet(self) -> bool:
+        """
+        Parse the stylesheet if it changed since it was last loaded.
+
+        Returns:
+            bool: True if the stylesheet was (re)parsed
+        """
+        mtime = os.path.getmtime(self.css_file)
+        if mtime == self._css_mtime:
+            return False
+        if self.prune_css:
+            with open(self.css_file, 'r', encoding='utf-8') as f:
+                self.css_pruner = CSSPruner(f.read())
+            self.stylesheets = None
+        else:
+            self.stylesheets = [weasyprint.CSS(filename=self.css_file, font_config=self.font_config)]
+        self._css_mtime = mtime
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """Return a JSON-serializable description of the service state."""
+        return {
+            'status': 'ok',
+            'html_dir': self.html_dir,
+            'output_dir': self.output_dir,
+            'css_file': self.css_file,
+            'epub_available': self.epub_available,
+            'profile': self.profile,
+            'prune_css': self.prune_css,
+            'optimize_pdf': self.optimize_pdf,
+            'annotations_loaded': len(self.metadata_store.annotations_data),
+            'renders': self.renders,
+        }
+
+    def render(self, essay: str, formats: List[str]) -> Dict[str, Any]:
+        """
+        Render one essay to the requested formats.
+
+        Args:
+            essay (str): Essay id (e.g. 'ann_003_fa_14'), with or without '.html'
+            formats (list): Any of 'pdf' and 'epub'
+
+        Returns:
+            dict: Result with output paths, errors and stage timings
+        """
+        essay = os.path.splitext(os.path.basename(essay))[0]
+        html_path = os.path.join(self.html_dir, f"{essay}.html")
+        if not os.path.exists(html_path):
+            return {'essay': essay, 'success': False, 'outputs': {},
+                    'errors': [f"HTML file not found: {html_path}"], 'warnings': []}
+
+        errors = []
+        warnings = []
+        if 'epub' in formats and not self.epub_available:
+            warnings.append("pandoc not found. EPUB creation is disabled.")
+            formats = [fmt for fmt in formats if fmt != 'epub']
+        if 'pdf' not in formats and 'epub' not in formats:
+            # Nothing would be rendered; report why instead of an empty success
+            return {'essay': essay, 'success': False, 'outputs': {},
+                    'errors': warnings or [f"No supported output format requested: {formats}"],
+                    'warnings': []}
+
+        pdf_dir = os.path.join(self.output_dir, 'pdfs') if 'pdf' in formats else None
+        epub_dir = os.path.join(self.output_dir, 'epubs') if 'epub' in formats else None
+        for directory in (pdf_dir, epub_dir):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+        with self._lock:
+            timer = StageTimer(essay)
+            with timer.span('reload'):
+                if self._load_stylesheet():
+                    timer.count('stylesheet_reloaded')
+                if self.metadata_store.refresh():
+                    timer.count('metadata_reloaded')
+            errors += convert_html_file(
+                html_path, self.css_file, self.html_dir, pdf_dir, epub_dir, self._temp_dir,
+                timer, self.metadata_store, self.stylesheets, self.font_config,
+                profile=self.profile, css_pruner=self.css_pruner, optimize_pdf=self.optimize_pdf
+            )
+            timer.stop('ok' if not errors else 'failed')
+            self.renders += 1
+
+        outputs = {}
+        if pdf_dir:
+            outputs['pdf'] = os.path.join(pdf_dir, f"{essay}.pdf")
+        if epub_dir:
+            outputs['epub'] = os.path.join(epub_dir, f"{essay}.epub")
+
+        return {'essay': essay, 'success': not errors, 'outputs': outputs,
+                'errors': errors, 'warnings': warnings, 'timing': timer.as_record()}
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """HTTP handler exposing the /health and /render endpoints."""
+
+    service: RenderService = None
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, self.service.status())
+        else:
+            self._send_json(404, {'error': f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/render':
+            self._send_json(404, {'error': f"Unknown endpoint: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {'error': f"Invalid JSON request: {e}"})
+            return
+
+        if not isinstance(request, dict):
+            self._send_json(400, {'error': "Request must be a JSON object"})
+            return
+        essay = request.get('essay')
+        formats = request.get('formats', ['pdf'])
+        if not essay or not isinstance(essay, str):
+            self._send_json(400, {'error': "Missing 'essay' in request"})
+            return
+        if (not isinstance(formats, list) or not formats
+                or not all(isinstance(fmt, str) and fmt in OUTPUT_FORMATS for fmt in formats)):
+            self._send_json(400, {'error': f"'formats' must be a non-empty list of "
+                                           f"{'/'.join(map(repr, OUTPUT_FORMATS))}, got {json.dumps(formats)}"})
+            return
+
+        print(f"Rendering {essay} ({', '.join(formats)})")
+        result = self.service.render(essay, formats)
+        if result['success']:
+            print(f"  ✓ Done in {result['timing']['total_seconds']:.2f}s")
+        else:
+            for error in result['errors']:
+                print(f"  ✗ {error}")
+        self._send_json(200 if result['success'] else 500, result)
+
+    def log_message(self, format, *args):
+        # Progress is printed per render; skip the default access log
+        pass
+
+
+def main():
+    """Start the render service."""
+    parser = argparse.ArgumentParser(description='Long-lived PDF/EPUB render service')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                       help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--output-dir', '-o', default='./converted_documents',
+                       help='Output directory for converted files (default: ./converted_documents)')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    css_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'academic-print.css')
+    if not os.path.exists(css_file):
+        print(f"Error: CSS file not found: {css_file}")
+        sys.exit(1)
+
+    # Check dependencies once for the lifetime of the service
+    print("Checking dependencies...")
+    missing_python, missing_system = check_dependencies()
+    if missing_python:
+        print(f"Missing Python packages: {', '.join(missing_python)}")
+        print("Install with: pip install " + " ".join(missing_python))
+        sys.exit(1)
+
+    epub_available = 'pandoc' not in missing_system
+    if not epub_available:
+        print("Warning: pandoc not found. EPUB creation will be disabled.")
+
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print("Loading stylesheet and metadata...")
+    RenderRequestHandler.service = RenderService(html_dir, output_dir, css_file, epub_available)
+
+    server = HTTPServer(('127.0.0.1', args.port), RenderRequestHandler)
+    print(f"Render service listening on http://127.0.0.1:{args.port}")
+    print(f"Output directory: {output_dir}")
+    print("Press Ctrl+C to stop")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping render service")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
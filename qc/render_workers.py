@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Memory-Bounded Batch Conversion with Recycled Worker Processes
+
+WeasyPrint keeps large layout trees and image buffers alive, so a single
+long-lived process slowly grows over a batch run. This module renders essays
+in worker processes that are retired and replaced after a fixed number of
+essays or as soon as their resident memory passes a threshold, which keeps
+memory bounded no matter how large the corpus gets.
+
+Key Features:
+- Configurable number of worker processes
+- Workers recycled after N essays or above an RSS threshold
+- Each worker parses the stylesheet and loads the metadata once
+- Peak RSS recorded per essay (sampled) and overall in the timing report
+- Essay output is printed in one block per essay, never interleaved
+- A crashed worker is replaced and the essay recorded as failed
+- Optional per-essay timeout: a hung worker is killed and replaced, the
+  essay recorded as timed out, and the other workers keep going
+
+Used by:
+    python convert_to_pdf_epub.py --workers 4 [--max-essays-per-worker 20]
+                                  [--max-worker-rss 1500] [--timeout 300]
+"""
+import io
+import os
+import gc
+import time
+import shutil
+import tempfile
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+from contextlib import redirect_stdout
+from typing import List, Tuple, Dict, Any, Optional
+
+from convert_to_pdf_epub import convert_html_file, MetadataStore
+from conversion_timing import StageTimer, RSSSampler, current_rss_kb, peak_rss_kb
+from css_pruning import CSSPruner
+
+
+def _worker_main(conn, config: Dict[str, Any]) -> None:
+    """
+    Worker process loop: render essays sent by the parent until retired.
+
+    Args:
+        conn: Pipe connection to the parent process
+        config (dict): Paths and recycling limits for this batch
+    """
+    import weasyprint
+    from weasyprint.text.fonts import FontConfiguration
+
+    metadata_store = MetadataStore(config['html_dir'])
+    font_config = FontConfiguration()
+    if config['prune_css']:
+        # Every essay gets its own pruned stylesheet, embedded in the document
+        with open(config['css_file'], 'r', encoding='utf-8') as f:
+            css_pruner = CSSPruner(f.read())
+        stylesheets = None
+    else:
+        css_pruner = None
+        # Parsed once for the PDFs; pandoc gets the CSS file itself
+        stylesheets = [weasyprint.CSS(filename=config['css_file'], font_config=font_config)]
+    temp_dir = tempfile.mkdtemp(prefix='render_worker_')
+    processed = 0
+
+    try:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+
+            index, html_path = task
+            timer = StageTimer(os.path.splitext(os.path.basename(html_path))[0])
+            output = io.StringIO()
+
+            with RSSSampler() as sampler, redirect_stdout(output):
+                errors = convert_html_file(
+                    html_path, config['css_file'], config['html_dir'],
+                    config['pdf_dir'], config['epub_dir'], temp_dir,
+                    timer, metadata_store, stylesheets, font_config,
+                    profile=config['profile'], css_pruner=css_pruner,
+                    optimize_pdf=config['optimize_pdf']
+                )
+                # Free the essay's soup and layout tree before the next one
+                gc.collect()
+
+            rss_kb = current_rss_kb()
+            timer.count('peak_rss_kb', sampler.peak_kb)
+            timer.count('rss_after_kb', rss_kb)
+            timer.stop('ok' if not errors else 'failed')
+            processed += 1
+
+            retire = processed >= config['max_essays'] or (
+                config['max_rss_kb'] and rss_kb > config['max_rss_kb'])
+            conn.send({
+                'index': index,
+                'errors': errors,
+                'record': timer.as_record(),
+                'output': output.getvalue(),
+                'retire': retire,
+                'rss_kb': rss_kb,
+            })
+            if retire:
+                break
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        conn.close()
+
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    def __init__(self, ctx, config: Dict[str, Any]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, config), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.task: Optional[Tuple[int, str]] = None
+        self.started = 0.0
+
+    def assign(self, task: Tuple[int, str]) -> None:
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send(task)
+
+    def kill(self) -> None:
+        """Stop the worker immediately (e.g. when it hangs mid-essay)."""
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def shutdown(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+
+def process_html_files_in_workers(html_dir: str, output_dir: str, css_file: str,
+                                  create_pdf: bool = True, create_epub: bool = True,
+                                  timings: Optional[List[Dict[str, Any]]] = None,
+                                  workers: int = 2, max_essays_per_worker: int = 20,
+                                  max_worker_rss_mb: int = 1500,
+                                  html_files: Optional[List[str]] = None,
+                                  timeout: Optional[float] = None,
+                                  profile: str = 'final',
+                                  prune_css: bool = True,
+                                  optimize_pdf: bool = False) -> Tuple[int, int, List[str]]:
+    """
+    Process all HTML files in the directory using recycled worker processes.
+
+    Args:
+        html_dir (str): Directory containing HTML files
+        output_dir (str): Directory to save converted files
+        css_file (str): Path to CSS stylesheet
+        create_pdf (bool): Whether to create PDF files
+        create_epub (bool): Whether to create EPUB files
+        timings (list): Optional list that receives one timing record per file
+        workers (int): Number of worker processes to run concurrently
+        max_essays_per_worker (int): Essays a worker renders before it is replaced
+        max_worker_rss_mb (int): RSS in MB above which a worker is replaced (0 = no limit)
+        html_files (list): Optional file names to convert, in order
+            (default: every HTML file in ``html_dir``)
+        timeout (float): Seconds an essay may take before its worker is
+            killed and the essay recorded as timed out (None = no limit)
+        profile (str): Render profile ('final' or 'draft')
+        prune_css (bool): Leave out the CSS rules each document cannot match
+        optimize_pdf (bool): Linearize and dedupe every PDF for web delivery
+
+    Returns:
+        tuple: (successful_conversions, total_files, error_list)
+    """
+    # Find all HTML files
+    if html_files is None:
+        html_files = [f for f in os.listdir(html_dir) if f.endswith('.html')]
+    total_files = len(html_files)
+
+    print(f"Found {total_files} HTML files to convert")
+    print(f"Using {workers} worker process(es), recycled after {max_essays_per_worker} essays"
+          + (f" or above {max_worker_rss_mb} MB RSS" if max_worker_rss_mb else ""))
+    if timeout:
+        print(f"Per-essay timeout: {timeout:g}s")
+
+    # Create output directories
+    pdf_dir = None
+    if create_pdf:
+        pdf_dir = os.path.join(output_dir, 'pdfs')
+        os.makedirs(pdf_dir, exist_ok=True)
+
+    epub_dir = None
+    if create_epub:
+        epub_dir = os.path.join(output_dir, 'epubs')
+        os.makedirs(epub_dir, exist_ok=True)
+
+    config = {
+        'html_dir': html_dir,
+        'css_file': css_file,
+        'pdf_dir': pdf_dir,
+        'epub_dir': epub_dir,
+        'max_essays': max(1, max_essays_per_worker),
+        'max_rss_kb': max_worker_rss_mb * 1024,
+        'profile': profile,
+        'prune_css': prune_css,
+        'optimize_pdf': optimize_pdf,
+    }
+
+    ctx = multiprocessing.get_context()
+    pending = deque((i, os.path.join(html_dir, f)) for i, f in enumerate(html_files))
+    results: Dict[int, Dict[str, Any]] = {}
+    active: List[_Worker] = []
+    workers_started = 0
+    completed = 0
+    timed_out = 0
+
+    def finish(task: Tuple[int, str], result: Dict[str, Any]) -> None:
+        nonlocal completed
+        completed += 1
+        results[task[0]] = result
+        print(f"Processing {completed}/{total_files}: {os.path.basename(task[1])}")
+        print(result['output'], end='')
+
+    def fail(worker: _Worker, status: str, error_msg: str) -> None:
+        # Record the worker's essay as failed without output from the worker
+        task = worker.task
+        timer = StageTimer(os.path.splitext(os.path.basename(task[1]))[0])
+        timer.stop(status)
+        record = timer.as_record()
+        record['total_seconds'] = round(time.monotonic() - worker.started, 6)
+        finish(task, {'errors': [error_msg], 'record': record,
+                      'output': f"  ✗ {error_msg}\n"})
+        worker.task = None
+
+    try:
+        while pending or any(w.task for w in active):
+            # Start replacement workers and hand out work
+            busy_count = sum(1 for w in active if w.task)
+            while len(active) < min(workers, busy_count + len(pending)):
+                active.append(_Worker(ctx, config))
+                workers_started += 1
+            for worker in active:
+                if worker.task is None and pending:
+                    worker.assign(pending.popleft())
+
+            busy = {w.conn: w for w in active if w.task}
+            wait_timeout = None
+            if timeout:
+                # Wake up when the oldest running essay reaches its deadline
+                now = time.monotonic()
+                wait_timeout = max(0.0, min(w.started + timeout - now for w in busy.values()))
+
+            for conn in multiprocessing.connection.wait(list(busy), timeout=wait_timeout):
+                worker = busy[conn]
+                task = worker.task
+                try:
+                    message = conn.recv()
+                except EOFError:
+                    # Worker died mid-essay (e.g. crashed inside a native library)
+                    fail(worker, 'crashed',
+                         f"Worker crashed while processing {os.path.basename(task[1])}")
+                    worker.shutdown()
+                    active.remove(worker)
+                    continue
+
+                worker.task = None
+                finish(task, message)
+                if message['retire']:
+                    worker.shutdown()
+                    active.remove(worker)
+
+            if timeout:
+                # Kill workers stuck on an essay past the deadline; the loop
+                # starts replacements so the rest of the batch keeps going
+                now = time.monotonic()
+                for worker in [w for w in active if w.task and now - w.started >= timeout]:
+                    timed_out += 1
+                    fail(worker, 'timed_out',
+                         f"Timed out after {timeout:g}s while processing "
+                         f"{os.path.basename(worker.task[1])}")
+                    worker.kill()
+                    active.remove(worker)
+    finally:
+        for worker in active:
+            worker.shutdown()
+
+    successful_conversions = 0
+    errors = []
+    for index in sorted(results):
+        result = results[index]
+        errors.extend(result['errors'])
+        if not result['errors']:
+            successful_conversions += 1
+        if timings is not None:
+            timings.append(result['record'])
+
+    print(f"Worker processes started: {workers_started}")
+    if timed_out:
+        print(f"Essays timed out: {timed_out}")
+    print(f"Parent process peak RSS: {peak_rss_kb() / 1024:.1f} MB")
+
+    return successful_conversions, total_files, errors
@@ -3,10 +3,53 @@
 Simple HTML validation check
 """
 import os
+import sys
 import glob
+import argparse
 from pathlib import Path
 
-def check_html_files():
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, cached_map_in_order, DEFAULT_CACHE_PATH
+
+def check_html_file(html_file):
+    """Run the basic checks on one file (in a worker process); returns (issues, read error message)."""
+    try:
+        with open(html_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Basic checks
+        issues = []
+        
+        # Check for basic structure
+        if '<html' not in content.lower():
+            issues.append("Missing <html> tag")
+        if '<head' not in content.lower():
+            issues.append("Missing <head> tag")
+        if '<body' not in content.lower():
+            issues.append("Missing <body> tag")
+        
+        # Check for unclosed tags (basic)
+        open_tags = content.count('<p>')
+        close_tags = content.count('</p>')
+        if open_tags != close_tags:
+            issues.append(f"Mismatched <p> tags: {open_tags} open, {close_tags} close")
+        
+        open_div = content.count('<div')
+        close_div = content.count('</div>')
+        if open_div != close_div:
+            issues.append(f"Mismatched <div> tags: {open_div} open, {close_div} close")
+        
+        # Check for proper encoding
+        if '&lt;' in content and '<' in content:
+            # This might indicate mixed encoding
+            pass
+        
+        return issues, None
+        
+    except Exception as e:
+        return None, str(e)
+
+def check_html_files(workers=None, changed_since=None, use_cache=True, cache_path=DEFAULT_CACHE_PATH):
     html_dir = Path('/Users/thc4/Github/m-k-annotation-data/html')
     html_files = list(html_dir.glob('*.html'))
     
@@ -16,51 +59,27 @@ def check_html_files():
     
     issues_found = 0
     
-    for html_file in sorted(html_files):
+    # Check the files in parallel (reusing cached results); results come
+    # back in file order
+    html_files = sorted(html_files)
+    results = cached_map_in_order(check_html_file, html_files, 'simple_html_check',
+                                  checker_version(check_html_file), workers=workers,
+                                  changed_since=changed_since, use_cache=use_cache,
+                                  cache_path=cache_path)
+    
+    for html_file, (issues, error) in zip(html_files, results):
         print(f"Checking: {html_file.name}")
         
-        try:
-            with open(html_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Basic checks
-            issues = []
-            
-            # Check for basic structure
-            if '<html' not in content.lower():
-                issues.append("Missing <html> tag")
-            if '<head' not in content.lower():
-                issues.append("Missing <head> tag")
-            if '<body' not in content.lower():
-                issues.append("Missing <body> tag")
-            
-            # Check for unclosed tags (basic)
-            open_tags = content.count('<p>')
-            close_tags = content.count('</p>')
-            if open_tags != close_tags:
-                issues.append(f"Mismatched <p> tags: {open_tags} open, {close_tags} close")
-            
-            open_div = content.count('<div')
-            close_div = content.count('</div>')
-            if open_div != close_div:
-                issues.append(f"Mismatched <div> tags: {open_div} open, {close_div} close")
-            
-            # Check for proper encoding
-            if '&lt;' in content and '<' in content:
-                # This might indicate mixed encoding
-                pass
-            
-            if issues:
-                issues_found += len(issues)
-                print(f"  ✗ {len(issues)} issue(s) found:")
-                for issue in issues:
-                    print(f"    - {issue}")
-            else:
-                print(f"  ✓ OK")
-                
-        except Exception as e:
-            print(f"  ✗ Error reading file: {e}")
+        if error is not None:
+            print(f"  ✗ Error reading file: {error}")
             issues_found += 1
+        elif issues:
+            issues_found += len(issues)
+            print(f"  ✗ {len(issues)} issue(s) found:")
+            for issue in issues:
+                print(f"    - {issue}")
+        else:
+            print(f"  ✓ OK")
     
     print("\n" + "=" * 50)
     print(f"Summary: {issues_found} total issues found across all files")
@@ -68,7 +87,17 @@ def check_html_files():
     return issues_found
 
 if __name__ == "__main__":
-    issues = check_html_files()
+    parser = argparse.ArgumentParser(description='Simple HTML validation check')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
+    try:
+        issues = check_html_files(workers=args.workers, changed_since=args.changed_since,
+                                  use_cache=not args.no_cache, cache_path=args.cache)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     if issues == 0:
         print("All HTML files appear well-formed!")
     else:
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Synthetic Essay Corpus for Scale Testing
+
+Generates annotation-shaped HTML with the structure of the real essays
+(header-section with abstract and "Cite As", paragraphs with footnote-ref
+anchors and ``<i><u>Fig. N</u></i>`` references, figure containers with
+figcaptions, and a doc-endnotes footnotes section) at sizes the real corpus
+never reaches, e.g. 10,000 footnotes, 500 figures or 10,000 essays.
+
+The ``scale`` command generates one essay per size, times every preparation
+stage of ``prepare_html_for_conversion`` and the tag-stack passes of the
+well-formedness checkers on it, and fits the slope of log(time) over
+log(size). A slope near 1 is linear; a slope near 2 means the stage is
+quadratic in that dimension and will dominate once an essay gets large.
+
+Key Features:
+- Deterministic output for a given seed
+- Independent sizes for footnotes, figures, paragraphs and corpus size
+- Optional unclosed paragraphs to exercise the checkers' mismatch paths
+- Per-stage scaling curves with log-log slopes, optionally saved as JSON
+
+Usage:
+    python synthetic_corpus.py generate --essays 10000 -o synthetic_html/
+    python synthetic_corpus.py generate --essays 1 --footnotes 10000 --figures 500 -o synthetic_html/
+    python synthetic_corpus.py scale --dimension footnotes --sizes 250 500 1000 2000 4000
+    python synthetic_corpus.py scale --dimension figures --output figure_scaling.json
+"""
+import io
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import tempfile
+import time
+from contextlib import redirect_stdout
+from typing import List, Dict, Any, Callable, Optional
+
+# Slopes above this are reported as superlinear
+SUPERLINEAR_SLOPE = 1.3
+
+DEFAULT_SIZES = {
+    'footnotes': [250, 500, 1000, 2000, 4000],
+    'figures': [25, 50, 100, 200, 400],
+    'paragraphs': [100, 200, 400, 800, 1600],
+}
+
+WORDS = (
+    'the author practitioner describes a process for casting molding varnish '
+    'pigment sand mold metal lead wheel stone gem counterfeit colour recipe '
+    'manuscript folio entry workshop reconstruction experiment material texture '
+    'heat furnace crucible charcoal brass silver gold glue plaster wax layer '
+    'surface grain polish fat lean earth water oil resin binder technique tool'
+).split()
+
+EDITION_URL = 'https://edition640.makingandknowing.org'
+
+
+def _sentence(rng: random.Random, words: int = 14) -> str:
+    text = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _spread(count: int, slots: int) -> Dict[int, List[int]]:
+    """Distribute items 1..count evenly over slots 0..slots-1."""
+    placement: Dict[int, List[int]] = {}
+    for item in range(1, count + 1):
+        placement.setdefault((item - 1) * slots // count, []).append(item)
+    return placement
+
+
+def generate_essay(annotation_id: str, footnotes: int = 40, figures: int = 8,
+                   paragraphs: Optional[int] = None, unclosed_rate: float = 0.0,
+                   seed: int = 0) -> str:
+    """
+    Generate one annotation-shaped essay.
+
+    Args:
+        annotation_id (str): Essay id, e.g. 'ann_00001_sy_00'
+        footnotes (int): Number of footnotes (and footnote-ref anchors)
+        figures (int): Number of figures; each is referenced once from the
+            paragraph before it and once more from a later paragraph
+        paragraphs (int): Number of body paragraphs (default: enough to
+            hold about two footnotes each, at least one per figure)
+        unclosed_rate (float): Fraction of paragraphs left without ``</p>``
+        seed (int): Random seed
+
+    Returns:
+        str: HTML document
+    """
+    rng = random.Random(f"{annotation_id}:{seed}")
+    if paragraphs is None:
+        paragraphs = max(20, footnotes // 2, figures + 1)
+
+    footnote_slots = _spread(footnotes, paragraphs) if footnotes else {}
+    figure_slots = _spread(figures, paragraphs) if figures else {}
+    later_refs: Dict[int, List[int]] = {}
+    for figure in range(1, figures + 1):
+        later = min(paragraphs - 1, (figure - 1) * paragraphs // figures + rng.randint(2, 10))
+        later_refs.setdefault(later, []).append(figure)
+
+    out = ['<html>\n\n<head></head>\n\n<body>\n',
+           '    <div class="header-section">\n'
+           '        <h2>Abstract</h2>\n'
+           f'        <div>\n            <p>{_sentence(rng, 40)} {_sentence(rng, 30)}</p>\n\n        </div>\n'
+           '        <br>\n'
+           '        <h2>Cite As</h2>\n'
+           '        <div>\n'
+           f'            Author, Synthetic. “{_sentence(rng, 5)[:-1].title()}.” In <i>Secrets of\n'
+           '                Craft and Nature in Renaissance France</i>, edited by Making and\n'
+           '            Knowing Project. New York: Making and Knowing Project, 2020. <a\n'
+           f'               href="{EDITION_URL}/#/essays/{annotation_id}">{EDITION_URL}/#/essays/{annotation_id}</a>.\n'
+           '        </div>\n'
+           '    </div>\n\n'
+           '    <h2 id="introduction">Introduction</h2>\n']
+
+    for index in range(paragraphs):
+        if index and index % 25 == 0:
+            out.append(f'    <h2 id="section-{index // 25}">{_sentence(rng, 3)[:-1]}</h2>\n')
+        parts = [_sentence(rng)]
+        for note in footnote_slots.get(index, []):
+            parts.append(f'{_sentence(rng, 8)[:-1]}.<a href="#fn{note}"\n'
+                         '           class="footnote-ref"\n'
+                         f'           id="fnref{note}"\n'
+                         f'           role="doc-noteref"><sup>{note}</sup></a>')
+        for figure in figure_slots.get(index, []) + later_refs.get(index, []):
+            parts.append(f'{_sentence(rng, 6)[:-1]} (<i><u>Fig. {figure}</u></i>).')
+        parts.append(_sentence(rng))
+        closing = '' if rng.random() < unclosed_rate else '</p>'
+        out.append(f'    <p>{" ".join(parts)}{closing}\n')
+
+        for figure in figure_slots.get(index, []):
+            out.append('    <div class="figure-container">\n'
+                       '        <figure>\n'
+                       f'            <img src="https://edition-assets.makingandknowing.org/{annotation_id}/figure-{figure}.jpg"\n'
+                       f'                 alt="fig. {figure}">\n'
+                       f'            <figcaption>Fig. {figure}. {_sentence(rng, 20)} Public domain.</figcaption>\n'
+                       '        </figure>\n'
+                       '    </div>\n')
+
+    if footnotes:
+        out.append('    <section class="footnotes footnotes-end-of-document"\n'
+                   '             role="doc-endnotes">\n'
+                   '        <hr>\n'
+                   '        <ol>\n')
+        for note in range(1, footnotes + 1):
+            out.append(f'            <li id="fn{note}"\n'
+                       '                role="doc-endnote">\n'
+                       f'                <p>{_sentence(rng, 18)} See fol. <a\n'
+                       f'                       href="http://edition640.makingandknowing.org/#/folios/{note % 170 + 1}r/f/{note % 170 + 1}r/tl"><u>{note % 170 + 1}r</u></a>.<a\n'
+                       f'                       href="#fnref{note}"\n'
+                       '                       class="footnote-back"\n'
+                       '                       role="doc-backlink">↩︎</a></p>\n'
+                       '            </li>\n')
+        out.append('        </ol>\n    </section>\n')
+
+    out.append('    <h2 id="bibliography">Bibliography</h2>\n    <div>\n')
+    for _ in range(10):
+        out.append(f'        <p>{_sentence(rng, 12)} <em>{_sentence(rng, 5)}</em></p>\n')
+    out.append('    </div>\n</body>\n\n</html>\n')
+    return ''.join(out)
+
+
+def write_corpus(output_dir: str, essays: int, footnotes: int, figures: int,
+                 paragraphs: Optional[int] = None, unclosed_rate: float = 0.0,
+                 seed: int = 0) -> List[str]:
+    """
+    Write a synthetic corpus of identically sized essays.
+
+    Args:
+        output_dir (str): Directory for the HTML files
+        essays (int): Number of essays
+        footnotes (int): Footnotes per essay
+        figures (int): Figures per essay
+        paragraphs (int): Paragraphs per essay (optional)
+        unclosed_rate (float): Fraction of paragraphs left without ``</p>``
+        seed (int): Random seed
+
+    Returns:
+        list: Paths of the written files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for number in range(1, essays + 1):
+        annotation_id = f"ann_{number:05d}_sy_00"
+        path = os.path.join(output_dir, f"{annotation_id}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(generate_essay(annotation_id, footnotes, figures, paragraphs,
+                                   unclosed_rate, seed))
+        paths.append(path)
+    return paths
+
+
+def checker_stages() -> Dict[str, Callable[[str], Any]]:
+    """
+    The well-formedness checkers' structure passes, keyed by stage name.
+
+    Returns:
+        dict: Callables taking the HTML content
+    """
+    from check_html_wellformedness import HTMLWellFormednessChecker
+    from comprehensive_html_check import analyze_html_structure
+    from html_wellformedness_check import check_html_structure
+    from quick_html_analysis import check_basic_structure
+
+    def tag_stack_check(content):
+        checker = HTMLWellFormednessChecker()
+        checker.feed(content)
+        checker.check_structure()
+        return checker.errors
+
+    return {
+        'check:check_html_wellformedness': tag_stack_check,
+        'check:comprehensive_html_check': lambda content: analyze_html_structure(content, 'synthetic'),
+        'check:html_wellformedness_check': lambda content: check_html_structure(content, 'synthetic'),
+        'check:quick_html_analysis': lambda content: check_basic_structure(content, 'synthetic'),
+    }
+
+
+def time_essay(html_path: str, css_file: str, repeat: int,
+               checkers: Dict[str, Callable[[str], Any]]) -> Dict[str, float]:
+    """
+    Time the preparation stages and checkers on one essay.
+
+    Args:
+        html_path (str): Path to the essay
+        css_file (str): Path to the CSS stylesheet
+        repeat (int): Number of timed runs; the fastest is kept
+        checkers (dict): Checker callables by stage name
+
+    Returns:
+        dict: Best time in seconds per stage
+    """
+    from conversion_timing import StageTimer
+    from convert_to_pdf_epub import prepare_html_for_conversion, MetadataStore
+
+    html_dir = os.path.dirname(html_path)
+    metadata_store = MetadataStore(html_dir)
+    with open(html_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    best: Dict[str, float] = {}
+    for _ in range(repeat):
+        timer = StageTimer(os.path.basename(html_path))
+        with redirect_stdout(io.StringIO()):
+            prepare_html_for_conversion(html_path, css_file, html_dir, timer,
+                                        metadata_store=metadata_store)
+        stages = dict(timer.stages)
+        for name, check in checkers.items():
+            start = time.perf_counter()
+            check(content)
+            stages[name] = time.perf_counter() - start
+        for stage, seconds in stages.items():
+            best[stage] = min(best.get(stage, seconds), seconds)
+    return best
+
+
+def loglog_slope(sizes: List[int], seconds: List[float]) -> Optional[float]:
+    """
+    Least-squares slope of log(seconds) over log(size).
+
+    Args:
+        sizes (list): Input sizes
+        seconds (list): Times for those sizes
+
+    Returns:
+        float: Slope, or None if there are fewer than two usable points
+    """
+    points = [(math.log(n), math.log(t)) for n, t in zip(sizes, seconds) if n > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var_x = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var_x:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x
+
+
+def measure_scaling(dimension: str, sizes: List[int], repeat: int = 3,
+                    base: Optional[Dict[str, int]] = None,
+                    css_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Time every stage on essays of increasing size along one dimension.
+
+    Args:
+        dimension (str): 'footnotes', 'figures' or 'paragraphs'
+        sizes (list): Values of that dimension
+        repeat (int): Timed runs per size
+        base (dict): Values of the other dimensions (default: 40 footnotes,
+            8 figures, paragraphs derived from the sizes)
+        css_file (str): Stylesheet (default: academic-print.css)
+
+    Returns:
+        dict: 'dimension', 'sizes', 'stages' (stage -> list of seconds) and
+            'slopes' (stage -> log-log slope)
+    """
+    params = {'footnotes': 40, 'figures': 8, 'paragraphs': None}
+    params.update(base or {})
+    css_file = css_file or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'academic-print.css')
+    checkers = checker_stages()
+
+    curves: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for position, size in enumerate(sizes):
+            params[dimension] = size
+            annotation_id = f"ann_{position + 1:05d}_sy_00"
+            html_path = os.path.join(temp_dir, f"{annotation_id}.html")
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(generate_essay(annotation_id, params['footnotes'], params['figures'],
+                                       params['paragraphs']))
+            timings = time_essay(html_path, css_file, repeat, checkers)
+            for stage, seconds in timings.items():
+                curves.setdefault(stage, [0.0] * len(sizes))[position] = seconds
+            print(f"  {dimension}={size}: {sum(t for s, t in timings.items() if not s.startswith('check:')):.2f}s "
+                  f"preparation, {sum(t for s, t in timings.items() if s.startswith('check:')):.2f}s checks")
+
+    return {
+        'dimension': dimension,
+        'sizes': list(sizes),
+        'stages': curves,
+        'slopes': {stage: loglog_slope(sizes, seconds) for stage, seconds in curves.items()},
+    }
+
+
+def format_scaling(result: Dict[str, Any]) -> str:
+    """
+    Format scaling curves as a table, steepest stage first.
+
+    Args:
+        result (dict): Result of ``measure_scaling``
+
+    Returns:
+        str: Table of times per size and slope per stage
+    """
+    sizes = result['sizes']
+    lines = [f"Scaling by {result['dimension']} (times in ms, slope of log-log fit)",
+             f"{'stage':34}" + ''.join(f"{size:>10}" for size in sizes) + f"{'slope':>8}"]
+    order = sorted(result['stages'], key=lambda s: result['slopes'][s] or 0.0, reverse=True)
+    for stage in order:
+        slope = result['slopes'][stage]
+        slope_text = f"{slope:8.2f}" if slope is not None else f"{'-':>8}"
+        marker = '  ✗ superlinear' if slope is not None and slope > SUPERLINEAR_SLOPE else ''
+        lines.append(f"{stage:34}" + ''.join(f"{t * 1000:10.1f}" for t in result['stages'][stage])
+                     + slope_text + marker)
+    return "\n".join(lines)
+
+
+def main():
+    """Generate a synthetic corpus or measure stage scaling."""
+    parser = argparse.ArgumentParser(description='Generate synthetic essays and measure how each stage scales')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = subparsers.add_parser('generate', help='Write a synthetic corpus')
+    generate_parser.add_argument('--output-dir', '-o', default='./synthetic_html',
+                                 help='Directory for the HTML files (default: ./synthetic_html)')
+    generate_parser.add_argument('--essays', type=int, default=100, help='Number of essays (default: 100)')
+    generate_parser.add_argument('--footnotes', type=int, default=40, help='Footnotes per essay (default: 40)')
+    generate_parser.add_argument('--figures', type=int, default=8, help='Figures per essay (default: 8)')
+    generate_parser.add_argument('--paragraphs', type=int,
+                                 help='Paragraphs per essay (default: derived from the footnotes and figures)')
+    generate_parser.add_argument('--unclosed-rate', type=float, default=0.0,
+                                 help='Fraction of paragraphs without </p> (default: 0)')
+    generate_parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+
+    scale_parser = subparsers.add_parser('scale', help='Measure per-stage scaling curves')
+    scale_parser.add_argument('--dimension', choices=sorted(DEFAULT_SIZES), default='footnotes',
+                              help='Dimension to grow (default: footnotes)')
+    scale_parser.add_argument('--sizes', type=int, nargs='+',
+                              help='Values of the dimension (default depends on the dimension)')
+    scale_parser.add_argument('--repeat', type=int, default=3,
+                              help='Timed runs per size; the fastest is kept (default: 3)')
+    scale_parser.add_argument('--output', help='Also write the curves to this JSON file')
+
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        start = time.perf_counter()
+        paths = write_corpus(args.output_dir, args.essays, args.footnotes, args.figures,
+                             args.paragraphs, args.unclosed_rate, args.seed)
+        size = sum(os.path.getsize(path) for path in paths)
+        print(f"✓ Wrote {len(paths)} essays ({size / 1e6:.1f} MB) to {args.output_dir} "
+              f"in {time.perf_counter() - start:.1f}s")
+        return
+
+    sizes = sorted(args.sizes or DEFAULT_SIZES[args.dimension])
+    if len(sizes) < 2:
+        print("Error: --sizes needs at least two values")
+        sys.exit(1)
+
+    print(f"Measuring scaling by {args.dimension}: {', '.join(map(str, sizes))}")
+    result = measure_scaling(args.dimension, sizes, args.repeat)
+    print()
+    print(format_scaling(result))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nCurves saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,13 @@
 Test URL extraction function with various Google Drive URL formats
 """
 
+import os
+import time
+
 import pandas as pd
 
+from media_index import extract_drive_id_formats, DEFAULT_EXCEL_FILE, DEFAULT_SHEET, COLUMNS
+
 def extract_google_drive_id_from_url(url):
     """Extract Google Drive file ID from a Google Drive URL using id= pattern"""
     if not url or pd.isna(url):
@@ -33,23 +38,76 @@ def extract_google_drive_id_from_url(url):
     
     return None
 
-def test_urls():
-    """Test various URL formats"""
+def count_url_mismatches():
+    """Compare per-row and batch extraction on various URL formats; returns the number of mismatches"""
     test_cases = [
         "https://drive.google.com/file/d/0BwJi-u8sfkVDQjNyU0F6aWhyLXc/view?usp=drivesdk",
         "https://drive.google.com/file/d/1tpkpHvN9d2Am_e4Cmx4WnIPrseuytqHh/view?usp=drivesdk", 
         "https://drive.google.com/open?id=1F9G9RQf2SAc69750ehjfDCxYA__c32xF",
         "https://drive.google.com/file/d/0BwJi-u8sfkVDdGdMMHREdThwZkU/view?usp=drivesdk",
-        "https://drive.google.com/open?id=1hN08MRf8QrH7ZEcTA0wltPNFZs-TvT2J"
+        "https://drive.google.com/open?id=1hN08MRf8QrH7ZEcTA0wltPNFZs-TvT2J",
+        "https://drive.google.com/open?id=1QhbjUwcNDTfnn82ZcX3BIV-pPfoygWLx&usp=drive_copy",
+        "https://drive.google.com/file/d/1AwqFq0svBoE2m1ORJSUHQI06S3jgtpu-/view",
+        "https://drive.google.com/uc?id=1F9G9RQf2SAc69750ehjfDCxYA__c32xF",
+        "https://drive.google.com/uc?export=download&id=1F9G9RQf2SAc69750ehjfDCxYA__c32xF",
+        "https://player.vimeo.com/video/423255969",
     ]
     
     print("Testing URL extraction:")
     print("-" * 80)
-    for url in test_cases:
+    batch = extract_drive_id_formats(pd.Series(test_cases))
+    failures = 0
+    for url, drive_id, url_format in zip(test_cases, batch['drive_id'], batch['format']):
         extracted_id = extract_google_drive_id_from_url(url)
+        status = "✓" if drive_id == extracted_id else "✗"
+        failures += status == "✗"
         print(f"URL: {url}")
         print(f"Extracted ID: {extracted_id}")
+        print(f"{status} Batch ID: {drive_id} (format: {url_format})")
         print()
+    return failures
+
+def test_urls():
+    """Test various URL formats"""
+    failures = count_url_mismatches()
+    assert failures == 0, f"{failures} URLs extracted differently by the batch extractor"
+
+def benchmark_sheet(excel_file=DEFAULT_EXCEL_FILE, repeat=20):
+    """Compare per-row and batch extraction on every link of the spreadsheet"""
+    if not os.path.exists(excel_file):
+        print(f"Spreadsheet not found, skipping benchmark: {excel_file}")
+        return 0
+
+    urls = pd.read_excel(excel_file, sheet_name=DEFAULT_SHEET).iloc[:, COLUMNS['url']]
+
+    def best_time(function):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    row_loop_time, _ = best_time(lambda: [extract_google_drive_id_from_url(urls.iloc[i])
+                                          for i in range(len(urls))])
+    per_row_time, per_row = best_time(lambda: urls.map(extract_google_drive_id_from_url))
+    batch_time, batch = best_time(lambda: extract_drive_id_formats(urls))
+
+    # The per-row function only knows the 'id=' and '/file/d/' shapes
+    known = batch['format'].isin(['file', 'open', 'uc', 'query'])
+    mismatches = (per_row[known] != batch['drive_id'][known]).sum()
+
+    print(f"Benchmark on {len(urls)} spreadsheet links (best of {repeat}):")
+    print("-" * 80)
+    print(f"Row loop (iloc):    {row_loop_time * 1000:.2f} ms")
+    print(f"Per-row (map):      {per_row_time * 1000:.2f} ms")
+    print(f"Batch extraction:   {batch_time * 1000:.2f} ms")
+    print(f"Formats: {batch['format'].value_counts(dropna=False).to_dict()}")
+    print(f"{'✓' if not mismatches else '✗'} {mismatches} ids differ from the per-row extraction")
+    return mismatches
 
 if __name__ == "__main__":
-    test_urls()
\ No newline at end of file
+    failures = count_url_mismatches()
+    failures += benchmark_sheet()
+    if failures:
+        raise SystemExit(1)
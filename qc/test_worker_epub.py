@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Check that EPUBs rendered in worker processes carry the academic stylesheet
+"""
+
+import os
+import sys
+import shutil
+import zipfile
+import tempfile
+
+import pytest
+
+# Only found in academic-print.css, never in essay text
+STYLESHEET_MARKER = '@top-center'
+
+def epub_contains_stylesheet(epub_path):
+    """Check whether the EPUB contains a CSS file with the stylesheet"""
+    with zipfile.ZipFile(epub_path) as epub:
+        for name in epub.namelist():
+            if name.endswith('.css') and STYLESHEET_MARKER in epub.read(name).decode('utf-8', errors='replace'):
+                return True
+    return False
+
+def test_worker_epub(filename='ann_002_fa_14.html'):
+    """Render one essay to EPUB in a worker with pre-parsed stylesheets"""
+    if shutil.which('pandoc') is None:
+        pytest.skip("pandoc not installed")
+    from render_workers import process_html_files_in_workers
+    html_dir = os.path.abspath('../html')
+    css_file = os.path.abspath('academic-print.css')
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        # Without CSS pruning the worker hands pre-parsed stylesheets to WeasyPrint
+        successful, total, errors = process_html_files_in_workers(
+            html_dir, output_dir, css_file, create_pdf=False, create_epub=True,
+            workers=1, html_files=[filename], prune_css=False
+        )
+        assert not errors, errors
+
+        epub_path = os.path.join(output_dir, 'epubs', filename.replace('.html', '.epub'))
+        assert epub_contains_stylesheet(epub_path), f"{epub_path} has no CSS file with the stylesheet"
+        print(f"✓ Worker EPUB of {filename} contains the stylesheet")
+
+if __name__ == "__main__":
+    test_worker_epub(*sys.argv[1:])
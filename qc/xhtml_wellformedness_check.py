@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+XHTML Well-Formedness Checker
+
+Parses every essay as XML with the expat parser (``pyexpat``) and reports
+the first fatal error of each file with its line:column position, in the
+wording of the Xerces validator that produced ``logs/xmlwf_errs.txt``:
+
+    The element type "img" must be terminated by the matching end-tag "</img>".
+    The entity "nbsp" was referenced, but not declared.
+
+The frequency summary that ``logs/make_error_frq_count.sh`` built with
+``grep | sort | uniq -c`` is written directly, in the same format, so the
+external JVM run and the shell step are no longer needed.
+
+Like Xerces, parsing stops at the first fatal error of a file. Files are
+parsed in parallel worker processes; the report keeps the file order.
+
+Key Features:
+- C-accelerated parsing, no external validator
+- Xerces-style messages with start (and for entities end) locations
+- Error report and frequency summary in the formats of the old logs
+
+Usage:
+    python xhtml_wellformedness_check.py [--html-dir ../html] [--workers 4]
+    python xhtml_wellformedness_check.py --errors logs/xmlwf_errs.txt --counts logs/xmlwf_err_cnt.txt
+    python xhtml_wellformedness_check.py --changed-since HEAD
+"""
+import os
+import re
+import sys
+import argparse
+from collections import Counter
+from typing import List, Dict, Optional, Any
+from xml.parsers import expat
+
+from check_pool import add_workers_argument
+from check_cache import add_cache_arguments, checker_version, run_cached
+
+ENGINE_NAME = 'expat'
+
+# Name of an entity reference starting at the error position
+ENTITY_PATTERN = re.compile(rb'&([^;\s&<]+);')
+
+
+def open_element(raw_data: bytes, byte_index: int) -> Optional[str]:
+    """
+    Name of the innermost element still open at a byte position.
+
+    Only called for files with a mismatched end-tag, so the common case of a
+    well-formed file is parsed without Python callbacks.
+
+    Args:
+        raw_data (bytes): File content
+        byte_index (int): Position of the mismatched end-tag
+
+    Returns:
+        str: Element name, or None if no element is open
+    """
+    stack: List[str] = []
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = lambda name, attributes: stack.append(name)
+    parser.EndElementHandler = lambda name: stack.pop()
+    parser.Parse(raw_data[:byte_index], False)
+    return stack[-1] if stack else None
+
+
+def describe_error(error: expat.ExpatError, raw_data: bytes, byte_index: int) -> Dict[str, Any]:
+    """
+    Turn an expat error into a Xerces-style error record.
+
+    Args:
+        error (ExpatError): Error raised by the parser
+        raw_data (bytes): File content
+        byte_index (int): Byte position of the error
+
+    Returns:
+        dict: description, line, column (1-based) and end_column (or None)
+    """
+    record = {
+        'description': None,
+        'line': error.lineno,
+        'column': error.offset + 1,
+        'end_column': None,
+    }
+
+    if error.code == expat.errors.codes[expat.errors.XML_ERROR_TAG_MISMATCH]:
+        element = open_element(raw_data, byte_index)
+        if element:
+            record['description'] = (f'The element type "{element}" must be terminated '
+                                     f'by the matching end-tag "</{element}>".')
+    elif error.code == expat.errors.codes[expat.errors.XML_ERROR_UNDEFINED_ENTITY]:
+        entity = ENTITY_PATTERN.match(raw_data, byte_index)
+        if entity:
+            name = entity.group(1).decode('utf-8', errors='replace')
+            record['description'] = f'The entity "{name}" was referenced, but not declared.'
+            record['end_column'] = record['column'] + len(entity.group(0))
+
+    if record['description'] is None:
+        message = expat.ErrorString(error.code)
+        record['description'] = message[0].upper() + message[1:] + '.'
+    return record
+
+
+def check_file(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Parse one file as XML.
+
+    Args:
+        file_path (str): Path of the HTML file
+
+    Returns:
+        list: The fatal error of the file (at most one), as dicts with file,
+            severity, description, line, column and end_column
+    """
+    try:
+        with open(file_path, 'rb') as f:
+            raw_data = f.read()
+    except OSError as e:
+        return [{'file': file_path, 'severity': 'fatal', 'description': f"Could not read file: {e}",
+                 'line': 0, 'column': 0, 'end_column': None}]
+
+    parser = expat.ParserCreate()
+    try:
+        parser.Parse(raw_data, True)
+    except expat.ExpatError as e:
+        record = describe_error(e, raw_data, parser.ErrorByteIndex)
+        record['file'] = file_path
+        record['severity'] = 'fatal'
+        return [record]
+    return []
+
+
+def check_files(file_paths: List[str], args) -> List[Dict[str, Any]]:
+    """
+    Check files in parallel, reusing cached results and keeping file order.
+
+    Args:
+        file_paths (list): Paths of the HTML files
+        args (Namespace): Parsed arguments (``--workers`` and the cache
+            arguments of ``check_cache.py``)
+
+    Returns:
+        list: Errors of all files, in file order
+    """
+    results = run_cached(check_file, file_paths, 'xhtml_wellformedness_check',
+                         checker_version(check_file), args)
+    errors = []
+    for file_path, file_errors in zip(file_paths, results):
+        for error in file_errors:
+            # Cached results may come from another file with the same content
+            error['file'] = file_path
+            errors.append(error)
+    return errors
+
+
+def format_errors(errors: List[Dict[str, Any]]) -> str:
+    """Error report in the text format of ``logs/xmlwf_errs.txt``."""
+    blocks = []
+    for error in errors:
+        lines = [
+            f"System ID: {error['file']}",
+            f"Main validation file: {error['file']}",
+            f"Engine name: {ENGINE_NAME}",
+            f"Severity: {error['severity']}",
+            f"Description: {error['description']}",
+            f"Start location: {error['line']}:{error['column']}",
+        ]
+        if error['end_column'] is not None:
+            lines.append(f"End location: {error['line']}:{error['end_column']}")
+        blocks.append("\n".join(lines) + "\n")
+    return "\n".join(blocks)
+
+
+def format_counts(errors: List[Dict[str, Any]]) -> str:
+    """Frequency summary in the ``uniq -c | sort -nr`` format of ``logs/xmlwf_err_cnt.txt``."""
+    counts = Counter(error['description'] for error in errors)
+    ordered = sorted(counts.items(), key=lambda item: (item[1], item[0]), reverse=True)
+    return "".join(f"{count:7d}  {description}\n" for description, count in ordered)
+
+
+def main():
+    """Check every HTML file in the directory."""
+    parser = argparse.ArgumentParser(description='Check HTML files for XML well-formedness')
+    parser.add_argument('--html-dir', default='../html',
+                       help='Directory containing HTML files (default: ../html)')
+    add_workers_argument(parser)
+    add_cache_arguments(parser)
+    parser.add_argument('--errors',
+                       help='Write the error report to this file (e.g. logs/xmlwf_errs.txt)')
+    parser.add_argument('--counts',
+                       help='Write the error frequency summary to this file (e.g. logs/xmlwf_err_cnt.txt)')
+
+    args = parser.parse_args()
+
+    html_dir = os.path.abspath(args.html_dir)
+    if not os.path.exists(html_dir):
+        print(f"Error: HTML directory not found: {html_dir}")
+        sys.exit(1)
+
+    file_paths = sorted(os.path.join(html_dir, name) for name in os.listdir(html_dir)
+                        if name.endswith('.html'))
+    print(f"Checking {len(file_paths)} HTML files in {html_dir}")
+
+    try:
+        errors = check_files(file_paths, args)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.errors:
+        with open(args.errors, 'w', encoding='utf-8') as f:
+            f.write(format_errors(errors))
+        print(f"Error report written to {args.errors}")
+    if args.counts:
+        with open(args.counts, 'w', encoding='utf-8') as f:
+            f.write(format_counts(errors))
+        print(f"Error counts written to {args.counts}")
+
+    print("=" * 60)
+    if not errors:
+        print(f"✓ All {len(file_paths)} files are well-formed XML")
+        return
+
+    if not args.errors:
+        for error in errors:
+            print(f"✗ {os.path.basename(error['file'])}:{error['line']}:{error['column']}: {error['description']}")
+        print("=" * 60)
+    print(f"{len(errors)} of {len(file_paths)} files are not well-formed:")
+    print(format_counts(errors), end='')
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()